@@ -0,0 +1,135 @@
+# /Users/junluo/Desktop/PlaneWar/asset_loader.py
+"""
+Background asset loading.
+
+AssetLoader starts decoding every image, sound and the level JSON on a small
+thread pool as soon as the window is open, so the start screen can be shown
+right away with a progress bar instead of after a serial load. Anything the
+asset pack already has is taken from it immediately on the main thread (it is
+just a memory map); only the rest goes to the workers.
+
+loader.images / loader.sounds are read-only dict-likes over the pending
+results. Reading a key returns at once if that asset is done and only waits
+for that one asset if it is still loading, so gameplay never blocks on assets
+it doesn't use. Surfaces are convert_alpha()'d on the main thread when they
+are first handed out - workers only decode and scale.
+"""
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from settings import *
+from assets import (IMAGE_CONFIGS, POWERUP_IMAGE_CONFIGS, SOUND_CONFIGS, powerup_pack_key,
+                    load_and_scale_image, load_sound)
+
+
+def _finish_image(image):
+    """ Main-thread half of an image load: convert to the display format. """
+    if image is not None and pygame.display.get_surface():
+        return image.convert_alpha()
+    return image
+
+
+class LazyAssets(Mapping):
+    """ Read-only mapping key -> asset backed by Futures; a lookup waits only for its own key. """
+    def __init__(self, futures, finish=None, ready=None):
+        self._futures = futures
+        self._finish = finish
+        self._ready = dict(ready or {}) # Finished (and finished-off) values; may hold keys with no future
+        self.blocking_waits = 0 # Lookups that had to wait for a worker
+
+    def __getitem__(self, key):
+        if key in self._ready:
+            return self._ready[key]
+        future = self._futures[key] # KeyError for unknown keys, like a dict
+        if not future.done():
+            self.blocking_waits += 1
+        value = future.result()
+        if self._finish: value = self._finish(value)
+        self._ready[key] = value
+        return value
+
+    def __iter__(self):
+        yield from self._futures
+        yield from (key for key in self._ready if key not in self._futures)
+
+    def __len__(self):
+        return len(self._futures.keys() | self._ready.keys())
+
+    def is_ready(self, key):
+        return key in self._ready or (key in self._futures and self._futures[key].done())
+
+    def finish_ready(self):
+        """ Runs the main-thread finishing step for everything the workers have completed. """
+        for key, future in self._futures.items():
+            if key not in self._ready and future.done():
+                self[key]
+
+
+class AssetLoader:
+    """ Streams images, sounds and extra jobs (e.g. level data) in on a thread pool. """
+    def __init__(self, pack=None, max_workers=ASSET_LOADER_WORKERS):
+        self.pack = pack
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asset-loader")
+        self._futures = [] # Every job, for progress()
+        self._jobs = {}
+
+        image_futures, image_ready = {}, {}
+        for key, (path, w, h) in IMAGE_CONFIGS.items():
+            self._queue_image(image_futures, image_ready, key, key, path, w, h)
+        powerup_futures, powerup_ready = {}, {}
+        for type_key, (path, w, h) in POWERUP_IMAGE_CONFIGS.items():
+            self._queue_image(powerup_futures, powerup_ready, type_key, powerup_pack_key(type_key), path, w, h)
+        image_ready['powerups'] = LazyAssets(powerup_futures, _finish_image, powerup_ready)
+        self.images = LazyAssets(image_futures, _finish_image, image_ready)
+
+        sound_futures, sound_ready = {}, {}
+        for key, (path, vol) in SOUND_CONFIGS.items():
+            packed = pack.sound(key) if pack else None
+            if packed: sound_ready[key] = packed
+            else: sound_futures[key] = self._track(self._executor.submit(load_sound, path, vol))
+        self.sounds = LazyAssets(sound_futures, ready=sound_ready)
+
+    def _track(self, future):
+        self._futures.append(future)
+        return future
+
+    def _queue_image(self, futures, ready, key, pack_key, path, w, h):
+        # Pack images are ready (and display-converted) immediately; the rest are decoded by a worker
+        packed = self.pack.image(pack_key) if self.pack else None
+        if packed: ready[key] = packed
+        else: futures[key] = self._track(self._executor.submit(load_and_scale_image, path, w, h, convert=False))
+
+    def submit(self, name, fn, *args):
+        """ Queues an extra named job (counted in progress); fetch it with result(name). """
+        self._jobs[name] = self._track(self._executor.submit(fn, *args))
+
+    def submit_once(self, name, fn, *args):
+        """ submit() unless a job of that name is queued or finished (a failed one is retried). Returns its Future. """
+        future = self._jobs.get(name)
+        if future is None or (future.done() and not future.cancelled() and future.exception() is not None):
+            self.submit(name, fn, *args)
+        return self._jobs[name]
+
+    def job(self, name):
+        """ The Future of a submit()ted job. """
+        return self._jobs[name]
+
+    def result(self, name):
+        """ Result of a submit()ted job, waiting for it if necessary. """
+        return self._jobs[name].result()
+
+    def progress(self):
+        """ (finished jobs, total jobs). Assets served from the pack are not jobs. """
+        return sum(1 for f in self._futures if f.done()), len(self._futures)
+
+    @property
+    def done(self):
+        return all(f.done() for f in self._futures)
+
+    def poll(self):
+        """ Call once per frame on the main thread: converts finished images so gameplay doesn't have to. """
+        self.images.finish_ready()
+        self.images['powerups'].finish_ready()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
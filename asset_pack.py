@@ -0,0 +1,202 @@
+# /Users/junluo/Desktop/PlaneWar/asset_pack.py
+"""
+Prebaked binary asset pack.
+
+build_asset_pack() decodes every image in assets.IMAGE_CONFIGS /
+POWERUP_IMAGE_CONFIGS (already scaled to sprite size) and every sound in
+SOUND_CONFIGS (as PCM in the mixer's format) and writes them into one file:
+
+    b"PWPACK" | u16 version | u32 index length | index JSON | blobs...
+
+The JSON index records each blob's offset/length plus the fingerprint of the
+sources it was built from (path, size and mtime of every file, target sizes,
+volumes) and the mixer format. open_asset_pack() memory-maps the file and
+rejects it if the version, fingerprint or mixer format no longer match, so a
+stale pack is never used. Surfaces are created with pygame.image.frombuffer
+and sounds with mixer.Sound(buffer=...) - no PNG/WAV/MP3 decoding at startup.
+
+Usage:
+    python asset_pack.py            # rebuild if stale
+    python asset_pack.py --force    # always rebuild
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import pygame
+from settings import *
+from assets import IMAGE_CONFIGS, POWERUP_IMAGE_CONFIGS, SOUND_CONFIGS, powerup_pack_key, load_sound
+
+PACK_MAGIC = b"PWPACK"
+PACK_VERSION = 1
+_HEADER = struct.Struct("<6sHI") # magic, version, index length
+_BLOB_ALIGN = 16
+
+
+def _image_sources():
+    """ pack key -> (path, width, height) for every packable image. """
+    sources = dict(IMAGE_CONFIGS)
+    for type_key, config in POWERUP_IMAGE_CONFIGS.items():
+        sources[powerup_pack_key(type_key)] = config
+    return sources
+
+def source_fingerprint():
+    """ Hash of everything the pack content depends on. Only stats files, so it is cheap at startup. """
+    digest = hashlib.sha1(f"v{PACK_VERSION}".encode())
+    entries = [('image', key, path, (w, h)) for key, (path, w, h) in _image_sources().items()]
+    entries += [('sound', key, path, vol) for key, (path, vol) in SOUND_CONFIGS.items()]
+    for kind, key, path, params in sorted(entries, key=lambda e: (e[0], e[1])):
+        try:
+            st = os.stat(path)
+            stamp = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stamp = None # Missing source: still part of the key so adding it later invalidates the pack
+        digest.update(repr((kind, key, os.path.relpath(path, BASE_DIR), params, stamp)).encode())
+    return digest.hexdigest()
+
+
+def build_asset_pack(path=ASSET_PACK_PATH):
+    """ Decodes all sources and writes the pack atomically. Needs the mixer initialized for sounds. """
+    blobs = []
+    index = {'version': PACK_VERSION, 'fingerprint': source_fingerprint(),
+             'mixer': list(pygame.mixer.get_init() or ()), 'images': {}, 'sounds': {}}
+    offset = 0
+
+    def add_blob(data):
+        nonlocal offset
+        pad = -offset % _BLOB_ALIGN
+        blobs.append(b"\0" * pad)
+        offset += pad
+        entry = {'offset': offset, 'length': len(data)}
+        blobs.append(data)
+        offset += len(data)
+        return entry
+
+    for key, (src, w, h) in _image_sources().items():
+        if not os.path.exists(src):
+            print(f"  Pack: skipping missing image {src}")
+            continue
+        try:
+            image = pygame.transform.scale(pygame.image.load(src), (w, h))
+        except pygame.error as e:
+            print(f"  Pack: failed to decode image {src}: {e}")
+            continue
+        entry = add_blob(pygame.image.tobytes(image, 'RGBA'))
+        entry['size'] = [w, h]
+        index['images'][key] = entry
+
+    if index['mixer']:
+        for key, (src, vol) in SOUND_CONFIGS.items():
+            sound = load_sound(src, vol)
+            if sound:
+                entry = add_blob(sound.get_raw())
+                entry['volume'] = vol
+                index['sounds'][key] = entry
+    else:
+        print("  Pack: mixer not initialized, sounds not packed.")
+
+    index_bytes = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    # Blob offsets are relative to the end of the header + index, padded to the alignment
+    data_start = _HEADER.size + len(index_bytes)
+    lead_pad = -data_start % _BLOB_ALIGN
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        f.write(b"\0" * lead_pad)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+    print(f"Asset pack written: {path} ({len(index['images'])} images, {len(index['sounds'])} sounds, "
+          f"{os.path.getsize(path) // 1024} KiB)")
+    return path
+
+
+class AssetPack:
+    """ A validated, memory-mapped pack. Keep it open while its Surfaces are in use. """
+    def __init__(self, path, file_obj, mm, index, data_start):
+        self.path = path
+        self._file = file_obj
+        self._mm = mm
+        self._view = memoryview(mm)
+        self.index = index
+        self.data_start = data_start
+
+    def _blob(self, entry):
+        start = self.data_start + entry['offset']
+        return self._view[start:start + entry['length']]
+
+    def image(self, key):
+        """ Surface for a pack key, or None if the pack doesn't have it. """
+        entry = self.index['images'].get(key)
+        if entry is None:
+            return None
+        # frombuffer shares the mapped pixels; convert_alpha (when there's a display) copies to screen format
+        image = pygame.image.frombuffer(self._blob(entry), tuple(entry['size']), 'RGBA')
+        return image.convert_alpha() if pygame.display.get_surface() else image
+
+    def sound(self, key):
+        """ mixer.Sound for a pack key, or None if missing / mixer unavailable. """
+        entry = self.index['sounds'].get(key)
+        if entry is None or not pygame.mixer.get_init():
+            return None
+        try:
+            sound = pygame.mixer.Sound(buffer=self._blob(entry))
+        except pygame.error as e:
+            print(f"Warning: Failed to create packed sound {key}: {e}")
+            return None
+        sound.set_volume(entry['volume'])
+        return sound
+
+
+def open_asset_pack(path=ASSET_PACK_PATH):
+    """ Maps and validates the pack. Returns an AssetPack, or None if missing, corrupt or stale. """
+    if not os.path.exists(path):
+        return None
+    f = mm = None
+    try:
+        f = open(path, 'rb')
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_len = _HEADER.unpack_from(mm, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"unsupported pack version {version}")
+        index = json.loads(mm[_HEADER.size:_HEADER.size + index_len].decode('utf-8'))
+
+        problem = None
+        mixer_format = list(pygame.mixer.get_init() or ())
+        if index.get('fingerprint') != source_fingerprint():
+            problem = "Asset pack is stale (sources changed)."
+        elif index['sounds'] and mixer_format and index.get('mixer') != mixer_format:
+            problem = f"Asset pack built for mixer {index.get('mixer')}, running {mixer_format}."
+        if problem:
+            print(f"Info: {problem} Decoding sources instead; run 'python asset_pack.py' to rebuild.")
+            mm.close(); f.close()
+            return None
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"Warning: Ignoring unreadable asset pack {path}: {e}")
+        if mm: mm.close()
+        if f: f.close()
+        return None
+
+    data_start = _HEADER.size + index_len
+    data_start += -data_start % _BLOB_ALIGN
+    return AssetPack(path, f, mm, index, data_start)
+
+
+def main():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    # Sounds are stored in the mixer's native format, so build with the game's mixer settings
+    pygame.mixer.init(frequency=MIXER_FREQUENCY, size=MIXER_SIZE, channels=MIXER_CHANNELS, buffer=MIXER_BUFFER)
+    if '--force' not in sys.argv and open_asset_pack() is not None:
+        print(f"Asset pack is up to date: {ASSET_PACK_PATH}")
+    else:
+        build_asset_pack()
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
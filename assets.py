@@ -0,0 +1,108 @@
+# /Users/junluo/Desktop/PlaneWar/assets.py
+"""
+Image and sound loading.
+
+IMAGE_CONFIGS / POWERUP_IMAGE_CONFIGS / SOUND_CONFIGS are the single list of
+game assets. load_images() and load_sounds() take them from a prebaked
+asset pack (asset_pack.py) when one is given and fall back to decoding the
+source files for anything the pack doesn't have.
+"""
+import pygame
+import random
+import os
+from settings import *
+
+# key -> (path, width, height); keys match the level 'enemy_types'
+IMAGE_CONFIGS = {
+    'player': (PLAYER_IMG_PATH, PLAYER_WIDTH, PLAYER_HEIGHT),
+    'enemy1': (ENEMY1_IMG_PATH, ENEMY1_WIDTH, ENEMY1_HEIGHT),
+    'enemy2': (ENEMY2_IMG_PATH, ENEMY2_WIDTH, ENEMY2_HEIGHT),
+    'enemy3': (ENEMY3_IMG_PATH, ENEMY3_WIDTH, ENEMY3_HEIGHT),
+    'enemy4': (ENEMY4_IMG_PATH, ENEMY4_WIDTH, ENEMY4_HEIGHT),
+    'boss':   (ENEMY_BOSS_IMG_PATH, ENEMY_BOSS_WIDTH, ENEMY_BOSS_HEIGHT),
+}
+# powerup type -> (path, width, height); loaded into images['powerups']
+POWERUP_IMAGE_CONFIGS = {type_key: (path, POWERUP_WIDTH, POWERUP_HEIGHT) for type_key, path in POWERUP_IMAGES.items()}
+# key -> (path, volume)
+SOUND_CONFIGS = {
+    'player_shoot': (SHOOT_SOUND_PATH, PLAYER_SHOOT_VOLUME),
+    'enemy_explode': (ENEMY_EXPLODE_SOUND_PATH, ENEMY_EXPLODE_VOLUME),
+    'boss_explode': (BOSS_EXPLODE_SOUND_PATH, BOSS_EXPLODE_VOLUME),
+    'powerup_pickup': (POWERUP_PICKUP_SOUND_PATH, POWERUP_PICKUP_VOLUME),
+    'game_win': (WIN_SOUND_PATH, WIN_VOLUME),
+    'player_lose': (LOSE_SOUND_PATH, LOSE_VOLUME),
+    'boss_intro': (BOSS_INTRO_SOUND_PATH, BOSS_INTRO_VOLUME),
+    'boss_hit': (BOSS_HIT_SOUND_PATH, BOSS_HIT_VOLUME),
+    'shield_up': (SHIELD_UP_SOUND_PATH, SHIELD_UP_VOLUME),
+    'shield_down': (SHIELD_DOWN_SOUND_PATH, SHIELD_DOWN_VOLUME),
+    'bomb': (BOMB_SOUND_PATH, BOMB_VOLUME),
+    'boss_shoot': (BOSS_SHOOT_SOUND_PATH, BOSS_SHOOT_VOLUME),
+}
+
+def powerup_pack_key(type_key):
+    """ Pack/index key used for a powerup image. """
+    return f"powerup:{type_key}"
+
+def load_and_scale_image(path, width, height, colorkey=None, convert=True):
+    """Loads, scales, handles errors, and sets transparency for an image.
+    convert=False skips convert_alpha (worker threads; the caller converts on the main thread)."""
+    if not path or not os.path.exists(path):
+        print(f"Error: Image file not found or path invalid: {path}. Using fallback.")
+        fallback = pygame.Surface((width, height))
+        fallback.fill((200, 50, 50)); pygame.draw.rect(fallback, WHITE, fallback.get_rect(), 1)
+        return fallback
+    try:
+        image = pygame.image.load(path)
+        # convert_alpha needs a display mode; headless runs keep the raw surface
+        if convert and pygame.display.get_surface(): image = image.convert_alpha()
+        scaled_image = pygame.transform.scale(image, (width, height))
+        if colorkey is not None:
+            if colorkey == -1: colorkey = scaled_image.get_at((0, 0))
+            scaled_image.set_colorkey(colorkey, pygame.RLEACCEL)
+        # print(f"Successfully loaded and scaled: {os.path.basename(path)}")
+        return scaled_image
+    except pygame.error as e:
+        print(f"Warning: Failed to load/process image {path}: {e}. Using fallback.")
+        fallback = pygame.Surface((width, height))
+        fallback.fill((random.randint(50, 200), random.randint(50, 200), random.randint(50, 200)))
+        pygame.draw.rect(fallback, WHITE, fallback.get_rect(), 1)
+        return fallback
+
+def load_sound(path, volume):
+    """Loads a sound file, sets volume, and handles errors."""
+    if not pygame.mixer or not pygame.mixer.get_init():
+        print("Mixer not initialized, cannot load sound.")
+        return None
+    if not path or not os.path.exists(path):
+        print(f"Warning: Sound file not found or path invalid: {path}")
+        return None
+    try:
+        sound = pygame.mixer.Sound(path)
+        sound.set_volume(volume)
+        # print(f"Successfully loaded sound: {os.path.basename(path)}")
+        return sound
+    except pygame.error as e:
+        print(f"Warning: Failed to load sound {path}: {e}")
+        return None
+
+def load_images(pack=None):
+    """Loads and scales every sprite image. Returns a dict keyed like the level 'enemy_types'."""
+    images = {}
+    for key, (path, w, h) in IMAGE_CONFIGS.items():
+        images[key] = (pack and pack.image(key)) or load_and_scale_image(path, w, h)
+
+    images['powerups'] = {}
+    for type_key, (path, w, h) in POWERUP_IMAGE_CONFIGS.items():
+        img = (pack and pack.image(powerup_pack_key(type_key))) or load_and_scale_image(path, w, h)
+        if img: images['powerups'][type_key] = img
+        else: print(f"Warning: Failed to load powerup image for type '{type_key}'")
+    return images
+
+def load_sounds(pack=None):
+    """Loads every sound effect. Sounds that fail to load are left out of the dict."""
+    sounds = {}
+    for key, (path, vol) in SOUND_CONFIGS.items():
+        snd = (pack and pack.sound(key)) or load_sound(path, vol)
+        if snd: sounds[key] = snd
+        # No warning here as load_sound already prints warnings
+    return sounds
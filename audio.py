@@ -0,0 +1,103 @@
+# /Users/junluo/Desktop/PlaneWar/audio.py
+"""
+Channel-pooled sound effect scheduler.
+
+Game code calls trigger('enemy_explode') instead of Sound.play(). Triggers
+are collected during the frame and flush() plays them once per frame:
+
+- Same-frame coalescing: ten enemies dying on one frame trigger one
+  'enemy_explode' voice, not ten (counted as merged).
+- Fixed channel pool: the scheduler owns AUDIO_CHANNELS mixer channels.
+  A sound takes a free channel; if none is free it steals the channel
+  playing the lowest-priority (then oldest) sound, as long as that sound's
+  priority is below its own (SOUND_PRIORITIES). Otherwise it is dropped.
+
+stats() exposes the triggered / played / merged / stolen / dropped counters.
+Without a mixer (headless) or without the sound loaded, triggers are no-ops.
+"""
+import pygame
+from settings import *
+
+
+class AudioScheduler:
+    """ Plays named sounds on a fixed pool of mixer channels, at most once per sound per frame. """
+    def __init__(self, sounds, num_channels=AUDIO_CHANNELS, priorities=SOUND_PRIORITIES):
+        self.sounds = sounds
+        self.priorities = priorities
+        self.channels = []
+        if pygame.mixer and pygame.mixer.get_init():
+            if pygame.mixer.get_num_channels() < num_channels:
+                pygame.mixer.set_num_channels(num_channels)
+            self.channels = [pygame.mixer.Channel(i) for i in range(num_channels)]
+        self._owners = [None] * len(self.channels) # (priority, flush number) of the voice each channel was given
+        self._pending = [] # Keys triggered this frame, first trigger order
+        self._pending_set = set()
+        self.flushes = 0
+
+        self.triggered = 0
+        self.played = 0
+        self.merged = 0
+        self.stolen = 0
+        self.dropped = 0
+
+    def trigger(self, key):
+        """ Requests a sound for this frame. Duplicates within the frame are merged. """
+        if not self.channels:
+            return
+        self.triggered += 1
+        if key in self._pending_set:
+            self.merged += 1
+            return
+        self._pending_set.add(key)
+        self._pending.append(key)
+
+    def _pick_channel(self, priority):
+        """ Index of a free channel, else of the channel to steal, else None. """
+        victim, victim_owner = None, None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return i
+            # A busy channel we didn't start (e.g. from a previous level) is the cheapest to steal
+            owner = self._owners[i] or (-1, -1)
+            if victim is None or owner < victim_owner:
+                victim, victim_owner = i, owner
+        if victim is not None and victim_owner[0] < priority:
+            self.stolen += 1
+            return victim
+        return None
+
+    def flush(self):
+        """ Plays this frame's triggers, highest priority first. Call once per frame. """
+        self.flushes += 1
+        if not self._pending:
+            return
+        pending = sorted(self._pending, key=lambda k: -self.priorities.get(k, 0)) # Stable: ties keep trigger order
+        self._pending.clear()
+        self._pending_set.clear()
+        for key in pending:
+            sound = self.sounds.get(key)
+            if not sound:
+                continue
+            priority = self.priorities.get(key, 0)
+            index = self._pick_channel(priority)
+            if index is None:
+                self.dropped += 1
+                continue
+            try:
+                self.channels[index].play(sound)
+            except pygame.error as e:
+                print(f"Warning: Could not play {key} sound: {e}")
+                continue
+            self._owners[index] = (priority, self.flushes)
+            self.played += 1
+
+    def stop_all(self):
+        for channel in self.channels:
+            channel.stop()
+        self._owners = [None] * len(self.channels)
+        self._pending.clear()
+        self._pending_set.clear()
+
+    def stats(self):
+        return {'channels': len(self.channels), 'triggered': self.triggered, 'played': self.played,
+                'merged': self.merged, 'stolen': self.stolen, 'dropped': self.dropped}
@@ -0,0 +1,161 @@
+# /Users/junluo/Desktop/PlaneWar/autopilot.py
+"""
+Autopilot bot for soak tests and demos.
+
+Autopilot.decide(state) returns the FrameInput a player would give this frame
+(ship position, fire, bomb), so it drops in wherever main.read_frame_input or
+a scripted input function is used. Each frame it:
+
+1. Rebuilds its own SpatialHash grids over enemies, boss bullets and power-ups
+   (vectorized, O(entities)); the level's grids are stale after compact().
+2. Queries them for rows in a box around the ship (AUTOPILOT_SCAN_*), so the
+   scoring below only sees the handful of nearby threats, not every entity.
+3. Scores a few candidate moves (up to AUTOPILOT_SPEED px in each direction).
+   For every candidate/threat pair, the time until the threat's box (moving at
+   its current velocity) touches the ship's box is solved in closed form,
+   AUTOPILOT_LOOKAHEAD_FRAMES ahead. Sooner contact = more danger. Lining up
+   under the lowest enemy in range (or the boss), staying near the bottom and
+   reaching power-ups make a candidate cheaper.
+4. Moves to the cheapest candidate and keeps firing. The bomb is used when
+   every candidate is still hit by an enemy within BOMB_PANIC_FRAMES.
+
+The bot only reads the state, so its inputs are deterministic and replays of
+bot runs reproduce like any other recording.
+"""
+import numpy as np
+import pygame
+from settings import *
+from simulation import FrameInput
+from spatial_hash import SpatialHash
+
+DANGER_WEIGHT = 10.0 # Contact now costs this; contact t frames ahead costs DANGER_WEIGHT / (1 + t)
+AIM_WEIGHT = 1.0     # Per screen width away from the aim point
+HOME_WEIGHT = 1.0    # Per screen height away from the home row
+PICKUP_WEIGHT = 2.0  # Per screen width away from the nearest power-up
+BOMB_PANIC_FRAMES = 3
+
+
+def _axis_interval(d0, v, r):
+    """ Frames (enter, exit) during which |d0 + v * t| < r, elementwise. Stationary: always or never. """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = (-r - d0) / v
+        b = (r - d0) / v
+    enter, exit_ = np.minimum(a, b), np.maximum(a, b)
+    still = np.broadcast_to(v == 0, d0.shape)
+    inside = np.abs(d0) < r
+    enter = np.where(still, np.where(inside, -np.inf, np.inf), enter)
+    exit_ = np.where(still, np.where(inside, np.inf, -np.inf), exit_)
+    return enter, exit_
+
+
+class Autopilot:
+    """ Bot pilot. decide(state) -> FrameInput. enabled is the interactive on/off switch. """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.enemy_grid = SpatialHash()
+        self.bullet_grid = SpatialHash()
+        self.powerup_grid = SpatialHash()
+        self.home_y = SCREEN_HEIGHT - 60
+        steps = np.linspace(-AUTOPILOT_SPEED, AUTOPILOT_SPEED, 7)
+        self._moves = np.array([(dx, dy) for dy in (-AUTOPILOT_SPEED, 0, AUTOPILOT_SPEED) for dx in steps], dtype=float)
+        self.bombs_used = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        print(f"Autopilot {'on' if self.enabled else 'off'}")
+
+    # --- Queries ---
+    def _threats(self, state, px, py):
+        """ Nearby enemies, boss bullets and the boss as (cx, cy, half_w, half_h, vx, vy, is_enemy) arrays. """
+        region = pygame.Rect(px - AUTOPILOT_SCAN_SIDE, py - AUTOPILOT_SCAN_ABOVE,
+                             AUTOPILOT_SCAN_SIDE * 2, SCREEN_HEIGHT + AUTOPILOT_SCAN_ABOVE)
+        parts = []
+        for grid, store, is_enemy in ((self.enemy_grid, state.enemies, True),
+                                      (self.bullet_grid, state.enemy_bullets, False)):
+            rows = grid.query_rect(region)
+            if rows.size:
+                w, h = store.w[rows], store.h[rows]
+                parts.append((store.x[rows] + w / 2, store.y[rows] + h / 2, w / 2, h / 2,
+                              store.vx[rows], store.vy[rows], np.full(rows.size, is_enemy)))
+        boss = state.boss_instance
+        if state.boss_active and boss and boss.rect.colliderect(region):
+            vx = boss.speedx if boss.entered else 0
+            vy = 0 if boss.entered else boss.entry_speedy
+            r = boss.rect
+            parts.append(tuple(np.array([v], dtype=float) for v in (r.centerx, r.centery, r.width / 2, r.height / 2, vx, vy))
+                         + (np.array([False]),))
+        if not parts:
+            return None
+        return [np.concatenate(column).astype(float) if i < 6 else np.concatenate(column)
+                for i, column in enumerate(zip(*parts))]
+
+    def _aim_x(self, state, px, py):
+        """ x to line up on: where the lowest enemy in aim range will be when a bullet gets there; else the boss. """
+        band = pygame.Rect(px - AUTOPILOT_AIM_RANGE, 0, AUTOPILOT_AIM_RANGE * 2, max(1, py))
+        rows = self.enemy_grid.query_rect(band)
+        if rows.size:
+            enemies = state.enemies
+            i = rows[np.argmax(enemies.y[rows] + enemies.h[rows])]
+            tx, ty = enemies.x[i] + enemies.w[i] / 2, enemies.y[i] + enemies.h[i] / 2
+            dt = max(0.0, py - ty) / (BULLET_SPEED + max(enemies.vy[i], 0))
+            return float(np.clip(tx + enemies.vx[i] * dt, 0, SCREEN_WIDTH))
+        if state.boss_active and state.boss_instance:
+            return state.boss_instance.rect.centerx
+        return SCREEN_WIDTH / 2
+
+    def _pickup_target(self, state, px, py):
+        """ Centre of the nearest power-up in range, or None. """
+        region = pygame.Rect(px - AUTOPILOT_AIM_RANGE, py - AUTOPILOT_SCAN_ABOVE,
+                             AUTOPILOT_AIM_RANGE * 2, SCREEN_HEIGHT)
+        rows = self.powerup_grid.query_rect(region)
+        if not rows.size:
+            return None
+        p = state.powerups
+        cx, cy = p.x[rows] + p.w[rows] / 2, p.y[rows] + p.h[rows] / 2
+        i = np.argmin((cx - px) ** 2 + (cy - py) ** 2)
+        return cx[i], cy[i]
+
+    # --- Decision ---
+    def decide(self, state):
+        player = state.player
+        px, py = player.rect.center
+        if not player.alive():
+            return FrameInput((px, py))
+        self.enemy_grid.build(state.enemies)
+        self.bullet_grid.build(state.enemy_bullets)
+        self.powerup_grid.build(state.powerups)
+
+        half_w = player.rect.width / 2
+        half_h = player.rect.height / 2
+        cand_x = np.clip(px + self._moves[:, 0], half_w, SCREEN_WIDTH - half_w)
+        cand_y = np.clip(py + self._moves[:, 1], half_h, SCREEN_HEIGHT - half_h)
+
+        # Candidate x threat matrix of first-contact frames (inf = no contact within the lookahead)
+        contact = np.full((len(cand_x), 1), np.inf)
+        threats = self._threats(state, px, py)
+        if threats is not None:
+            tcx, tcy, thw, thh, tvx, tvy, is_enemy = threats
+            enter_x, exit_x = _axis_interval(tcx[None, :] - cand_x[:, None], tvx, thw + half_w + AUTOPILOT_MARGIN)
+            enter_y, exit_y = _axis_interval(tcy[None, :] - cand_y[:, None], tvy, thh + half_h + AUTOPILOT_MARGIN)
+            enter = np.maximum(np.maximum(enter_x, enter_y), 0)
+            exit_ = np.minimum(np.minimum(exit_x, exit_y), AUTOPILOT_LOOKAHEAD_FRAMES)
+            contact = np.where(enter < exit_, enter, np.inf)
+        danger = (1.0 / (1.0 + contact)).sum(axis=1)
+        lookahead_ms = AUTOPILOT_LOOKAHEAD_FRAMES * 1000 / FPS
+        if player.shield_active and player.shield_end_time - state.now > lookahead_ms:
+            danger[:] = 0 # Nothing can hurt us before the shield runs out
+
+        cost = (DANGER_WEIGHT * danger
+                + AIM_WEIGHT * np.abs(cand_x - self._aim_x(state, px, py)) / SCREEN_WIDTH
+                + HOME_WEIGHT * np.abs(cand_y - self.home_y) / SCREEN_HEIGHT)
+        pickup = self._pickup_target(state, px, py)
+        if pickup is not None:
+            cost += PICKUP_WEIGHT * np.hypot(cand_x - pickup[0], cand_y - pickup[1]) / SCREEN_WIDTH
+        best = int(np.argmin(cost))
+
+        bomb = False
+        if threats is not None and player.bomb_count > 0 and not player.shield_active and state.now > STARTUP_GRACE_PERIOD:
+            # Bombs only clear enemies, so only enemy contacts count
+            bomb = bool((contact[:, is_enemy] <= BOMB_PANIC_FRAMES).any(axis=1).all())
+            if bomb: self.bombs_used += 1
+        return FrameInput((int(round(cand_x[best])), int(round(cand_y[best]))), fire=True, bomb=bomb)
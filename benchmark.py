@@ -0,0 +1,301 @@
+# /Users/junluo/Desktop/PlaneWar/benchmark.py
+"""
+Headless stress benchmarks with regression thresholds.
+
+Each scenario is a fixed, seeded level run with the SDL dummy drivers: the
+real simulation.step_level (Player, EnemyBoss, the entity stores, spatial-hash
+collisions) plus renderer.FullRenderer drawing into the dummy display. Stress
+is applied by topping the stores up every frame, and the player is kept
+shielded so a scenario always runs its full length.
+
+    enemies_500       500 regular enemies on screen, player firing
+    bullets_5k        5000 player bullets in flight over 60 enemies
+    boss_double_shot  boss fight with double_shot held down (boss kept alive)
+    bomb_full_screen  a screen packed with enemies, bombed every second
+    collide_rect      400 enemies under 3000 bullets, box collisions only
+    collide_mask      the same load with the pixel-mask narrowphase
+    boss_bullet_hell  boss firing rings, spirals and aimed fans: thousands of boss bullets
+
+Per scenario it reports frames/s, p50/p95/p99 frame time and the mean time of
+the collision phase (FrameProfiler, first BENCHMARK_WARMUP_FRAMES frames not
+measured); collide_rect vs collide_mask shows what pixel accuracy costs. Results are compared with a
+baseline file; a scenario whose frames/s drops, or whose p95/p99 grows, by more
+than the tolerance counts as a regression and the exit code is 1.
+
+Usage:
+    python benchmark.py                       # run all, compare with build/benchmark_baseline.json
+    python benchmark.py --save-baseline       # run all and store the results as the baseline
+    python benchmark.py --scenario bullets_5k --frames 1200 --tolerance 0.25
+    python benchmark.py --json build/bench.json
+
+Baselines are machine-specific: save one on the machine you compare on.
+"""
+import os
+# Must be set before pygame is imported anywhere
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import io
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import contextlib
+import numpy as np
+import pygame
+from settings import *
+from assets import load_images
+from asset_pack import open_asset_pack
+from level_compiler import compile_level
+from simulation import LevelState, FrameInput, step_level
+from enemy import roll_enemy_speed
+from bullet import spawn_bullet
+from renderer import FullRenderer
+from profiler import FrameProfiler
+
+NEVER = 10 ** 12 # Simulated ms; "until the end of the run"
+
+
+def _sweeping_input(frame, fire=True, bomb=False):
+    """ Same pilot as headless.scripted_input, without its periodic bomb. """
+    x = SCREEN_WIDTH // 2 + int((SCREEN_WIDTH // 2 - PLAYER_WIDTH) * math.sin(frame / 90))
+    return FrameInput((x, SCREEN_HEIGHT - 60), fire=fire, bomb=bomb)
+
+def _keep_alive(state):
+    """ Permanent shield, so enemies and boss bullets can't end the run. """
+    state.player.shield_active = True
+    state.player.shield_end_time = NEVER
+
+def _fill_enemies(state, rng, target, top=0, bottom=SCREEN_HEIGHT * 2 // 3):
+    """ Spawns on-screen enemies (y between top and bottom) until target are alive. """
+    missing = target - len(state.enemies)
+    if missing <= 0 or not state.random_enemy_kinds:
+        return
+    for _ in range(missing):
+        kind = rng.choice(state.random_enemy_kinds)
+        width, height = state.available_enemy_images[kind].get_size()
+        speedx, speedy = roll_enemy_speed(state.enemy_speed_y_range, state.enemy_speed_x_range, rng)
+        state.enemies.spawn(rng.randint(0, SCREEN_WIDTH - width), rng.randint(top, max(top, bottom - height)),
+                            speedx, speedy, width, height, kind)
+
+def _fill_bullets(state, rng, target):
+    for _ in range(target - len(state.bullets)):
+        spawn_bullet(state.bullets, rng.randint(0, SCREEN_WIDTH), rng.randint(0, SCREEN_HEIGHT))
+
+
+# --- Scenarios ---
+# Each frame hook is called before step_level and returns that frame's FrameInput.
+
+def _enemies_500(state, rng, frame):
+    _fill_enemies(state, rng, 500)
+    return _sweeping_input(frame)
+
+def _bullets_5k(state, rng, frame):
+    _fill_enemies(state, rng, 60, bottom=SCREEN_HEIGHT // 3)
+    _fill_bullets(state, rng, 5000)
+    return _sweeping_input(frame)
+
+def _boss_double_shot(state, rng, frame):
+    player = state.player
+    if player.powerup_type != 'double_shot':
+        player.activate_powerup('double_shot', state.now)
+    player.powerup_end_time = NEVER
+    if state.boss_instance:
+        state.boss_instance.health = state.boss_instance.max_health # Never dies, so the fight never ends
+    # Stay under the boss so most shots hit it
+    boss_x = state.boss_instance.rect.centerx if state.boss_instance else SCREEN_WIDTH // 2
+    return FrameInput((boss_x, SCREEN_HEIGHT - 60), fire=True)
+
+def _bomb_full_screen(state, rng, frame):
+    _fill_enemies(state, rng, 800, bottom=SCREEN_HEIGHT - PLAYER_HEIGHT * 3)
+    state.player.bomb_count = max(state.player.bomb_count, 1)
+    return _sweeping_input(frame, bomb=(frame % FPS == FPS - 1))
+
+def _boss_bullet_hell(state, rng, frame):
+    boss = state.boss_instance
+    if boss:
+        boss.health = boss.max_health
+        if not boss.entered: boss.rect.centery = boss.entry_y # Skip the slow entry; patterns start next frame
+    return _sweeping_input(frame)
+
+# Dense enough to keep several thousand boss bullets alive at once
+BULLET_HELL_PATTERNS = [
+    {'type': 'ring', 'count': 72, 'speed': 2.5, 'every_ms': 100},
+    {'type': 'spiral', 'count': 6, 'speed': 3, 'spin': 7, 'every_ms': 33},
+    {'type': 'aimed', 'count': 9, 'spread': 50, 'speed': 4, 'every_ms': 500, 'burst': 3, 'burst_gap_ms': 66},
+    {'type': 'ring', 'count': 36, 'speed': 6, 'accel': -0.08, 'accel_frames': 60, 'angle': 5, 'every_ms': 250},
+]
+
+def _collide(pixel):
+    def hook(state, rng, frame):
+        state.pixel_collisions = pixel
+        _fill_enemies(state, rng, 400, bottom=SCREEN_HEIGHT // 2)
+        _fill_bullets(state, rng, 3000)
+        return _sweeping_input(frame)
+    return hook
+
+# name -> (description, level overrides, frame hook)
+SCENARIOS = {
+    'enemies_500': ("500 enemies on screen", {}, _enemies_500),
+    'bullets_5k': ("5000 player bullets over 60 enemies", {}, _bullets_5k),
+    'boss_double_shot': ("boss fight, double_shot held", {'is_boss_level': True, 'boss_appear_delay_seconds': 0.05,
+                                                           'max_on_screen': 0}, _boss_double_shot),
+    'bomb_full_screen': ("800 enemies bombed every second", {}, _bomb_full_screen),
+    'collide_rect': ("400 enemies x 3000 bullets, box collisions", {}, _collide(False)),
+    'collide_mask': ("400 enemies x 3000 bullets, pixel masks", {}, _collide(True)),
+    'boss_bullet_hell': ("boss bullet patterns, thousands of bullets", {'is_boss_level': True, 'max_on_screen': 0,
+                         'boss_appear_delay_seconds': 0.05, 'boss_patterns': BULLET_HELL_PATTERNS}, _boss_bullet_hell),
+}
+
+def scenario_level(overrides):
+    """ Compiled level config for a scenario: no periodic spawns or power-ups unless a scenario asks. """
+    raw = {'level_number': 1, 'enemy_types': ['enemy1', 'enemy2', 'enemy3'],
+           'spawn_interval': 10 ** 6, 'powerup_interval': 10 ** 9}
+    raw.update(overrides)
+    return compile_level(raw, "<benchmark>")
+
+
+def run_scenario(name, images, renderer, frames, warmup, seed):
+    """ Runs one scenario. Returns its result dict (fps and frame-time percentiles in ms). """
+    description, overrides, frame_hook = SCENARIOS[name]
+    rng = random.Random(f"{seed}:{name}")
+    profiler = FrameProfiler(capacity=frames)
+    # The game's progress prints (bombs, boss spawn) would otherwise flood the report and skew timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = LevelState(scenario_level(overrides), images, seed=seed)
+        _keep_alive(state)
+        for _ in range(warmup):
+            step_level(state, frame_hook(state, rng, state.frame))
+            renderer.render(state)
+        peak_entities = 0
+        start = time.perf_counter()
+        for _ in range(frames):
+            profiler.begin_frame()
+            frame_input = frame_hook(state, rng, state.frame)
+            profiler.mark('events')
+            step_level(state, frame_input, profiler)
+            renderer.render(state, profiler)
+            profiler.end_frame()
+            peak_entities = max(peak_entities, len(state.enemies) + len(state.bullets) + len(state.enemy_bullets))
+        wall = time.perf_counter() - start
+    if state.finished:
+        print(f"Warning: scenario {name} ended early ({state.result}); results are not comparable.")
+    summary = profiler.summary()
+    frame_ms = profiler.durations_ms().sum(axis=1)
+    return {
+        'description': description,
+        'frames': frames,
+        'fps': frames / wall if wall > 0 else float('inf'),
+        'p50_ms': float(np.percentile(frame_ms, 50)),
+        'p95_ms': float(np.percentile(frame_ms, 95)),
+        'p99_ms': float(np.percentile(frame_ms, 99)),
+        'peak_entities': peak_entities,
+        'phases_ms': {phase: round(p['mean_ms'], 4) for phase, p in summary['phases'].items() if p['mean_ms']},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Checks results against baseline scenarios. Returns {name: [regression messages]};
+    lower fps or higher p95/p99 beyond tolerance is a regression.
+    """
+    regressions = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        problems = []
+        if result['fps'] < base['fps'] * (1 - tolerance):
+            problems.append(f"fps {result['fps']:.0f} < {base['fps']:.0f}")
+        for key in ('p95_ms', 'p99_ms'):
+            if result[key] > base[key] * (1 + tolerance):
+                problems.append(f"{key} {result[key]:.2f} > {base[key]:.2f}")
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+def load_baseline(path):
+    """ Baseline scenarios dict from a --save-baseline file, or None if missing/unreadable. """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read benchmark baseline {path}: {e}")
+        return None
+
+def write_results(path, results, seed):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = {'machine': platform.node(), 'python': platform.python_version(), 'pygame': pygame.version.ver,
+            'seed': seed, 'created': time.strftime("%Y-%m-%d %H:%M:%S"), 'scenarios': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def print_report(results, baseline, regressions):
+    print(f"{'scenario':<18} {'fps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'collide':>8} {'peak':>6}  vs baseline")
+    for name, r in results.items():
+        base = baseline.get(name) if baseline else None
+        if base:
+            change = f"{(r['fps'] / base['fps'] - 1) * 100:+.1f}% fps"
+            change += "  REGRESSION: " + ", ".join(regressions[name]) if name in regressions else "  ok"
+        else:
+            change = "-"
+        print(f"{name:<18} {r['fps']:>8.0f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['phases_ms'].get('collide', 0):>8.3f} {r['peak_entities']:>6}  {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the PlaneWar stress benchmarks and check for regressions.")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help="Only run this scenario (repeatable)")
+    parser.add_argument('--frames', type=int, default=BENCHMARK_FRAMES, help="Measured frames per scenario")
+    parser.add_argument('--warmup', type=int, default=BENCHMARK_WARMUP_FRAMES, help="Unmeasured frames first")
+    parser.add_argument('--seed', type=int, default=BENCHMARK_SEED)
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE_PATH, help="Baseline file to compare with / save to")
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE, help="Allowed slowdown, e.g. 0.15 = 15%%")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results to PATH")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    try:
+        font = pygame.font.Font(UI_FONT_PATH, FONT_SIZE_SCORE)
+    except (FileNotFoundError, pygame.error):
+        font = pygame.font.SysFont(None, FONT_SIZE_SCORE)
+    images = load_images(open_asset_pack() if USE_ASSET_PACK else None)
+    renderer = FullRenderer(screen, font)
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(name, images, renderer, args.frames, args.warmup, args.seed)
+    pygame.quit()
+
+    baseline_data = None if args.save_baseline else load_baseline(args.baseline)
+    baseline = baseline_data.get('scenarios', {}) if baseline_data else None
+    if baseline_data and (baseline_data.get('seed') != args.seed
+                          or any(name in baseline and baseline[name]['frames'] != r['frames'] for name, r in results.items())):
+        print("Warning: baseline was recorded with a different seed or frame count; comparison is approximate.")
+    regressions = compare(results, baseline, args.tolerance) if baseline else {}
+    print_report(results, baseline, regressions)
+
+    if args.json:
+        print(f"Results written: {write_results(args.json, results, args.seed)}")
+    if args.save_baseline:
+        print(f"Baseline saved: {write_results(args.baseline, results, args.seed)}")
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+    elif regressions:
+        print(f"{len(regressions)} scenario(s) regressed beyond {args.tolerance:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
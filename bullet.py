@@ -2,34 +2,33 @@
 import pygame
 from settings import *
 
-class Bullet(pygame.sprite.Sprite):
-    """ Represents a bullet fired by the player. """
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((BULLET_WIDTH, BULLET_HEIGHT))
-        self.image.fill(YELLOW)
-        self.rect = self.image.get_rect(center=(x, y))
-        self.speedy = -BULLET_SPEED
+# Bullets live as rows in an entity_store.ProjectilePool rather than as Sprites.
+# These helpers keep the old Bullet / EnemyBullet spawn geometry.
 
-    def update(self):
-        """ Move the bullet up the screen. """
-        self.rect.y += self.speedy
-        # Kill if it moves off the top of the screen
-        if self.rect.bottom < 0:
-            self.kill()
+# One pre-rendered surface per projectile type, shared by every bullet of that type
+PROJECTILE_STYLES = {
+    'bullet': ((BULLET_WIDTH, BULLET_HEIGHT), YELLOW),
+    'enemy_bullet': ((ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT), ENEMY_BULLET_COLOR),
+}
+_projectile_surfaces = {}
 
-class EnemyBullet(pygame.sprite.Sprite):
-    """ Represents a bullet fired by an enemy (specifically the boss). """
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT))
-        self.image.fill(ENEMY_BULLET_COLOR)
-        self.rect = self.image.get_rect(centerx=x, top=y)
-        self.speedy = ENEMY_BULLET_SPEED_Y
+def get_projectile_surface(projectile_type):
+    """ Returns the cached surface for a projectile type, building it on first use. """
+    surface = _projectile_surfaces.get(projectile_type)
+    if surface is None:
+        size, color = PROJECTILE_STYLES[projectile_type]
+        surface = pygame.Surface(size)
+        surface.fill(color)
+        if pygame.display.get_surface(): surface = surface.convert()
+        _projectile_surfaces[projectile_type] = surface
+    return surface
 
-    def update(self):
-        """ Move the bullet down the screen. """
-        self.rect.y += self.speedy
-        # Kill if it moves off the bottom of the screen
-        if self.rect.top > SCREEN_HEIGHT:
-            self.kill()
\ No newline at end of file
+def spawn_bullet(bullet_store, x, y):
+    """ Spawns a player bullet centred on (x, y), moving up the screen. """
+    return bullet_store.spawn(x - BULLET_WIDTH // 2, y - BULLET_HEIGHT // 2, 0, -BULLET_SPEED,
+                              BULLET_WIDTH, BULLET_HEIGHT)
+
+def spawn_enemy_bullet(enemy_bullet_store, x, y):
+    """ Spawns a boss bullet with its top edge at y, centred on x, moving down the screen. """
+    return enemy_bullet_store.spawn(x - ENEMY_BULLET_WIDTH // 2, y, 0, ENEMY_BULLET_SPEED_Y,
+                                    ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT)
@@ -0,0 +1,141 @@
+# /Users/junluo/Desktop/PlaneWar/bullet_patterns.py
+"""
+Data-driven boss bullet patterns.
+
+A boss level lists its patterns under "boss_patterns" in the level JSON (see
+level_compiler.PATTERN_SCHEMA). Every pattern fires volleys on its own timer
+once the boss has entered:
+
+    fan     count bullets spread over `spread` degrees around `angle`
+    ring    count bullets evenly around the full circle, starting at `angle`
+    spiral  a ring whose starting angle turns by `spin` degrees every volley
+    aimed   a fan centred on the player (angle is ignored)
+
+Angles are in degrees, screen coordinates: 0 = right, 90 = straight down.
+Any pattern can also spin, fire `burst` volleys `burst_gap_ms` apart every
+`every_ms`, start `start_s` seconds after the boss arrives, run only while the
+boss's health is at or below `health_below` (a fraction, for boss phases), and
+change speed over time: `accel` px/frame^2 along the bullet's heading for the
+first `accel_frames` frames (0 = for its whole life). A bullet that is still on
+screen ENEMY_BULLET_MAX_FRAMES after it was fired (one decelerated to a stop
+never flies off) is removed.
+
+A volley is spawned with one vectorized spawn_many, and PatternBulletPool moves,
+accelerates and culls every boss bullet with array operations, so a boss can
+keep thousands of projectiles alive at 60 FPS. Patterns are deterministic (no
+RNG), so recordings still replay exactly.
+"""
+import math
+import numpy as np
+from settings import *
+from entity_store import ProjectilePool
+
+PATTERN_TYPES = ('fan', 'ring', 'spiral', 'aimed')
+
+
+class PatternBulletPool(ProjectilePool):
+    """
+    ProjectilePool with per-row acceleration (ax, ay) applied for accel_left more frames,
+    and a lifetime: rows are killed once life_left reaches 0.
+    """
+    COLUMNS = ProjectilePool.COLUMNS + ('ax', 'ay', 'accel_left', 'life_left')
+
+    def __init__(self, capacity, **kwargs):
+        super().__init__(capacity, **kwargs)
+        self.ax = np.zeros(self.capacity)
+        self.ay = np.zeros(self.capacity)
+        self.accel_left = np.zeros(self.capacity, dtype=np.int32) # Frames of acceleration remaining; < 0 = forever
+        self.life_left = np.zeros(self.capacity, dtype=np.int32)  # Frames until the row is culled
+
+    def spawn(self, x, y, vx, vy, w, h, kind=0):
+        i = super().spawn(x, y, vx, vy, w, h, kind)
+        self.ax[i] = self.ay[i] = 0.0
+        self.accel_left[i] = 0
+        self.life_left[i] = ENEMY_BULLET_MAX_FRAMES
+        return i
+
+    def spawn_many(self, x, y, vx, vy, w, h, kind=0, ax=0.0, ay=0.0, accel_frames=0):
+        """ Vectorized spawn with an acceleration; accel_frames 0 = accelerate for the bullet's whole life. """
+        start = self.count
+        super().spawn_many(x, y, vx, vy, w, h, kind)
+        s = slice(start, self.count)
+        self.ax[s], self.ay[s] = ax, ay
+        self.accel_left[s] = accel_frames if accel_frames > 0 else -1
+        no_accel = (self.ax[s] == 0) & (self.ay[s] == 0)
+        self.accel_left[s][no_accel] = 0 # Skipped by update()
+        self.life_left[s] = ENEMY_BULLET_MAX_FRAMES
+
+    def update(self):
+        n = self.count
+        if n:
+            accelerating = self.accel_left[:n] != 0
+            if accelerating.any():
+                self.vx[:n][accelerating] += self.ax[:n][accelerating]
+                self.vy[:n][accelerating] += self.ay[:n][accelerating]
+                counting = self.accel_left[:n] > 0
+                self.accel_left[:n][counting] -= 1
+            self.life_left[:n] -= 1
+            self.alive[:n] &= self.life_left[:n] > 0
+        super().update()
+
+
+class PatternRunner:
+    """ Fires one boss's patterns into a bullet store. update() once per step while the boss is in place. """
+    def __init__(self, patterns, bullet_store):
+        self.patterns = [dict(p) for p in patterns]
+        self.store = bullet_store
+        self.started = None # Simulated ms the boss finished its entry
+        self.volleys = 0
+        self._state = [{'next_ms': None, 'burst_left': 0, 'volley': 0} for _ in self.patterns]
+
+    def start(self, now):
+        self.started = now
+        for pattern, state in zip(self.patterns, self._state):
+            state['next_ms'] = now + int(pattern['start_s'] * 1000)
+            state['burst_left'] = 0
+            state['volley'] = 0
+
+    def _angles(self, pattern, volley, origin, target):
+        """ Heading of every bullet in this volley, in radians. """
+        count = pattern['count']
+        kind = pattern['type']
+        base = pattern['angle'] + pattern['spin'] * volley
+        if kind == 'aimed' and target is not None:
+            base = math.degrees(math.atan2(target[1] - origin[1], target[0] - origin[0])) + pattern['spin'] * volley
+        if kind in ('ring', 'spiral'):
+            degrees = base + np.arange(count) * (360.0 / count)
+        elif count == 1:
+            degrees = np.array([base], dtype=float)
+        else:
+            degrees = base + np.linspace(-pattern['spread'] / 2, pattern['spread'] / 2, count)
+        return np.radians(degrees)
+
+    def _fire(self, pattern, volley, origin, target):
+        angles = self._angles(pattern, volley, origin, target)
+        cos, sin = np.cos(angles), np.sin(angles)
+        speed, accel = pattern['speed'], pattern['accel']
+        w, h = ENEMY_BULLET_WIDTH, ENEMY_BULLET_HEIGHT
+        self.store.spawn_many(origin[0] - w / 2, origin[1] - h / 2, speed * cos, speed * sin, w, h,
+                              ax=accel * cos, ay=accel * sin, accel_frames=pattern['accel_frames'])
+        self.volleys += 1
+
+    def update(self, now, origin, target=None, health_fraction=1.0):
+        """ Fires every volley that is due. origin: (x, y) muzzle; target: player centre. Returns volleys fired. """
+        if self.started is None:
+            return 0
+        fired = 0
+        for pattern, state in zip(self.patterns, self._state):
+            if health_fraction > pattern['health_below'] or now < state['next_ms']:
+                continue
+            self._fire(pattern, state['volley'], origin, target)
+            state['volley'] += 1
+            fired += 1
+            if state['burst_left'] == 0:
+                state['burst_left'] = pattern['burst'] - 1 # Volleys still to come in this burst
+            else:
+                state['burst_left'] -= 1
+            if state['burst_left'] > 0:
+                state['next_ms'] = now + pattern['burst_gap_ms']
+            else:
+                state['next_ms'] = now + pattern['every_ms']
+        return fired
@@ -0,0 +1,153 @@
+# /Users/junluo/Desktop/PlaneWar/collision_masks.py
+"""
+Pixel-accurate collision narrowphase.
+
+The spatial hash (and Rect tests for the player and boss) stay the broadphase:
+they find the pairs whose boxes overlap. Only those candidate pairs are then
+checked with pygame.mask, so a bullet through the transparent corner of the
+120x90 boss or of a wide enemy sprite, or a near miss on the boss, no longer
+counts as a hit.
+
+Masks are built once per image (MaskCache, keyed by surface identity like
+sprite_variants.variant_cache) and never per check. A mask with every pixel set
+(projectiles, opaque power-up blocks) is flagged full: two full masks overlap
+whenever their boxes do, so those pairs skip the mask call entirely.
+
+The common case - solid bullets against enemy sprites - needs no per-pair call
+either: each enemy mask also gets a summed-area table, so "does any solid pixel
+of A lie under bullet box B" is four array lookups, done for all candidate
+pairs at once.
+
+Positions are truncated to whole pixels the same way the renderer draws them.
+"""
+import numpy as np
+import pygame
+from settings import *
+
+
+def _summed_area(mask):
+    """ (h + 1, w + 1) table: [y, x] = solid pixels in the mask's [0, x) x [0, y) corner. """
+    w, h = mask.get_size()
+    table = np.zeros((h + 1, w + 1), dtype=np.int32)
+    if w and h:
+        # Solid pixels render white, the rest black: the red channel is the mask, indexed [x, y]
+        solid = pygame.surfarray.array_red(mask.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 255)))
+        table[1:, 1:] = (solid.T > 0).cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)
+    return table
+
+
+class KindMasks(list):
+    """
+    [(mask, full)] indexed by store kind, plus all kinds' summed-area tables packed
+    into one flat array (table k starts at offsets[k], rows strides[k] long).
+    """
+    def __init__(self, entries, tables):
+        super().__init__(entries)
+        self.all_full = all(full for _, full in entries)
+        self.widths = np.array([mask.get_size()[0] for mask, _ in entries], dtype=np.intp)
+        self.heights = np.array([mask.get_size()[1] for mask, _ in entries], dtype=np.intp)
+        self.strides = self.widths + 1
+        sizes = np.array([table.size for table in tables], dtype=np.intp)
+        self.offsets = np.cumsum(sizes) - sizes
+        self.tables = np.concatenate([table.ravel() for table in tables]) if tables else np.zeros(0, dtype=np.int32)
+
+    def solid_in_boxes(self, kinds, x0, y0, x1, y1):
+        """ True where kind's mask has a solid pixel in [x0, x1) x [y0, y1) (its own coordinates). """
+        w, h = self.widths[kinds], self.heights[kinds]
+        x0, x1 = np.clip(x0, 0, w), np.clip(x1, 0, w)
+        y0, y1 = np.clip(y0, 0, h), np.clip(y1, 0, h)
+        base, stride = self.offsets[kinds], self.strides[kinds]
+        t = self.tables
+        solid = (t[base + y1 * stride + x1] - t[base + y0 * stride + x1]
+                 - t[base + y1 * stride + x0] + t[base + y0 * stride + x0])
+        return (x1 > x0) & (y1 > y0) & (solid > 0)
+
+
+class MaskCache:
+    """ surface -> (pygame.mask.Mask, is_full), and per-kind KindMasks for lists of surfaces. """
+    def __init__(self):
+        self._masks = {} # id(surface) -> (surface, mask, full); the surface is kept so its id stays unique
+        self._tables = {} # id(surface) -> summed-area table
+        self._kinds = {} # tuple of ids -> (images, KindMasks)
+        self.builds = 0
+
+    def get(self, surface):
+        entry = self._masks.get(id(surface))
+        if entry is None:
+            mask = pygame.mask.from_surface(surface, MASK_ALPHA_THRESHOLD)
+            w, h = mask.get_size()
+            entry = (surface, mask, mask.count() == w * h)
+            self._masks[id(surface)] = entry
+            self.builds += 1
+        return entry[1], entry[2]
+
+    def kinds(self, images):
+        """ KindMasks for a store's per-kind image list (built once per distinct list). """
+        key = tuple(id(image) for image in images)
+        entry = self._kinds.get(key)
+        if entry is None:
+            masks = [self.get(image) for image in images]
+            tables = []
+            for image, (mask, _full) in zip(images, masks):
+                if id(image) not in self._tables:
+                    self._tables[id(image)] = _summed_area(mask)
+                tables.append(self._tables[id(image)])
+            entry = (list(images), KindMasks(masks, tables))
+            self._kinds[key] = entry
+        return entry[1]
+
+    def clear(self):
+        self._masks.clear()
+        self._tables.clear()
+        self._kinds.clear()
+
+
+mask_cache = MaskCache()
+
+
+def store_masks(images):
+    """ KindMasks ([(mask, full)] indexed by store kind) for a list of per-kind images. """
+    return mask_cache.kinds(images)
+
+
+def pair_filter(store_a, masks_a, store_b, masks_b):
+    """
+    Narrowphase for SpatialHash.query_pairs / collide: a function (rows_a, rows_b) ->
+    boolean array, True where the two entities' masks really overlap.
+    """
+    def overlaps(rows_a, rows_b):
+        if masks_b.all_full:
+            # Solid boxes (bullets): look the box up in A's summed-area table, all pairs at once
+            ox = store_b.x[rows_b].astype(np.intp) - store_a.x[rows_a].astype(np.intp)
+            oy = store_b.y[rows_b].astype(np.intp) - store_a.y[rows_a].astype(np.intp)
+            kinds_b = store_b.kind[rows_b]
+            return masks_a.solid_in_boxes(store_a.kind[rows_a], ox, oy,
+                                          ox + masks_b.widths[kinds_b], oy + masks_b.heights[kinds_b])
+        keep = np.ones(rows_a.size, dtype=bool)
+        ax, ay = store_a.x[rows_a].astype(int).tolist(), store_a.y[rows_a].astype(int).tolist()
+        bx, by = store_b.x[rows_b].astype(int).tolist(), store_b.y[rows_b].astype(int).tolist()
+        ka, kb = store_a.kind[rows_a].tolist(), store_b.kind[rows_b].tolist()
+        for i in range(rows_a.size):
+            mask_a, full_a = masks_a[ka[i]]
+            mask_b, full_b = masks_b[kb[i]]
+            if full_a and full_b:
+                continue
+            keep[i] = mask_a.overlap(mask_b, (bx[i] - ax[i], by[i] - ay[i])) is not None
+        return keep
+    return overlaps
+
+
+def rows_hitting(store, rows, masks, mask, pos):
+    """ The rows (from a Rect query) whose masks overlap a sprite's mask drawn at pos (top-left). """
+    if rows.size == 0:
+        return rows
+    px, py = pos
+    xs, ys = store.x[rows].astype(int).tolist(), store.y[rows].astype(int).tolist()
+    kinds = store.kind[rows].tolist()
+    keep = [mask.overlap(masks[k][0], (x - px, y - py)) is not None for k, x, y in zip(kinds, xs, ys)]
+    return rows[np.array(keep, dtype=bool)]
+
+
+def sprites_overlap(mask_a, pos_a, mask_b, pos_b):
+    """ Pixel overlap test for two sprites whose Rects already collide. """
+    return mask_a.overlap(mask_b, (pos_b[0] - pos_a[0], pos_b[1] - pos_a[1])) is not None
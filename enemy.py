@@ -2,63 +2,55 @@
 import pygame
 import random
 from settings import * # Import settings for defaults
-from bullet import EnemyBullet
-
-class Enemy(pygame.sprite.Sprite):
-    # --- MODIFIED __init__ ---
-    def __init__(self, enemy_img, speed_y_range=None, speed_x_range=None):
-        super().__init__()
-        self.image = enemy_img
-        self.rect = self.image.get_rect()
-
-        self.rect.x = random.randint(0, SCREEN_WIDTH - self.rect.width)
-        self.rect.y = random.randint(-100, -40)
-
-        # --- Use provided speed ranges or fall back to defaults from settings.py ---
-        min_y, max_y = speed_y_range if speed_y_range is not None else (ENEMY_MIN_SPEED_Y, ENEMY_MAX_SPEED_Y)
-        min_x, max_x = speed_x_range if speed_x_range is not None else (ENEMY_MIN_SPEED_X, ENEMY_MAX_SPEED_X)
-
-        # Ensure speeds are within reasonable bounds if provided ranges are invalid
-        min_y = max(1, min_y) # Min speed at least 1? Or adjust as needed
-        max_y = max(min_y, max_y)
-
-        self.speedy = random.randint(min_y, max_y)
-
-        # Ensure speedx is not zero and within valid range
-        possible_speedx = [i for i in range(min_x, max_x + 1) if i != 0]
-        if not possible_speedx:
-            # Fallback if range excludes non-zero (e.g., [-0, 0] or [-1, 1] fails)
-            if max_x != 0: possible_speedx.append(max_x)
-            elif min_x != 0: possible_speedx.append(min_x)
-            else: possible_speedx.append(1) # Absolute fallback
-
-        self.speedx = random.choice(possible_speedx)
-
-
-    def update(self):
-        """ Move the enemy down and bounce horizontally. """
-        self.rect.y += self.speedy
-        self.rect.x += self.speedx
-
-        # Bounce off the sides
-        if self.rect.right > SCREEN_WIDTH or self.rect.left < 0:
-            self.speedx = -self.speedx
-            # Clamp position to prevent getting stuck off-screen
-            if self.rect.right > SCREEN_WIDTH: self.rect.right = SCREEN_WIDTH
-            if self.rect.left < 0: self.rect.left = 0
-
-        # Kill if it moves off the bottom of the screen
-        if self.rect.top > SCREEN_HEIGHT + 10: # Add a small buffer
-            self.kill()
+from bullet import spawn_enemy_bullet
+from sprite_variants import boss_damage_variants, damage_stage
+from bullet_patterns import PatternRunner
+
+def roll_enemy_speed(speed_y_range=None, speed_x_range=None, rng=random):
+    """ Picks a random (speedx, speedy) for a regular enemy from the level ranges. rng: a random.Random stream. """
+    # --- Use provided speed ranges or fall back to defaults from settings.py ---
+    min_y, max_y = speed_y_range if speed_y_range is not None else (ENEMY_MIN_SPEED_Y, ENEMY_MAX_SPEED_Y)
+    min_x, max_x = speed_x_range if speed_x_range is not None else (ENEMY_MIN_SPEED_X, ENEMY_MAX_SPEED_X)
+
+    # Ensure speeds are within reasonable bounds if provided ranges are invalid
+    min_y = max(1, min_y) # Min speed at least 1? Or adjust as needed
+    max_y = max(min_y, max_y)
+
+    speedy = rng.randint(min_y, max_y)
+
+    # Ensure speedx is not zero and within valid range
+    possible_speedx = [i for i in range(min_x, max_x + 1) if i != 0]
+    if not possible_speedx:
+        # Fallback if range excludes non-zero (e.g., [-0, 0] or [-1, 1] fails)
+        if max_x != 0: possible_speedx.append(max_x)
+        elif min_x != 0: possible_speedx.append(min_x)
+        else: possible_speedx.append(1) # Absolute fallback
+
+    speedx = rng.choice(possible_speedx)
+    return speedx, speedy
+
+
+def spawn_enemy(enemy_store, kind, enemy_img, speed_y_range=None, speed_x_range=None, rng=random):
+    """
+    Spawns a regular enemy into the entity store just above the screen.
+    kind indexes the image list the store is drawn with. Movement, the side-wall
+    bounce and culling are handled by EntityStore.update (bounce_x=True, cull_margin=10).
+    """
+    width, height = enemy_img.get_size()
+    x = rng.randint(0, SCREEN_WIDTH - width)
+    y = rng.randint(-100, -40)
+    speedx, speedy = roll_enemy_speed(speed_y_range, speed_x_range, rng)
+    return enemy_store.spawn(x, y, speedx, speedy, width, height, kind)
 
 
 class EnemyBoss(pygame.sprite.Sprite):
     """ Represents the Boss enemy. """
-    # --- MODIFIED: Accept sprite groups, use settings constants ---
-    def __init__(self, boss_img, shoot_sound, all_sprites_group, enemy_bullets_group):
+    # --- MODIFIED: Bullets go into the enemy bullet EntityStore ---
+    def __init__(self, boss_img, audio, enemy_bullet_store, start_time=None, patterns=None, target=None):
         super().__init__()
         self.image_orig = boss_img
-        self.image = self.image_orig.copy()
+        self.variants = boss_damage_variants(self.image_orig) # Damage tints, built once per image
+        self.image = self.variants[0]
         self.rect = self.image.get_rect()
         self.rect.centerx = SCREEN_WIDTH // 2
         self.rect.bottom = -20 # Start above screen
@@ -73,15 +65,24 @@ class EnemyBoss(pygame.sprite.Sprite):
         self.health = self.max_health
 
         self.shoot_delay = BOSS_SHOOT_DELAY
-        self.last_shot_time = pygame.time.get_ticks()
-        self.shoot_sound = shoot_sound
+        self.last_shot_time = pygame.time.get_ticks() if start_time is None else start_time
+        self.audio = audio # AudioScheduler or None
+
+        self.enemy_bullets = enemy_bullet_store
+        self.target = target # Sprite that aimed patterns fire at (the player)
+        self.set_patterns(patterns)
 
-        self.all_sprites = all_sprites_group
-        self.enemy_bullets = enemy_bullets_group
+    def set_patterns(self, patterns):
+        """ Level boss_patterns (see bullet_patterns.py); None or [] keeps the single straight shot. """
+        self.patterns_config = list(patterns or [])
+        self.patterns = PatternRunner(patterns, self.enemy_bullets) if patterns else None
+        if self.patterns and self.entered:
+            self.patterns.start(self.last_shot_time)
 
-    def update(self):
+    def update(self, now=None):
         """ Handles Boss entry, movement, and shooting checks. """
-        now = pygame.time.get_ticks()
+        if now is None: now = pygame.time.get_ticks()
+        self.image = self.variants[damage_stage(self.health, self.max_health)]
 
         if not self.entered:
             if self.rect.centery < self.entry_y:
@@ -90,6 +91,7 @@ class EnemyBoss(pygame.sprite.Sprite):
                 self.rect.centery = self.entry_y # Snap to final Y
                 self.entered = True
                 self.last_shot_time = now # Start shooting timer only after entry
+                if self.patterns: self.patterns.start(now)
                 print("Boss entry complete. Engaging!")
         else:
             # Horizontal movement
@@ -100,29 +102,23 @@ class EnemyBoss(pygame.sprite.Sprite):
                 self.rect.x = max(0, min(self.rect.x, SCREEN_WIDTH - self.rect.width))
 
             # Shooting Logic
-            if now - self.last_shot_time > self.shoot_delay:
+            if self.patterns:
+                target = self.target.rect.center if self.target and self.target.alive() else None
+                if self.patterns.update(now, self.rect.midbottom, target, self.health / self.max_health):
+                    if self.audio: self.audio.trigger('boss_shoot')
+            elif now - self.last_shot_time > self.shoot_delay:
                 self.shoot()
                 self.last_shot_time = now
 
     def shoot(self):
-        """ Creates enemy bullet(s) and adds them to groups. """
+        """ Spawns enemy bullet(s) into the enemy bullet store. """
         # print("Boss shooting!") # Reduced frequency log
-        bullet_spawn_x = self.rect.centerx
-        bullet_spawn_y = self.rect.bottom
-
-        enemy_bullet = EnemyBullet(bullet_spawn_x, bullet_spawn_y)
-        self.all_sprites.add(enemy_bullet)
-        self.enemy_bullets.add(enemy_bullet)
-
-        if self.shoot_sound:
-             try:
-                 self.shoot_sound.play()
-             except pygame.error as e:
-                 print(f"Warning: Could not play boss shoot sound: {e}")
+        spawn_enemy_bullet(self.enemy_bullets, self.rect.centerx, self.rect.bottom)
+        if self.audio: self.audio.trigger('boss_shoot')
 
 
     def draw_health_bar(self, surf):
-        """ Draws the boss's health bar above it onto the provided surface. """
+        """ Draws the boss's health bar above it onto the provided surface. Returns the bar's Rect (or None). """
         if self.health > 0:
             bar_length = 100
             bar_height = 10
@@ -136,4 +132,6 @@ class EnemyBoss(pygame.sprite.Sprite):
             # Draw background (red), fill (green), and border (white)
             pygame.draw.rect(surf, RED, outline_rect)
             pygame.draw.rect(surf, GREEN, fill_rect)
-            pygame.draw.rect(surf, WHITE, outline_rect, 2) # Border thickness 2
\ No newline at end of file
+            pygame.draw.rect(surf, WHITE, outline_rect, 2) # Border thickness 2
+            return outline_rect
+        return None
\ No newline at end of file
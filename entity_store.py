@@ -0,0 +1,247 @@
+# /Users/junluo/Desktop/PlaneWar/entity_store.py
+"""
+Struct-of-arrays storage for the high-count entities (enemies, bullets, boss
+bullets, power-ups).
+
+Instead of one pygame Sprite + Rect per object, each EntityStore keeps parallel
+NumPy columns (x, y, vx, vy, w, h, alive, kind). Movement, the side-wall bounce
+and off-screen culling run as a handful of vectorized operations per frame, so
+the cost stays flat as entity counts grow into the tens of thousands.
+
+Rows [0, count) are in use. Killing an entity only clears its 'alive' flag;
+compact() drops dead rows once per frame, keeping spawn order intact.
+
+prev_x / prev_y hold each row's position before the last update(), so draw()
+can interpolate between simulation steps (see frame_pacer.py). serial numbers
+rows in spawn order; since rows are only ever appended and compaction keeps
+their order, it tells which rows of an earlier frame are still alive (used by
+net_protocol's snapshot deltas).
+"""
+import numpy as np
+import pygame
+from settings import *
+
+
+class EntityStore:
+    """ A growable table of axis-aligned moving boxes. """
+    COLUMNS = ('x', 'y', 'vx', 'vy', 'w', 'h', 'alive', 'kind', 'prev_x', 'prev_y', 'serial')
+
+    def __init__(self, capacity=64, bounce_x=False, cull_margin=0):
+        self.capacity = max(1, capacity)
+        self.count = 0
+        self.bounce_x = bounce_x       # Reflect vx at the side walls (regular enemies)
+        self.cull_margin = cull_margin # Extra pixels below the screen before culling
+        self.x = np.zeros(self.capacity)
+        self.y = np.zeros(self.capacity)
+        self.vx = np.zeros(self.capacity)
+        self.vy = np.zeros(self.capacity)
+        self.w = np.zeros(self.capacity)
+        self.h = np.zeros(self.capacity)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.kind = np.zeros(self.capacity, dtype=np.int16) # Index into the owner's image/type list
+        self.prev_x = np.zeros(self.capacity) # Position before the last update(), for render interpolation
+        self.prev_y = np.zeros(self.capacity)
+        self.serial = np.zeros(self.capacity, dtype=np.int64) # Spawn number, increasing with row index
+        self.spawned = 0 # Serial of the next spawn
+
+    def __len__(self):
+        """ Number of live entities. """
+        return int(np.count_nonzero(self.alive[:self.count]))
+
+    # --- Spawning ---
+    def _reserve(self, extra):
+        """ Makes room for 'extra' more rows, doubling capacity when full. """
+        needed = self.count + extra
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, self.capacity * 2)
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=old.dtype)
+            grown[:self.count] = old[:self.count]
+            setattr(self, name, grown)
+        self.capacity = new_capacity
+
+    def spawn(self, x, y, vx, vy, w, h, kind=0):
+        """ Adds one entity (top-left x/y, like Rect.x/Rect.y). Returns its row index. """
+        self._reserve(1)
+        i = self.count
+        self.x[i], self.y[i], self.vx[i], self.vy[i] = x, y, vx, vy
+        self.prev_x[i], self.prev_y[i] = x, y
+        self.w[i], self.h[i] = w, h
+        self.alive[i] = True
+        self.kind[i] = kind
+        self.serial[i] = self.spawned
+        self.spawned += 1
+        self.count += 1
+        return i
+
+    def spawn_many(self, x, y, vx, vy, w, h, kind=0):
+        """ Vectorized spawn. Scalars broadcast against the array arguments. """
+        n = int(np.broadcast(x, y, vx, vy, w, h, kind).size)
+        if n == 0:
+            return
+        self._reserve(n)
+        s = slice(self.count, self.count + n)
+        self.x[s], self.y[s], self.vx[s], self.vy[s] = x, y, vx, vy
+        self.prev_x[s], self.prev_y[s] = x, y
+        self.w[s], self.h[s] = w, h
+        self.alive[s] = True
+        self.kind[s] = kind
+        self.serial[s] = np.arange(self.spawned, self.spawned + n)
+        self.spawned += n
+        self.count += n
+
+    # --- Per-frame Update ---
+    def update(self):
+        """ Moves every entity, bounces off the side walls if enabled and culls off-screen rows. """
+        n = self.count
+        if n == 0:
+            return
+        x, y, vx, vy = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+        w, h = self.w[:n], self.h[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        y += vy
+        x += vx
+
+        if self.bounce_x:
+            # Same rule as the old Enemy.update: flip direction, then clamp inside the screen
+            past_right = x + w > SCREEN_WIDTH
+            past_left = x < 0
+            vx[past_right | past_left] *= -1
+            np.copyto(x, SCREEN_WIDTH - w, where=past_right)
+            x[past_left] = 0
+
+        off_screen = (y > SCREEN_HEIGHT + self.cull_margin) | ((vy < 0) & (y + h < 0))
+        if not self.bounce_x:
+            off_screen |= ((vx < 0) & (x + w < 0)) | ((vx > 0) & (x > SCREEN_WIDTH))
+        self.alive[:n] &= ~off_screen
+
+    # --- Removal ---
+    def kill(self, indices):
+        """ Marks rows (index array or boolean mask over [0, count)) as dead. """
+        self.alive[:self.count][indices] = False
+
+    def kill_all(self):
+        """ Kills every live entity. Returns how many were alive. """
+        killed = len(self)
+        self.alive[:self.count] = False
+        return killed
+
+    def compact(self):
+        """ Drops dead rows, preserving the order of the survivors. """
+        n = self.count
+        keep = self.alive[:n].copy() # alive itself is rewritten below
+        live = int(np.count_nonzero(keep))
+        if live == n:
+            return
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:live] = column[:n][keep]
+        self.alive[live:n] = False
+        self.count = live
+
+    def clear(self):
+        self.alive[:self.count] = False
+        self.count = 0
+
+    def remap_kinds(self, lookup):
+        """ Sets each row's kind to lookup[kind]; rows mapped to -1 are killed. """
+        n = self.count
+        kinds = np.asarray(lookup, dtype=self.kind.dtype)[self.kind[:n]]
+        self.alive[:n][kinds < 0] = False
+        self.kind[:n] = np.maximum(kinds, 0)
+
+    # --- Queries ---
+    def live_indices(self):
+        return np.flatnonzero(self.alive[:self.count])
+
+    def rect(self, i):
+        return pygame.Rect(int(self.x[i]), int(self.y[i]), int(self.w[i]), int(self.h[i]))
+
+    # --- Drawing ---
+    def blit_sequence(self, sources, alpha=1.0, areas=True):
+        """
+        Iterator of Surface.blits items for the live entities. sources[kind] is the
+        (surface, area) to draw that kind from (see sprite_atlas); areas=False gives
+        (surface, position) pairs for fblits. alpha < 1 draws each entity that far
+        between its previous and current position.
+        """
+        idx = self.live_indices()
+        if idx.size == 0:
+            return iter(())
+        xs, ys = self.x[idx], self.y[idx]
+        if alpha < 1.0:
+            prev_x, prev_y = self.prev_x[idx], self.prev_y[idx]
+            xs = prev_x + (xs - prev_x) * alpha
+            ys = prev_y + (ys - prev_y) * alpha
+        positions = zip(xs.astype(int).tolist(), ys.astype(int).tolist())
+        # Object arrays indexed by kind: the per-entity items are assembled by zip, not a Python loop
+        surfaces = np.empty(len(sources), dtype=object)
+        rects = np.empty(len(sources), dtype=object)
+        for k, (surface, area) in enumerate(sources):
+            surfaces[k], rects[k] = surface, area
+        kinds = self.kind[idx]
+        if areas:
+            return zip(surfaces[kinds], positions, rects[kinds])
+        return zip(surfaces[kinds], positions)
+
+    def draw(self, surface, images, dirty_rects=None, alpha=1.0):
+        """ Blits each live entity with images[kind]. Appends the touched Rects to dirty_rects if given. """
+        sequence = self.blit_sequence([(image, None) for image in images], alpha, areas=False)
+        if dirty_rects is None:
+            surface.blits(sequence, doreturn=False)
+        else:
+            dirty_rects.extend(surface.blits(sequence))
+
+
+class ProjectilePool(EntityStore):
+    """
+    EntityStore preallocated for projectiles. compact() hands killed rows straight
+    back to the pool, so steady-state firing never allocates; the arrays only grow
+    when more projectiles are alive at once than the pool holds.
+
+    hits     - spawns served from free capacity
+    misses   - spawns that forced the pool to grow
+    recycled - rows returned to the pool by compact()
+    """
+    def __init__(self, capacity, **kwargs):
+        super().__init__(capacity, **kwargs)
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+
+    def _reserve(self, extra):
+        free = self.capacity - self.count
+        self.hits += min(extra, free)
+        self.misses += max(0, extra - free)
+        super()._reserve(extra)
+
+    def compact(self):
+        before = self.count
+        super().compact()
+        self.recycled += before - self.count
+
+    def stats(self):
+        return {'capacity': self.capacity, 'live': len(self), 'hits': self.hits,
+                'misses': self.misses, 'recycled': self.recycled}
+
+
+class OwnedProjectilePool(ProjectilePool):
+    """ ProjectilePool whose rows also remember who fired them (owner = player slot, 0 by default). """
+    COLUMNS = ProjectilePool.COLUMNS + ('owner',)
+
+    def __init__(self, capacity, **kwargs):
+        super().__init__(capacity, **kwargs)
+        self.owner = np.zeros(self.capacity, dtype=np.int16)
+
+    def spawn(self, x, y, vx, vy, w, h, kind=0):
+        i = super().spawn(x, y, vx, vy, w, h, kind)
+        self.owner[i] = 0
+        return i
+
+    def spawn_many(self, x, y, vx, vy, w, h, kind=0):
+        start = self.count
+        super().spawn_many(x, y, vx, vy, w, h, kind)
+        self.owner[start:self.count] = 0
@@ -0,0 +1,120 @@
+# /Users/junluo/Desktop/PlaneWar/frame_pacer.py
+"""
+Fixed-timestep simulation clock and frame pacing.
+
+All movement is in pixels per simulation step and every timer counts steps, so
+the game only runs at the right speed if step_level is called exactly FPS times
+per second. Tying that to the display loop (one clock.tick(FPS) per step) means
+SDL_Delay jitter shows up as stutter and a 144 Hz display still only shows 60
+distinct images. Instead:
+
+- FixedTimestep accumulates real time and says how many simulation steps are due
+  this frame (at most SIM_MAX_STEPS_PER_FRAME, so a long hitch doesn't turn into a
+  burst of catch-up steps). The leftover fraction of a step is the render alpha:
+  the renderer draws entities between their previous and current positions.
+- FramePacer ends each render frame on a fixed schedule. 'precise' sleeps until
+  PACER_SPIN_MS before the deadline and spins on perf_counter for the rest, which
+  avoids the scheduler's sleep overshoot; 'tick' is pygame's Clock.tick (the old
+  behaviour); 'uncapped' doesn't wait at all (headless runs, benchmarks).
+"""
+import time
+from collections import deque
+import numpy as np
+import pygame
+from settings import *
+
+PACING_MODES = ('precise', 'tick', 'uncapped')
+
+
+def display_refresh_rate():
+    """ Refresh rate of the first display, or FPS if pygame can't report it. """
+    get_rates = getattr(pygame.display, 'get_desktop_refresh_rates', None) # pygame 2.6+
+    if get_rates:
+        try:
+            rates = get_rates()
+            if rates and rates[0] > 0:
+                return rates[0]
+        except pygame.error:
+            pass
+    return FPS
+
+def render_rate():
+    """ Render frames per second: RENDER_FPS, or the display's refresh rate if it is 0. """
+    return RENDER_FPS or display_refresh_rate()
+
+
+class FixedTimestep:
+    """ Turns elapsed real time into a whole number of fixed simulation steps plus an interpolation alpha. """
+    def __init__(self, hz=FPS, max_steps=SIM_MAX_STEPS_PER_FRAME):
+        self.step_s = 1.0 / hz
+        self.max_steps = max_steps
+        self.accumulator = self.step_s # The first advance() runs one step right away
+        self.dropped = 0 # Steps skipped to catch up after frames longer than max_steps steps
+
+    def advance(self, dt):
+        """ Adds dt seconds; returns the number of steps to run now. """
+        self.accumulator += dt
+        steps = int(self.accumulator / self.step_s)
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+            self.accumulator = self.step_s * steps # The level slows down instead of spiralling
+        self.accumulator -= steps * self.step_s
+        return steps
+
+    @property
+    def alpha(self):
+        """ How far (0..1) real time is past the last completed step, towards the next one. """
+        return min(1.0, max(0.0, self.accumulator / self.step_s))
+
+    def reset(self):
+        """ Forgets accumulated time (after a pause); the next advance() runs one step. """
+        self.accumulator = self.step_s
+
+
+class FramePacer:
+    """ Waits out the rest of each frame at hz. wait() returns the seconds since the previous wait(). """
+    def __init__(self, hz, mode=FRAME_PACING, spin_ms=PACER_SPIN_MS):
+        if mode not in PACING_MODES:
+            print(f"Warning: Unknown frame pacing mode '{mode}', using 'tick'.")
+            mode = 'tick'
+        self.hz = hz
+        self.mode = mode if hz else 'uncapped'
+        self.period = 1.0 / hz if hz else 0.0
+        self.spin_s = spin_ms / 1000
+        self._clock = pygame.time.Clock() if self.mode == 'tick' else None
+        self._deadline = None
+        self._last = None
+        self.intervals = deque(maxlen=PACER_HISTORY) # Recent frame-to-frame times in seconds
+
+    def wait(self):
+        if self.mode == 'tick':
+            self._clock.tick(self.hz)
+        elif self.mode == 'precise' and self._deadline is not None:
+            remaining = self._deadline - time.perf_counter()
+            if remaining > self.spin_s:
+                time.sleep(remaining - self.spin_s)
+            while time.perf_counter() < self._deadline:
+                pass
+        now = time.perf_counter()
+        # Deadlines advance by whole periods so rounding doesn't drift; after a missed frame, restart from now
+        if self._deadline is None or now - self._deadline > self.period:
+            self._deadline = now + self.period
+        else:
+            self._deadline += self.period
+        dt = now - self._last if self._last is not None else 0.0
+        self._last = now
+        if dt: self.intervals.append(dt)
+        return dt
+
+    def reset(self):
+        """ Drops the schedule (after a pause), so the next wait() doesn't count the paused time. """
+        self._deadline = self._last = None
+
+    def stats(self):
+        """ Mean frame time, jitter (standard deviation) and p99 in ms over the recent frames. None if empty. """
+        if not self.intervals:
+            return None
+        ms = np.array(self.intervals) * 1000
+        return {'mode': self.mode, 'hz': self.hz, 'mean_ms': round(float(ms.mean()), 3),
+                'jitter_ms': round(float(ms.std()), 3), 'p99_ms': round(float(np.percentile(ms, 99)), 3)}
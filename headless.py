@@ -0,0 +1,136 @@
+# /Users/junluo/Desktop/PlaneWar/headless.py
+"""
+Headless level runner for balancing and regression runs.
+
+Drives simulation.step_level with the SDL dummy video/audio drivers and no frame
+cap, so levels simulate as fast as the CPU allows. --pacing precise|tick runs
+the steps in real time instead (FPS per second, via frame_pacer.FramePacer),
+e.g. to measure pacing jitter without a window.
+
+Usage:
+    python headless.py                 # every level, scripted player
+    python headless.py --level 2 --frames 20000 --seed 7
+    python headless.py --replay run.pwrec   # re-simulate a main.py --record session
+    python headless.py --level 1 --profile build/trace.json
+    python headless.py --pilot bot     # autopilot.py instead of the scripted sweep
+    python headless.py --level 1 --frames 600 --pacing precise
+"""
+import os
+# Must be set before pygame is imported anywhere
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import math
+import time
+import pygame
+from settings import *
+from level_compiler import load_level_data
+from assets import load_images
+from asset_pack import open_asset_pack
+from simulation import LevelState, FrameInput, step_level
+from replay import load_recording, level_digest, seed_arg
+from profiler import FrameProfiler
+from autopilot import Autopilot
+from frame_pacer import FramePacer, PACING_MODES
+
+
+def scripted_input(frame):
+    """ Simple deterministic pilot: sweeps left/right near the bottom and always fires. """
+    x = SCREEN_WIDTH // 2 + int((SCREEN_WIDTH // 2 - PLAYER_WIDTH) * math.sin(frame / 90))
+    return FrameInput((x, SCREEN_HEIGHT - 60), fire=True, bomb=(frame % 600 == 0))
+
+
+def run_level_headless(level_data, images, max_frames, input_fn=scripted_input, seed=None, profiler=None, on_step=None,
+                       pilot=None, pacer=None):
+    """
+    Simulates one level until it ends or max_frames is reached.
+    pilot (autopilot.Autopilot), if given, flies instead of input_fn.
+    pacer (frame_pacer.FramePacer), if given, paces the steps; otherwise they run uncapped.
+    on_step(state), if given, is called after every step (e.g. to track peaks).
+    Returns (state, wall_seconds).
+    """
+    state = LevelState(level_data, images, seed=seed)
+    start = time.perf_counter()
+    while not state.finished and state.frame < max_frames:
+        if profiler: profiler.begin_frame()
+        if pacer:
+            pacer.wait()
+            if profiler: profiler.mark('tick')
+        frame_input = pilot.decide(state) if pilot else input_fn(state.frame)
+        if profiler: profiler.mark('events')
+        step_level(state, frame_input, profiler)
+        if profiler: profiler.end_frame()
+        if on_step: on_step(state)
+    return state, time.perf_counter() - start
+
+
+def report(state, wall):
+    fps = state.frame / wall if wall > 0 else float('inf')
+    print(f"Level {state.level_num}: result={state.result or 'TIMEOUT'} score={state.player.score} "
+          f"frames={state.frame} sim={state.now / 1000:.1f}s wall={wall:.2f}s ({fps:.0f} frames/s)")
+    print(f"  projectile pools: player {state.bullets.stats()}, boss {state.enemy_bullets.stats()}")
+
+
+def replay_recording(path, levels, images):
+    """ Re-simulates every segment of a recording. Returns True if all of them reproduced. """
+    levels_by_number = {lvl.get('level_number'): lvl for lvl in levels}
+    all_match = True
+    for segment in load_recording(path):
+        level_data = levels_by_number.get(segment.level_number)
+        if level_data is None:
+            print(f"Level {segment.level_number}: not found in {LEVELS_DIR}, skipped.")
+            all_match = False
+            continue
+        if level_digest(level_data) != segment.digest:
+            print(f"Warning: level {segment.level_number} changed since it was recorded; the replay may diverge.")
+        state, wall = run_level_headless(level_data, images, segment.frame_count, segment.input_fn(), seed=segment.seed)
+        report(state, wall)
+        match = state.player.score == segment.score and state.frame == segment.frame_count \
+            and (segment.result is None or state.result == segment.result)
+        all_match = all_match and match
+        print(f"  recorded: result={segment.result or 'QUIT'} score={segment.score} frames={segment.frame_count}"
+              f" -> {'reproduced' if match else 'DIVERGED'}")
+    return all_match
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run PlaneWar levels without rendering or a frame cap.")
+    parser.add_argument('--level', type=int, help="Only run this level number")
+    parser.add_argument('--frames', type=int, default=FPS * 120, help="Frame limit per level (default: 2 simulated minutes)")
+    parser.add_argument('--seed', type=seed_arg, help="RNG seed for every level (random if omitted)")
+    parser.add_argument('--replay', metavar='PATH', help="Re-simulate a recording from main.py --record")
+    parser.add_argument('--pilot', choices=('scripted', 'bot'), default='scripted', help="Who flies the ship")
+    parser.add_argument('--profile', metavar='PATH', help="Write the last level's last frames as a Chrome trace")
+    parser.add_argument('--pacing', choices=PACING_MODES, default='uncapped', help="Frame pacing (default: uncapped)")
+    args = parser.parse_args()
+    profiler = FrameProfiler() if args.profile else None
+
+    images = load_images(open_asset_pack() if USE_ASSET_PACK else None)
+    levels = load_level_data(LEVELS_DIR)
+    if args.replay:
+        ok = replay_recording(args.replay, levels, images)
+        pygame.quit()
+        raise SystemExit(0 if ok else 1)
+
+    if args.level is not None:
+        levels = [lvl for lvl in levels if lvl.get('level_number') == args.level]
+    if not levels:
+        raise SystemExit("No matching levels to run.")
+
+    for level_data in levels:
+        pilot = Autopilot() if args.pilot == 'bot' else None
+        pacer = FramePacer(FPS, args.pacing) if args.pacing != 'uncapped' else None
+        state, wall = run_level_headless(level_data, images, args.frames, seed=args.seed, profiler=profiler, pilot=pilot,
+                                         pacer=pacer)
+        report(state, wall)
+        if pacer: print(f"  frame pacing: {pacer.stats()}")
+    if profiler:
+        summary = profiler.summary()
+        print(f"Phase means (ms): { {name: round(p['mean_ms'], 4) for name, p in summary['phases'].items() if p['mean_ms']} }")
+        print(f"Chrome trace written: {profiler.export_chrome_trace(args.profile)}")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
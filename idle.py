@@ -0,0 +1,95 @@
+# /Users/junluo/Desktop/PlaneWar/idle.py
+"""
+Idle scheduling for menus and background windows.
+
+- Menus (start / end screen) draw once and then block in pygame.event.wait(),
+  so a static screen costs no CPU until an event arrives. While assets are
+  still streaming in, the wait times out every IDLE_LOADING_POLL_MS to move
+  the progress bar.
+- run_game asks mode() every frame. 'hidden' (minimized / hidden window)
+  stops the simulation and rendering and blocks on events until the window
+  comes back. 'unfocused' runs the level at IDLE_UNFOCUSED_FPS instead of FPS
+  (0 = paused like hidden). The simulation counts frames, not wall time, so a
+  paused or throttled level resumes exactly where it was.
+- Wall and process CPU time are charged to the current state ('menu',
+  'playing', 'unfocused', 'hidden', ...). report() prints them at exit, so idle
+  kiosk instances can be checked for wasted cores.
+"""
+import time
+import pygame
+from settings import *
+
+_HIDE_EVENTS = {pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN}
+_SHOW_EVENTS = {pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWMAXIMIZED}
+
+
+class IdleScheduler:
+    """ Tracks window visibility/focus, blocks while idle, and accounts CPU per state. """
+    def __init__(self):
+        self.visible = True
+        self.focused = True
+        self.usage = {} # state -> [wall_s, cpu_s]
+        self._state = None
+        self._since = self._cpu_since = 0.0
+
+    # --- Window State ---
+    def handle_event(self, event):
+        """ Updates visibility/focus from window events. Returns True if the window needs repainting. """
+        if event.type in _HIDE_EVENTS:
+            self.visible = False
+        elif event.type in _SHOW_EVENTS:
+            self.visible = True
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.focused = True
+        return event.type in _SHOW_EVENTS or event.type == pygame.WINDOWEXPOSED
+
+    def mode(self):
+        """ 'hidden', 'unfocused' or 'active'. """
+        if not self.visible:
+            return 'hidden'
+        return 'active' if self.focused else 'unfocused'
+
+    def frame_rate(self):
+        """ Frame cap for the level loop in the current mode; 0 = don't step at all. """
+        mode = self.mode()
+        if mode == 'hidden':
+            return 0
+        return FPS if mode == 'active' else IDLE_UNFOCUSED_FPS
+
+    # --- Waiting ---
+    def wait_events(self, timeout_ms=None):
+        """
+        Blocks until an event arrives (or timeout_ms passes), then returns
+        (events, repaint): every pending event, already passed to handle_event,
+        and whether any of them needs the whole window redrawn.
+        """
+        first = pygame.event.wait() if timeout_ms is None else pygame.event.wait(timeout_ms)
+        events = [] if first.type == pygame.NOEVENT else [first]
+        events.extend(pygame.event.get())
+        repaint = False
+        for event in events:
+            repaint = self.handle_event(event) or repaint
+        return events, repaint
+
+    # --- CPU Accounting ---
+    def enter(self, state):
+        """ Charges the time since the last call to the previous state, then switches to state. """
+        now, cpu = time.perf_counter(), time.process_time()
+        if self._state is not None:
+            bucket = self.usage.setdefault(self._state, [0.0, 0.0])
+            bucket[0] += now - self._since
+            bucket[1] += cpu - self._cpu_since
+        self._state, self._since, self._cpu_since = state, now, cpu
+
+    def stats(self):
+        """ state -> {'wall_s', 'cpu_s', 'cpu_pct'} (CPU of the whole process, all threads). """
+        self.enter(self._state) # Bring the current state's totals up to date
+        return {state: {'wall_s': round(wall, 2), 'cpu_s': round(cpu, 3),
+                        'cpu_pct': round(100 * cpu / wall, 1) if wall > 0 else 0.0}
+                for state, (wall, cpu) in self.usage.items()}
+
+    def report(self):
+        for state, s in self.stats().items():
+            print(f"  {state:<12} {s['wall_s']:>8.1f}s wall  {s['cpu_s']:>8.2f}s CPU  ({s['cpu_pct']:.1f}% of a core)")
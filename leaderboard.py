@@ -0,0 +1,220 @@
+# /Users/junluo/Desktop/PlaneWar/leaderboard.py
+"""
+Local leaderboard: every run and every level played, in SQLite.
+
+- WAL journal: a commit is one append to the -wal file, so a crash never
+  leaves a half-written score behind, and readers never wait on the writer.
+- Writes are queued and applied by one background thread in batched
+  transactions, so recording a level never blocks a frame or a menu.
+  Only close() waits, for the queue to drain; it also runs at interpreter
+  exit, so a sys.exit() from a menu doesn't drop queued writes.
+- Reads (top-N, personal best) use their own connection on the calling
+  thread and are answered from indexes on (score), (player, score) and
+  (level_number, score), so they stay fast with millions of rows.
+
+Tables:
+    runs    one row per game from the start screen to the end screen; result is
+            'RUNNING' until end_run (left as such if the game crashed mid-run)
+    levels  one row per level attempt, with its run id
+
+The old single-number highscore.txt is imported once, as a 'MIGRATED' run.
+
+Usage:
+    python leaderboard.py                    # top runs
+    python leaderboard.py --level 2 --top 20 # best attempts at level 2
+    python leaderboard.py --player alice     # alice's personal bests
+"""
+import os
+import sys
+import time
+import uuid
+import queue
+import sqlite3
+import atexit
+import argparse
+import threading
+from settings import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, player TEXT NOT NULL, seed INTEGER, started_at REAL NOT NULL,
+    ended_at REAL, duration_ms INTEGER, score INTEGER NOT NULL DEFAULT 0,
+    result TEXT NOT NULL DEFAULT 'RUNNING', levels_cleared INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC);
+CREATE INDEX IF NOT EXISTS runs_by_player ON runs (player, score DESC);
+CREATE TABLE IF NOT EXISTS levels (
+    id INTEGER PRIMARY KEY, run_id INTEGER NOT NULL, player TEXT NOT NULL, level_number INTEGER NOT NULL,
+    score INTEGER NOT NULL, duration_ms INTEGER NOT NULL, result TEXT NOT NULL, ended_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS levels_by_score ON levels (level_number, score DESC);
+CREATE INDEX IF NOT EXISTS levels_by_player ON levels (player, level_number, score DESC);
+CREATE INDEX IF NOT EXISTS levels_by_run ON levels (run_id);
+"""
+
+_STOP = object() # Queue sentinel: drain and exit
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL") # Durable against app crashes; WAL keeps the file consistent
+    return conn
+
+
+class Leaderboard:
+    """ SQLite-backed score history with a background writer thread. """
+    def __init__(self, path=LEADERBOARD_DB_PATH, legacy_path=HIGH_SCORE_FILE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._reader = _connect(path)
+        self._reader.executescript(SCHEMA)
+        self._migrate_legacy(legacy_path)
+        self._queue = queue.Queue()
+        self.written = 0 # Statements applied by the writer
+        self._writer = threading.Thread(target=self._write_loop, name="leaderboard-writer", daemon=True)
+        self._writer.start()
+        self._closed = False
+        atexit.register(self.close)
+
+    def _migrate_legacy(self, legacy_path):
+        """ Imports highscore.txt once, so the old best score stays the best score. """
+        conn = self._reader
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+            return
+        score = 0
+        if legacy_path and os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, 'r') as f:
+                    text = f.read().strip()
+                score = int(text) if text else 0
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read legacy high score {legacy_path}: {e}")
+        with conn:
+            if score > 0:
+                mtime = os.path.getmtime(legacy_path)
+                conn.execute("INSERT INTO runs (player, started_at, ended_at, score, result) VALUES (?, ?, ?, ?, 'MIGRATED')",
+                             (LEGACY_PLAYER_NAME, mtime, mtime, score))
+                print(f"Imported legacy high score {score} from '{os.path.basename(legacy_path)}'.")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)", (str(score),))
+
+    # --- Writer Thread ---
+    def _write_loop(self):
+        conn = _connect(self.path)
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            # Everything queued meanwhile goes into the same transaction
+            while len(batch) < LEADERBOARD_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [item for item in batch if item is not _STOP]
+            try:
+                with conn:
+                    for sql, params in batch:
+                        conn.execute(sql, params)
+                self.written += len(batch)
+            except sqlite3.Error as e:
+                print(f"Error: Leaderboard write failed ({len(batch)} statements lost): {e}")
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+        conn.close()
+
+    def _submit(self, sql, params):
+        self._queue.put((sql, params))
+
+    # --- Recording (non-blocking) ---
+    def begin_run(self, player=PLAYER_NAME, seed=None):
+        """ Starts a run and returns its id. """
+        run_id = uuid.uuid4().int >> 65 # Random 63-bit id: no round trip to the writer needed
+        self._submit("INSERT INTO runs (id, player, seed, started_at) VALUES (?, ?, ?, ?)",
+                     (run_id, player, seed, time.time()))
+        return run_id
+
+    def record_level(self, run_id, player, level_number, score, duration_ms, result):
+        self._submit("INSERT INTO levels (run_id, player, level_number, score, duration_ms, result, ended_at) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (run_id, player, level_number, score, int(duration_ms), result, time.time()))
+
+    def end_run(self, run_id, score, result, levels_cleared, duration_ms):
+        self._submit("UPDATE runs SET ended_at = ?, duration_ms = ?, score = ?, result = ?, levels_cleared = ? "
+                     "WHERE id = ?", (time.time(), int(duration_ms), score, result, levels_cleared, run_id))
+
+    def flush(self):
+        """ Blocks until every queued write has been applied. """
+        self._queue.join()
+
+    def close(self):
+        """ Drains the queue, stops the writer and closes the database. Safe to call twice. """
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._reader.close()
+
+    # --- Queries (indexed) ---
+    def best_score(self):
+        row = self._reader.execute("SELECT score FROM runs ORDER BY score DESC LIMIT 1").fetchone()
+        return row[0] if row else 0
+
+    def top_runs(self, n=10):
+        """ [(player, score, result, levels_cleared, ended_at)] best first. """
+        return self._reader.execute("SELECT player, score, result, levels_cleared, ended_at FROM runs "
+                                    "ORDER BY score DESC LIMIT ?", (n,)).fetchall()
+
+    def top_levels(self, level_number, n=10):
+        """ [(player, score, duration_ms, result, ended_at)] for one level, best first. """
+        return self._reader.execute("SELECT player, score, duration_ms, result, ended_at FROM levels "
+                                    "WHERE level_number = ? ORDER BY score DESC LIMIT ?", (level_number, n)).fetchall()
+
+    def personal_best(self, player, level_number=None):
+        """ A player's best run score, or best score on one level. 0 if none. """
+        if level_number is None:
+            row = self._reader.execute("SELECT score FROM runs WHERE player = ? ORDER BY score DESC LIMIT 1",
+                                       (player,)).fetchone()
+        else:
+            row = self._reader.execute("SELECT score FROM levels WHERE player = ? AND level_number = ? "
+                                       "ORDER BY score DESC LIMIT 1", (player, level_number)).fetchone()
+        return row[0] if row else 0
+
+    def player_levels(self, player):
+        """ Level numbers a player has attempted. """
+        return [row[0] for row in self._reader.execute(
+            "SELECT DISTINCT level_number FROM levels WHERE player = ? ORDER BY level_number", (player,))]
+
+
+def _format_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts)) if ts else "-"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the PlaneWar leaderboard.")
+    parser.add_argument('--top', type=int, default=10, help="Rows to show")
+    parser.add_argument('--level', type=int, help="Best attempts at this level instead of whole runs")
+    parser.add_argument('--player', help="Show this player's personal bests")
+    parser.add_argument('--db', default=LEADERBOARD_DB_PATH)
+    args = parser.parse_args(argv)
+
+    board = Leaderboard(args.db)
+    try:
+        if args.player:
+            print(f"{args.player}: best run {board.personal_best(args.player)}")
+            for level_number in board.player_levels(args.player):
+                print(f"  level {level_number}: {board.personal_best(args.player, level_number)}")
+        elif args.level is not None:
+            for rank, (player, score, duration_ms, result, ended_at) in enumerate(board.top_levels(args.level, args.top), 1):
+                print(f"{rank:>3}. {player:<16} {score:>7}  {result:<7} {duration_ms / 1000:>7.1f}s  {_format_time(ended_at)}")
+        else:
+            for rank, (player, score, result, cleared, ended_at) in enumerate(board.top_runs(args.top), 1):
+                print(f"{rank:>3}. {player:<16} {score:>7}  {result:<8} levels {cleared:>2}  {_format_time(ended_at)}")
+    finally:
+        board.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
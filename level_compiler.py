@@ -0,0 +1,313 @@
+# /Users/junluo/Desktop/PlaneWar/level_compiler.py
+"""
+Level compiler: validation, defaults, cache and hot reload for levels/*.json.
+
+Each level file is checked once against LEVEL_SCHEMA. Every problem in the
+file is reported together, so an inverted enemy_speed_x_range or a missing
+enemy_types key is caught at load time and not mid-game. Fields the file
+leaves out are filled from settings.py. The result is a normalized dict with
+every schema field present.
+
+Compiled levels are kept in LEVEL_CACHE_PATH, keyed by each file's size and
+mtime, with the content sha1 as a fallback. A launch where no level changed
+just reads that one cache file and parses no level JSON. The cache is
+rebuilt when the compiler version or the settings defaults change.
+
+LevelLibrary.poll() re-stats the files every LEVEL_HOT_RELOAD_INTERVAL ms and
+recompiles only the ones that changed. run_game uses it to apply edits to
+the running level without a restart.
+"""
+import os
+import json
+import hashlib
+from settings import *
+from assets import IMAGE_CONFIGS
+from spawn_timeline import FORMATIONS
+from bullet_patterns import PATTERN_TYPES
+
+COMPILER_VERSION = 4
+ENEMY_TYPES = [key for key in IMAGE_CONFIGS if key.startswith('enemy')] # Valid enemy_types entries
+
+# field -> spec. kind: int | number | bool | str | range | enemy_list | list (of 'item' objects)
+# 'required' fields have no default; 'nullable' fields accept null; 'min' bounds numbers;
+# 'choices' limits strings.
+
+# One scripted wave (see spawn_timeline.py). enemies=null uses the level's enemy_types.
+WAVE_SCHEMA = {
+    'at':       {'kind': 'number', 'required': True, 'min': 0},   # Seconds after level start
+    'formation': {'kind': 'str', 'choices': FORMATIONS, 'default': 'line'},
+    'count':    {'kind': 'int', 'min': 1, 'default': 5},
+    'enemies':  {'kind': 'enemy_list', 'nullable': True, 'default': None}, # Cycled over the members
+    'x':        {'kind': 'int', 'nullable': True, 'default': None}, # Formation centre; null = screen centre
+    'spacing':  {'kind': 'int', 'min': 0, 'default': WAVE_DEFAULT_SPACING}, # px between members
+    'delay_ms': {'kind': 'int', 'min': 0, 'default': 0},           # Between consecutive members
+    'speed_x':  {'kind': 'int', 'default': 0},
+    'speed_y':  {'kind': 'int', 'min': 1, 'default': WAVE_DEFAULT_SPEED_Y},
+    'repeat':   {'kind': 'int', 'min': 1, 'default': 1},
+    'every':    {'kind': 'number', 'min': 0, 'default': 0},        # Seconds between repeats
+}
+
+# One boss bullet pattern (see bullet_patterns.py). Angles in degrees, 0 = right, 90 = down.
+PATTERN_SCHEMA = {
+    'type':         {'kind': 'str', 'required': True, 'choices': PATTERN_TYPES},
+    'count':        {'kind': 'int', 'min': 1, 'default': 1},      # Bullets per volley
+    'spread':       {'kind': 'number', 'min': 0, 'default': 60},  # Fan / aimed width in degrees
+    'angle':        {'kind': 'number', 'default': 90},            # Fan centre / first ring bullet
+    'spin':         {'kind': 'number', 'default': 0},             # Degrees added per volley
+    'speed':        {'kind': 'number', 'min': 0, 'default': ENEMY_BULLET_SPEED_Y}, # px per frame
+    'accel':        {'kind': 'number', 'default': 0},             # px per frame^2 along the heading
+    'accel_frames': {'kind': 'int', 'min': 0, 'default': 0},      # 0 = accelerate for the bullet's life
+    'every_ms':     {'kind': 'int', 'min': 1, 'default': BOSS_SHOOT_DELAY}, # Between bursts
+    'burst':        {'kind': 'int', 'min': 1, 'default': 1},      # Volleys per burst
+    'burst_gap_ms': {'kind': 'int', 'min': 0, 'default': 100},    # Between volleys of a burst
+    'start_s':      {'kind': 'number', 'min': 0, 'default': 0},   # Seconds after the boss has entered
+    'health_below': {'kind': 'number', 'min': 0, 'default': 1.0}, # Only while health fraction <= this
+}
+
+LEVEL_SCHEMA = {
+    'level_number':              {'kind': 'int', 'required': True, 'min': 1},
+    'comment':                   {'kind': 'str', 'nullable': True, 'default': None},
+    'is_boss_level':             {'kind': 'bool', 'default': False},
+    'boss_appear_delay_seconds': {'kind': 'number', 'min': 0, 'default': BOSS_APPEAR_DELAY_SECONDS},
+    'duration_seconds':          {'kind': 'number', 'min': 0, 'nullable': True, 'default': None},
+    'enemy_types':               {'kind': 'enemy_list', 'required': True},
+    'spawn_interval':            {'kind': 'int', 'min': 1, 'default': ENEMY_SPAWN_INTERVAL},
+    'max_on_screen':             {'kind': 'int', 'min': 0, 'default': MAX_ONSCREEN_ENEMIES},
+    'enemy_speed_y_range':       {'kind': 'range', 'min': 1, 'default': [ENEMY_MIN_SPEED_Y, ENEMY_MAX_SPEED_Y]},
+    'enemy_speed_x_range':       {'kind': 'range', 'default': [ENEMY_MIN_SPEED_X, ENEMY_MAX_SPEED_X]},
+    'powerup_interval':          {'kind': 'int', 'min': 1, 'default': POWERUP_SPAWN_INTERVAL},
+    'background':                {'kind': 'str', 'nullable': True, 'default': None},
+    'music':                     {'kind': 'str', 'nullable': True, 'default': None},
+    'waves':                     {'kind': 'list', 'item': WAVE_SCHEMA, 'default': []},
+    'boss_patterns':             {'kind': 'list', 'item': PATTERN_SCHEMA, 'default': []}, # [] = one straight shot every BOSS_SHOOT_DELAY
+}
+
+
+class LevelError(ValueError):
+    """ A level file that doesn't match LEVEL_SCHEMA. .problems lists every issue found. """
+    def __init__(self, filename, problems):
+        super().__init__(f"{filename}: " + "; ".join(problems))
+        self.filename = filename
+        self.problems = problems
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _check_field(name, value, spec):
+    """ Returns a problem description, or None if value fits spec. """
+    kind = spec['kind']
+    if value is None:
+        return None if spec.get('nullable') else f"'{name}' may not be null"
+    if kind == 'int' and not _is_int(value):
+        return f"'{name}' must be an integer, got {value!r}"
+    if kind == 'number' and not (_is_int(value) or isinstance(value, float)):
+        return f"'{name}' must be a number, got {value!r}"
+    if kind == 'bool' and not isinstance(value, bool):
+        return f"'{name}' must be true or false, got {value!r}"
+    if kind == 'str' and not isinstance(value, str):
+        return f"'{name}' must be a string, got {value!r}"
+    if kind == 'str' and 'choices' in spec and value not in spec['choices']:
+        return f"'{name}' must be one of {list(spec['choices'])}, got {value!r}"
+    if kind == 'list':
+        return None if isinstance(value, list) else f"'{name}' must be a list, got {value!r}"
+    if kind == 'range':
+        if not (isinstance(value, list) and len(value) == 2 and all(_is_int(v) for v in value)):
+            return f"'{name}' must be [min, max] integers, got {value!r}"
+        if value[0] > value[1]:
+            return f"'{name}' is inverted: min {value[0]} > max {value[1]}"
+        if 'min' in spec and value[0] < spec['min']:
+            return f"'{name}' minimum must be at least {spec['min']}, got {value[0]}"
+        return None
+    if kind == 'enemy_list':
+        if not (isinstance(value, list) and value):
+            return f"'{name}' must be a non-empty list, got {value!r}"
+        unknown = [v for v in value if v not in ENEMY_TYPES]
+        if unknown:
+            return f"'{name}' has unknown types {unknown} (known: {ENEMY_TYPES})"
+        return None
+    if 'min' in spec and value < spec['min']:
+        return f"'{name}' must be at least {spec['min']}, got {value}"
+    return None
+
+def _compile_fields(raw, schema, prefix, problems):
+    """ Checks raw against schema, appending to problems. Returns the dict with defaults filled in. """
+    compiled = {}
+    for name, spec in schema.items():
+        if name not in raw:
+            if spec.get('required'):
+                problems.append(f"missing required '{prefix}{name}'")
+            else:
+                default = spec['default']
+                compiled[name] = list(default) if isinstance(default, list) else default
+            continue
+        problem = _check_field(prefix + name, raw[name], spec)
+        if problem:
+            problems.append(problem)
+        elif spec['kind'] == 'list':
+            compiled[name] = []
+            for i, item in enumerate(raw[name]):
+                item_prefix = f"{prefix}{name}[{i}]."
+                if not isinstance(item, dict):
+                    problems.append(f"'{item_prefix[:-1]}' must be an object, got {item!r}")
+                    continue
+                compiled[name].append(_compile_fields(item, spec['item'], item_prefix, problems))
+                unknown = sorted(set(item) - set(spec['item']))
+                if unknown: print(f"  Warning: ignoring unknown fields {unknown} in {item_prefix[:-1]}")
+        else:
+            compiled[name] = raw[name]
+    return compiled
+
+def compile_level(raw, filename="<level>"):
+    """ Validates a parsed level dict and returns it normalized. Raises LevelError listing every problem. """
+    if not isinstance(raw, dict):
+        raise LevelError(filename, ["top level must be a JSON object"])
+    problems = []
+    level = _compile_fields(raw, LEVEL_SCHEMA, "", problems)
+    for i, wave in enumerate(level.get('waves', [])):
+        if wave.get('repeat', 1) > 1 and not wave.get('every'):
+            problems.append(f"'waves[{i}].every' must be > 0 when repeat > 1")
+        if wave.get('enemies') is None and 'enemy_types' in level:
+            wave['enemies'] = list(level['enemy_types'])
+    for i, pattern in enumerate(level.get('boss_patterns', [])):
+        if pattern.get('type') == 'spiral' and not pattern.get('spin'):
+            problems.append(f"'boss_patterns[{i}].spin' must be non-zero for a spiral")
+        if pattern.get('speed') == 0 and not pattern.get('accel'):
+            problems.append(f"'boss_patterns[{i}].speed' must be > 0 unless accel is set (bullets would never move)")
+    unknown = sorted(set(raw) - set(LEVEL_SCHEMA))
+    if unknown:
+        print(f"  Warning: {filename}: ignoring unknown fields {unknown}")
+    if problems:
+        raise LevelError(filename, problems)
+    return level
+
+def _defaults_digest():
+    """ Changes whenever the compiler or any settings default it fills in changes. """
+    schema = json.dumps({'v': COMPILER_VERSION, 'enemy_types': ENEMY_TYPES, 'schema': LEVEL_SCHEMA},
+                        sort_keys=True, default=str)
+    return hashlib.sha1(schema.encode('utf-8')).hexdigest()
+
+
+class LevelLibrary:
+    """ All compiled levels of a directory, sorted by level_number, with cache and hot reload. """
+    def __init__(self, directory=LEVELS_DIR, cache_path=LEVEL_CACHE_PATH):
+        self.directory = directory
+        self.cache_path = cache_path
+        self.levels = [] # Updated in place, so holders of the list see reloads
+        self._entries = {} # filename -> {'mtime_ns', 'size', 'sha1', 'level' | 'errors'}
+        self._last_poll = None
+        self.compiled = 0 # Files compiled (not served from the cache) since creation
+        self._load_cache()
+        print(f"--- Loading Levels from: {directory} ---")
+        self.reload(report=True)
+        print(f"--- Level loading complete. Loaded {len(self.levels)} valid levels. ---")
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('defaults') == _defaults_digest() and cache.get('directory') == os.path.abspath(self.directory):
+                self._entries = cache.get('files', {})
+        except (OSError, ValueError):
+            self._entries = {} # Missing or unreadable cache: compile everything
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'defaults': _defaults_digest(), 'directory': os.path.abspath(self.directory),
+                           'files': self._entries}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write level cache {self.cache_path}: {e}")
+
+    def _compile_file(self, filename, st):
+        """ Cache entry for a file whose stat changed: reuse by content hash, else compile. """
+        path = os.path.join(self.directory, filename)
+        with open(path, 'rb') as f:
+            data = f.read()
+        sha1 = hashlib.sha1(data).hexdigest()
+        entry = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha1': sha1}
+        old = self._entries.get(filename)
+        if old and old.get('sha1') == sha1:
+            return dict(old, **entry), False # Touched but not edited
+        self.compiled += 1
+        try:
+            entry['level'] = compile_level(json.loads(data.decode('utf-8')), filename)
+        except LevelError as e:
+            entry['errors'] = e.problems
+        except (ValueError, UnicodeDecodeError) as e:
+            entry['errors'] = [f"invalid JSON: {e}"]
+        return entry, True
+
+    def reload(self, report=False):
+        """ Re-scans the directory. Returns the set of level numbers that were added, edited or removed. """
+        try:
+            filenames = sorted(f for f in os.listdir(self.directory) if f.endswith('.json'))
+        except OSError as e:
+            print(f"Error accessing levels directory {self.directory}: {e}")
+            filenames = []
+        if report and not filenames:
+            print("Warning: No .json level files found in the 'levels' directory!")
+
+        entries, dirty, changed = {}, False, set()
+        for filename in filenames:
+            try:
+                st = os.stat(os.path.join(self.directory, filename))
+                entry = self._entries.get(filename)
+                if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+                    edited = False
+                else:
+                    entry, edited = self._compile_file(filename, st)
+                    dirty = True
+            except OSError as e:
+                print(f"  Error: Failed to read file {filename}: {e}")
+                continue
+            entries[filename] = entry
+            if edited:
+                old = self._entries.get(filename, {}).get('level')
+                changed.update(lvl['level_number'] for lvl in (old, entry.get('level')) if lvl)
+            if (report or edited) and 'errors' in entry:
+                print(f"  Error: Skipping {filename}: " + "; ".join(entry['errors']))
+            elif report or edited:
+                verb = "Successfully loaded" if report else "Reloaded"
+                print(f"  {verb}: {filename} (Level {entry['level']['level_number']}){'' if edited else ' (cached)'}")
+        for filename in set(self._entries) - set(entries):
+            dirty = True
+            removed = self._entries[filename].get('level')
+            if removed: changed.add(removed['level_number'])
+
+        self._entries = entries
+        if dirty: self._save_cache()
+
+        levels, seen = [], {}
+        for filename in filenames:
+            level = entries.get(filename, {}).get('level')
+            if not level: continue
+            if level['level_number'] in seen:
+                print(f"  Warning: {filename} repeats level {level['level_number']} from {seen[level['level_number']]}; ignored.")
+                continue
+            seen[level['level_number']] = filename
+            levels.append(level)
+        levels.sort(key=lambda lvl: lvl['level_number'])
+        self.levels[:] = levels
+        return changed
+
+    def poll(self, now_ms):
+        """ Hot reload: reloads at most every LEVEL_HOT_RELOAD_INTERVAL ms. Returns changed level numbers. """
+        if self._last_poll is not None and now_ms - self._last_poll < LEVEL_HOT_RELOAD_INTERVAL:
+            return set()
+        self._last_poll = now_ms
+        return self.reload()
+
+    def get(self, level_number):
+        for level in self.levels:
+            if level['level_number'] == level_number:
+                return level
+        return None
+
+
+def load_level_data(levels_directory=LEVELS_DIR):
+    """Compiled levels from the specified directory, sorted by level number (invalid files are skipped)."""
+    return LevelLibrary(levels_directory).levels
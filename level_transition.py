@@ -0,0 +1,156 @@
+# /Users/junluo/Desktop/PlaneWar/level_transition.py
+"""
+Non-blocking level transitions.
+
+The "Level N" intro and the end-of-level banner used to be pygame.time.wait /
+time.sleep calls that froze the process. They are now Transition objects that
+the main loop draws once per frame while it keeps pumping events (so the window
+stays responsive and QUIT works mid-transition).
+
+While a transition is on screen, LevelPrefetch gets the next level ready:
+
+- Music: the track file is read into memory on the AssetLoader's thread pool,
+  so mixer.music.load() on the main thread doesn't touch the disk.
+- Images: each image the level uses is taken from the loader once its worker
+  has finished (and convert_alpha()'d), never blocking on one still decoding.
+- Boss damage tints and the player's shield variant are prebuilt, and every
+  image of the level is packed into the sprite atlas.
+- The LevelState itself (player, entity stores, spawn timeline with expanded
+  waves) is constructed, and run_game starts from it.
+
+Main-thread jobs run one per frame, so the transition animation doesn't stutter
+either. The intro ends when both its animation and the prefetch are done.
+"""
+import io
+import os
+from collections import deque
+import pygame
+from settings import *
+from text_cache import render_text
+from simulation import LevelState
+from sprite_variants import boss_damage_variants
+from sprite_atlas import pack_level
+
+
+class Transition:
+    """ A timed full-screen title (optionally over a dimmed snapshot), drawn by the caller every frame. """
+    def __init__(self, text, font, duration_ms, color=WHITE, backdrop=None, fade_out=True):
+        self.text_surf = render_text(font, text, True, color).copy() # Own copy: its alpha changes per frame
+        self.duration_ms = duration_ms
+        self.backdrop = backdrop
+        self.fade_out = fade_out
+        self.started = pygame.time.get_ticks()
+        self._dim = None
+        if backdrop:
+            self._dim = pygame.Surface(backdrop.get_size())
+            self._dim.fill(BLACK)
+
+    def progress(self):
+        return min(1.0, (pygame.time.get_ticks() - self.started) / self.duration_ms) if self.duration_ms > 0 else 1.0
+
+    @property
+    def finished(self):
+        return self.progress() >= 1.0
+
+    def draw(self, screen_surf):
+        """ Draws this frame of the transition over the whole screen. """
+        p = self.progress()
+        if self.backdrop:
+            screen_surf.blit(self.backdrop, (0, 0))
+            self._dim.set_alpha(int(TRANSITION_DIM_ALPHA * min(1.0, p * 4)))
+            screen_surf.blit(self._dim, (0, 0))
+        else:
+            screen_surf.fill(BLACK)
+        # Fade in over the first quarter, hold, then (optionally) fade out over the last quarter
+        alpha = min(1.0, p * 4)
+        if self.fade_out: alpha = min(alpha, (1.0 - p) * 4)
+        self.text_surf.set_alpha(int(255 * alpha))
+        screen_surf.blit(self.text_surf, self.text_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class LevelPrefetch:
+    """ Readies one level (state, images, variants, music) a little per frame. """
+    def __init__(self, level_data, images, sounds, seed=None, loader=None, music_path=None):
+        self.level_data = level_data
+        self.images = images
+        self.sounds = sounds
+        self.seed = seed
+        self.state = None
+        self.music_path = music_path
+        self._music = None # Future of the track's bytes; None = no track, or read on demand without a loader
+        if music_path and loader:
+            # One read per track: replays and levels sharing a track reuse the bytes already loaded
+            self._music = loader.submit_once(f"music:{music_path}", _read_file, music_path)
+
+        keys = ['player', 'powerups'] + list(level_data.get('enemy_types', ['enemy1']))
+        keys += [etype for wave in level_data.get('waves', []) for etype in wave.get('enemies') or []]
+        if level_data.get('is_boss_level'): keys.append('boss')
+        self._image_keys = deque(dict.fromkeys(keys))
+        self._jobs = deque([self._warm_images, self._warm_variants, self._build_state, self._pack_atlas])
+
+    # --- Main-thread jobs (each returns True when finished) ---
+    def _warm_images(self):
+        """ Hands out (and converts) one finished image per call; skips a frame if the next is still decoding. """
+        if not self._image_keys:
+            return True
+        key = self._image_keys[0]
+        is_ready = getattr(self.images, 'is_ready', None)
+        if is_ready and key in self.images and not is_ready(key):
+            return False # Still decoding on a worker: try again next frame
+        self.images.get(key)
+        self._image_keys.popleft()
+        return not self._image_keys
+
+    def _warm_variants(self):
+        boss_img = self.images.get('boss')
+        if self.level_data.get('is_boss_level') and boss_img:
+            boss_damage_variants(boss_img)
+        return True
+
+    def _build_state(self):
+        self.state = LevelState(self.level_data, self.images, self.sounds, seed=self.seed) # Also builds the player's variants
+        return True
+
+    def _pack_atlas(self):
+        pack_level(self.state)
+        return True
+
+    def step(self):
+        """ Runs (part of) the next main-thread job. Call once per transition frame. """
+        if self._jobs and self._jobs[0]():
+            self._jobs.popleft()
+
+    @property
+    def music_ready(self):
+        return self._music is None or self._music.done()
+
+    @property
+    def done(self):
+        return not self._jobs and self.music_ready
+
+    def finish(self):
+        """ Completes every remaining job now (blocking). """
+        while self._jobs:
+            if not self._jobs[0]():
+                key = self._image_keys.popleft() # Wait for this image after all
+                self.images.get(key)
+                continue
+            self._jobs.popleft()
+
+    def music_source(self):
+        """ (file object, name hint) for pygame.mixer.music.load, or None if there is no track. """
+        if not self.music_path:
+            return None
+        data = self._music.result() if self._music else _read_file(self.music_path)
+        return io.BytesIO(data), os.path.basename(self.music_path)
+
+    def take_state(self):
+        """ The prebuilt LevelState (finishing the prefetch first if needed). Only handed out once. """
+        self.finish()
+        state, self.state = self.state, None
+        return state
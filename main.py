@@ -1,133 +1,108 @@
 # /Users/junluo/Desktop/PlaneWar/main.py
 import pygame
-import random
 import os
 import sys
-import time
-import json  # <--- Import json
+import sqlite3
+import argparse
 
 # Import game settings and classes from other modules
 # Make sure settings.py defines necessary paths (IMG_DIR, SND_DIR, FONT_DIR, LEVELS_DIR)
 # and constants (colors, speeds, volumes, etc.)
 from settings import *
-from player import Player
-from bullet import Bullet, EnemyBullet
-from enemy import Enemy, EnemyBoss # Ensure enemy.py is updated for speed ranges
-from powerup import PowerUp
+from simulation import LevelState, FrameInput, step_level
+from renderer import make_level_renderer
+from text_cache import render_text, text_cache
+from asset_pack import open_asset_pack
+from asset_loader import AssetLoader
+from replay import InputRecorder, seed_arg
+from level_compiler import LevelLibrary
+from profiler import FrameProfiler, ProfilerOverlay, default_trace_path
+from autopilot import Autopilot
+from leaderboard import Leaderboard
+from idle import IdleScheduler
+from level_transition import Transition, LevelPrefetch
+from frame_pacer import FixedTimestep, FramePacer, render_rate
 
 # --- Define the path to the levels directory (Using path from settings.py) ---
 # Ensure LEVELS_DIR is defined correctly in settings.py
 # Example: LEVELS_DIR = os.path.join(BASE_DIR, 'levels')
 
-# --- Helper Functions (load_and_scale_image, load_sound, load_high_score, save_high_score) ---
-def load_and_scale_image(path, width, height, colorkey=None):
-    """Loads, scales, handles errors, and sets transparency for an image."""
-    if not path or not os.path.exists(path):
-        print(f"Error: Image file not found or path invalid: {path}. Using fallback.")
-        fallback = pygame.Surface((width, height))
-        fallback.fill((200, 50, 50)); pygame.draw.rect(fallback, WHITE, fallback.get_rect(), 1)
-        return fallback
-    try:
-        image = pygame.image.load(path).convert_alpha()
-        scaled_image = pygame.transform.scale(image, (width, height))
-        if colorkey is not None:
-            if colorkey == -1: colorkey = scaled_image.get_at((0, 0))
-            scaled_image.set_colorkey(colorkey, pygame.RLEACCEL)
-        # print(f"Successfully loaded and scaled: {os.path.basename(path)}")
-        return scaled_image
-    except pygame.error as e:
-        print(f"Warning: Failed to load/process image {path}: {e}. Using fallback.")
-        fallback = pygame.Surface((width, height))
-        fallback.fill((random.randint(50, 200), random.randint(50, 200), random.randint(50, 200)))
-        pygame.draw.rect(fallback, WHITE, fallback.get_rect(), 1)
-        return fallback
-
-def load_sound(path, volume):
-    """Loads a sound file, sets volume, and handles errors."""
+def find_level_music(levels):
+    """Maps level_number -> music file path for every level whose music file exists."""
+    music_paths = {}
+    print("\n--- Checking Level Music Paths ---")
+    for level_cfg in levels:
+        level_num = level_cfg.get('level_number')
+        music_filename = level_cfg.get('music') # e.g., "level1.ogg" or null
+        if level_num is not None and music_filename:
+            full_music_path = os.path.join(SND_DIR, music_filename)
+            if os.path.exists(full_music_path):
+                music_paths[level_num] = full_music_path
+                print(f"  Found music for Level {level_num}: {music_filename}")
+            else:
+                print(f"  Warning: Music file '{music_filename}' for Level {level_num} not found.")
+    return music_paths
+
+def level_music_track(level_num, music_paths):
+    """ The track for a level: its own music if it has one, else the default BGM, else None. """
+    track = music_paths.get(level_num)
+    if not track and Default_BGM_PATH and os.path.exists(Default_BGM_PATH):
+        track = Default_BGM_PATH
+    return track
+
+def level_index_after(levels, level_num):
+    """ Index of the first level numbered after level_num (hot reload may have added or removed levels). """
+    for index, level in enumerate(levels):
+        if level.get('level_number', index + 1) > level_num:
+            return index
+    return len(levels)
+
+def play_level_music(prefetch, current_music_path):
+    """ Switches the music for the prefetched level (kept playing if it's the same track). Returns the new current path. """
+    track = prefetch.music_path
     if not pygame.mixer or not pygame.mixer.get_init():
-        print("Mixer not initialized, cannot load sound.")
-        return None
-    if not path or not os.path.exists(path):
-        print(f"Warning: Sound file not found or path invalid: {path}")
-        return None
-    try:
-        sound = pygame.mixer.Sound(path)
-        sound.set_volume(volume)
-        # print(f"Successfully loaded sound: {os.path.basename(path)}")
-        return sound
-    except pygame.error as e:
-        print(f"Warning: Failed to load sound {path}: {e}")
-        return None
-
-def load_high_score(filepath):
-    """Loads the high score from a file, returning 0 on error or if file not found."""
-    try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r') as f:
-                score_str = f.read().strip()
-            # Ensure string is not empty before converting
-            return int(score_str) if score_str else 0
-        else:
-            print(f"Info: High score file not found: {filepath}. Returning 0.")
-            return 0
-    except (IOError, ValueError, Exception) as e:
-        print(f"Warning: Error loading high score from {filepath}: {e}. Returning 0.")
-        return 0
-
-def save_high_score(filepath, score):
-    """Saves the high score to a file."""
-    try:
-        with open(filepath, 'w') as f:
-            f.write(str(score))
-        print(f"Saved new high score {score} to '{os.path.basename(filepath)}'.")
-    except (IOError, Exception) as e:
-        print(f"Error: Failed to save high score to {filepath}: {e}")
-
-# --- NEW FUNCTION: Load level data ---
-def load_level_data(levels_directory):
-    """Loads all .json files from the specified directory and sorts them by level number."""
-    if not os.path.isdir(levels_directory):
-        print(f"Error: Levels directory not found: {levels_directory}")
-        return []
-    try:
-        level_files = [f for f in os.listdir(levels_directory) if f.endswith('.json')]
-    except OSError as e:
-        print(f"Error accessing levels directory {levels_directory}: {e}")
-        return []
-
-    loaded_levels = []
-    print(f"--- Loading Levels from: {levels_directory} ---")
-    if not level_files:
-        print("Warning: No .json level files found in the 'levels' directory!")
-        return []
-
-    for filename in level_files:
-        filepath = os.path.join(levels_directory, filename)
+        return current_music_path
+    if track and track != current_music_path:
+        print(f"Playing music: {os.path.basename(track)}")
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                level_data = json.load(f)
-            # Basic validation
-            if 'level_number' in level_data and isinstance(level_data['level_number'], int):
-                loaded_levels.append(level_data)
-                print(f"  Successfully loaded: {filename} (Level {level_data['level_number']})")
-            else:
-                print(f"  Warning: Skipping file {filename} - missing 'level_number' or not an integer.")
-        except json.JSONDecodeError as e:
-            print(f"  Error: Failed to parse JSON file {filename}: {e}")
-        except IOError as e:
-            print(f"  Error: Failed to read file {filename}: {e}")
-        except Exception as e:
-            print(f"  Unknown error loading level {filename}: {e}")
-
-    # Sort levels based on 'level_number' found in the JSON data
-    loaded_levels.sort(key=lambda lvl: lvl.get('level_number', float('inf')))
-
-    print(f"--- Level loading complete. Loaded {len(loaded_levels)} valid levels. ---")
-    return loaded_levels
+            # Bytes were read by a loader worker during the transition: no disk access here
+            pygame.mixer.music.load(*prefetch.music_source())
+            pygame.mixer.music.set_volume(BGM_VOLUME)
+            pygame.mixer.music.play(loops=-1)
+            return track
+        except (pygame.error, OSError) as e:
+            print(f"Error playing music '{track}': {e}")
+            return None
+    if not track and current_music_path: # No track for this level but music was playing
+        pygame.mixer.music.stop()
+        return None
+    return current_music_path
 
 # --- Screen Display Functions ---
-def show_start_screen(screen_surf, clock_obj, title_font, score_font, high_score):
-    """Displays the start screen and waits for player input."""
+def draw_load_progress(screen_surf, font, bar_rect, done, total):
+    """Draws the asset loading bar (or clears it once loading is done). Returns the area to update."""
+    area = bar_rect.inflate(200, 40).move(0, 10)
+    screen_surf.fill(BLACK, area)
+    if done < total:
+        pygame.draw.rect(screen_surf, WHITE, bar_rect, 1)
+        fill_rect = bar_rect.inflate(-4, -4)
+        fill_rect.width = int(fill_rect.width * done / total)
+        screen_surf.fill(GREEN, fill_rect)
+        label = render_text(font, f"Loading {done}/{total}", True, WHITE)
+        screen_surf.blit(label, label.get_rect(midtop=(bar_rect.centerx, bar_rect.bottom + 4)))
+    return area
+
+def next_menu_events(clock_obj, idle=None, timeout_ms=None):
+    """ Events for a menu loop: sleeps in the event queue with an IdleScheduler, else polls at FPS. """
+    if idle:
+        return idle.wait_events(timeout_ms)[0]
+    clock_obj.tick(FPS)
+    return pygame.event.get()
+
+def show_start_screen(screen_surf, clock_obj, title_font, score_font, high_score, loader=None, idle=None):
+    """Displays the start screen and waits for player input.
+    With an AssetLoader, shows its progress while assets stream in; a key press starts the game either way.
+    With an IdleScheduler, the wait blocks on events instead of polling (waking only to move the progress bar)."""
     if not title_font or not score_font:
         print("Error: Invalid fonts passed to show_start_screen.")
         # Attempt fallback if possible, otherwise exit might be necessary
@@ -139,15 +114,15 @@ def show_start_screen(screen_surf, clock_obj, title_font, score_font, high_score
     screen_surf.fill(BLACK)
     try:
         # Title
-        title_text = title_font.render("飞机大战", True, WHITE)
+        title_text = render_text(title_font, "飞机大战", True, WHITE)
         title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4))
         screen_surf.blit(title_text, title_rect)
         # High Score
-        high_score_text = score_font.render(f"历史最高分: {high_score}", True, WHITE)
+        high_score_text = render_text(score_font, f"历史最高分: {high_score}", True, WHITE)
         high_score_rect = high_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20))
         screen_surf.blit(high_score_text, high_score_rect)
         # Prompt
-        prompt_text = score_font.render("按任意键开始游戏", True, YELLOW)
+        prompt_text = render_text(score_font, "按任意键开始游戏", True, YELLOW)
         prompt_rect = prompt_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 3 // 4))
         screen_surf.blit(prompt_text, prompt_rect)
     except Exception as e:
@@ -162,19 +137,31 @@ def show_start_screen(screen_surf, clock_obj, title_font, score_font, high_score
             print(f"Error rendering fallback start screen text: {fallback_e}")
 
     pygame.display.flip()
+    bar_rect = pygame.Rect(0, 0, 300, 12)
+    bar_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT * 3 // 4 + 40)
+    shown_progress = None
     # Wait for key press
     waiting = True
     while waiting:
-        clock_obj.tick(FPS)
-        for event in pygame.event.get():
+        if loader:
+            loader.poll() # Convert finished images here rather than on the first gameplay frame
+            progress = loader.progress()
+            if progress != shown_progress and (shown_progress or progress[0] < progress[1]):
+                pygame.display.update(draw_load_progress(screen_surf, score_font, bar_rect, *progress))
+                shown_progress = progress
+        # Once loading is finished nothing on this screen changes: sleep until an event arrives
+        timeout_ms = IDLE_LOADING_POLL_MS if loader and not loader.done else None
+        for event in next_menu_events(clock_obj, idle, timeout_ms):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.KEYDOWN:
                 waiting = False
+            elif event.type == pygame.WINDOWEXPOSED:
+                pygame.display.flip()
 
-def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score):
-    """Displays the game over/win screen and waits for player choice."""
+def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score, idle=None):
+    """Displays the game over/win screen and waits for player choice (blocking on events with an IdleScheduler)."""
     font_large = fonts.get('large') or pygame.font.SysFont(None, FONT_SIZE_LARGE)
     font_score = fonts.get('score') or pygame.font.SysFont(None, FONT_SIZE_SCORE)
 
@@ -187,15 +174,15 @@ def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score):
     end_text_str = "YOU WIN!" if game_result == 'WIN' else "GAME OVER"
     end_text_color = GREEN if game_result == 'WIN' else RED
     try:
-        end_text = font_large.render(end_text_str, True, end_text_color)
+        end_text = render_text(font_large, end_text_str, True, end_text_color)
         text_rect = end_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 1 // 3))
         screen_surf.blit(end_text, text_rect)
         # Final Score Text
-        score_text_surf = font_score.render(f"Final Score: {final_score}", True, WHITE)
+        score_text_surf = render_text(font_score, f"Final Score: {final_score}", True, WHITE)
         score_rect = score_text_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         screen_surf.blit(score_text_surf, score_rect)
         # Prompt Text
-        prompt_text_surf = font_score.render("按 [R] 重新开始 , 按 [Q] 退出", True, YELLOW)
+        prompt_text_surf = render_text(font_score, "按 [R] 重新开始 , 按 [Q] 退出", True, YELLOW)
         prompt_rect = prompt_text_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT * 2 // 3))
         screen_surf.blit(prompt_text_surf, prompt_rect)
     except Exception as e:
@@ -205,10 +192,11 @@ def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score):
     # Wait for R or Q
     waiting = True
     while waiting:
-        clock_obj.tick(FPS)
-        for event in pygame.event.get():
+        for event in next_menu_events(clock_obj, idle):
             if event.type == pygame.QUIT:
                 return 'QUIT'
+            if event.type == pygame.WINDOWEXPOSED:
+                pygame.display.flip()
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     print("Player chose REPLAY.")
@@ -217,242 +205,162 @@ def show_end_screen(screen_surf, clock_obj, fonts, game_result, final_score):
                     print("Player chose QUIT.")
                     return 'QUIT'
 
-def show_level_start_screen(screen_surf, clock_obj, font, level_number):
-    """Displays the level transition screen."""
-    if not font: font = pygame.font.SysFont(None, FONT_SIZE_LARGE) # Fallback
-    screen_surf.fill(BLACK)
-    try:
-        level_text = font.render(f"Level {level_number}", True, WHITE)
-        text_rect = level_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-        screen_surf.blit(level_text, text_rect)
-    except Exception as e:
-        print(f"Error rendering level start screen text: {e}")
+def run_transition_frame(screen_surf, clock_obj, transition, prefetch=None, idle=None):
+    """
+    One frame of a level transition: keeps the event queue pumped, advances the
+    prefetch by one job and draws the transition. Returns False if the window was closed.
+    """
+    clock_obj.tick(FPS)
+    for event in pygame.event.get():
+        if idle: idle.handle_event(event)
+        if event.type == pygame.QUIT:
+            return False
+    if prefetch: prefetch.step()
+    transition.draw(screen_surf)
     pygame.display.flip()
-    pygame.time.wait(1500) # Pause for 1.5 seconds
-
-# --- REFACTORED Game Logic Function (run_game) ---
-def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data):
+    return True
+
+# --- Game Logic Shell (run_game) ---
+def read_frame_input(bomb_pressed, recorder=None):
+    """ Samples the live mouse/keyboard into a FrameInput for the simulation (and the recorder, if any). """
+    keys = pygame.key.get_pressed()
+    mouse_buttons = pygame.mouse.get_pressed()
+    mouse_pos = pygame.mouse.get_pos()
+    if recorder: recorder.record(mouse_pos, mouse_buttons, keys[pygame.K_SPACE], bomb_pressed)
+    return FrameInput(mouse_pos, keys[pygame.K_SPACE] or mouse_buttons[0], bomb_pressed)
+
+def autopilot_frame_input(state, autopilot, bomb_pressed, recorder=None):
+    """ The autopilot's FrameInput for this frame (BOMB_KEY still works), recorded like live input. """
+    frame_input = autopilot.decide(state)
+    frame_input.bomb = frame_input.bomb or bomb_pressed
+    if recorder: recorder.record(frame_input.mouse_pos, (frame_input.fire, False, False), False, frame_input.bomb)
+    return frame_input
+
+def run_game(screen_surf, clock_obj, fonts, images, sounds, level_data, seed=None, recorder=None, level_library=None,
+             profiler=None, profiler_overlay=None, autopilot=None, idle=None, state=None):
     """
-    Runs a single level. Spawns enemies, then boss after a delay if specified.
+    Runs a single level interactively. The game logic lives in simulation.step_level;
+    this loop only polls events, steps the simulation, renders and paces the frames.
+    The simulation runs at a fixed FPS steps per second (as many steps per frame as are due);
+    rendering runs at frame_pacer.render_rate() and interpolates between steps.
     Level ends when boss is defeated or player dies.
+    seed fixes the level's RNG streams (random if None); recorder (replay.InputRecorder) captures the inputs.
+    With a level_library, edits to this level's JSON are applied while it runs (hot reload).
+    profiler (profiler.FrameProfiler) times each phase of every frame; profiler_overlay shows it.
+    autopilot (autopilot.Autopilot) flies the ship while enabled; AUTOPILOT_TOGGLE_KEY switches it.
+    idle (idle.IdleScheduler) pauses the level while the window is hidden and throttles it while unfocused.
+    state is a LevelState already built for this level (level_transition.LevelPrefetch); seed is then unused.
     """
     level_num = level_data.get('level_number', '?')
     print(f"\n--- Starting Level {level_num} ---")
 
-    # --- Get Level Configuration ---
-    is_boss_level = level_data.get('is_boss_level', False) # Does this level HAVE a boss?
-    enemy_types = level_data.get('enemy_types', ['enemy1'])
-    spawn_interval = level_data.get('spawn_interval', ENEMY_SPAWN_INTERVAL)
-    max_on_screen = level_data.get('max_on_screen', MAX_ONSCREEN_ENEMIES)
-    enemy_speed_y_range = level_data.get('enemy_speed_y_range')
-    enemy_speed_x_range = level_data.get('enemy_speed_x_range')
-    powerup_interval = level_data.get('powerup_interval', POWERUP_SPAWN_INTERVAL)
-    # *** 新增：获取 Boss 延迟时间 ***
-    boss_appear_delay_seconds = level_data.get('boss_appear_delay_seconds', 99999) # Default to very long delay if not set
-
-    # --- Resources ---
     font_score = fonts.get('score') or pygame.font.SysFont(None, FONT_SIZE_SCORE)
-    player_img = images.get('player')
-    boss_img = images.get('boss')
-    powerup_images = images.get('powerups', {})
-    available_enemy_images = [img for etype in enemy_types if (img := images.get(etype))]
-    # ... (获取声音资源代码不变) ...
-    sounds = sounds # Pass the whole dict for simplicity below
-
-
-    # --- Initialize Level State ---
-    all_sprites = pygame.sprite.Group()
-    enemies = pygame.sprite.Group()     # Regular enemies
-    bullets = pygame.sprite.Group()     # Player bullets
-    enemy_bullets = pygame.sprite.Group() # Boss bullets
-    powerups = pygame.sprite.Group()
-    boss_group = pygame.sprite.GroupSingle() # For the single boss
-
-    if not player_img: sys.exit("Player image not loaded, cannot start game.")
-    player = Player(player_img, sounds.get('player_shoot'), sounds.get('shield_up'), sounds.get('shield_down'), sounds.get('powerup_pickup'), sounds.get('bomb'))
-    all_sprites.add(player)
-
-    game_over_local = False # Player died this level
-    level_passed = False    # Player met level objective (now only boss defeat)
-    boss_active = False     # Boss is currently on screen and active
-    boss_spawned = False    # Has the boss instance been created?
-    boss_defeated = False   # Has the boss been defeated?
-    boss_instance = None
-
-    enemy_spawn_timer = 0
-    powerup_last_spawn_time = pygame.time.get_ticks()
-    level_start_time = pygame.time.get_ticks()
+    if not images.get('player'): sys.exit("Player image not loaded, cannot start game.")
+    if state is None: state = LevelState(level_data, images, sounds, seed=seed)
+    if recorder: recorder.begin_level(level_data, state.seed)
+    renderer = make_level_renderer(screen_surf, font_score)
+    renderer.overlay = profiler_overlay
+
+    pacer = FramePacer(render_rate())
+    timestep = FixedTimestep(FPS)
+    bomb_pressed = False # Kept until a simulation step consumes it
 
     # --- Level Game Loop ---
-    running_this_level = True
-    while running_this_level:
-        delta_time = clock_obj.tick(FPS) / 1000.0
-        now = pygame.time.get_ticks() # Get current time once per frame
+    while not state.finished:
+        mode = idle.mode() if idle else 'active'
+        if idle: idle.enter('playing' if mode == 'active' else mode)
+        hidden = False
+        if mode == 'active':
+            if profiler: profiler.begin_frame()
+            steps = timestep.advance(pacer.wait())
+            if profiler: profiler.mark('tick')
+            events = pygame.event.get()
+        else:
+            # In the background the level steps once per frame at the idle frame rate (so it runs slower),
+            # or not at all while hidden; resuming starts a fresh timestep schedule
+            timestep.reset()
+            pacer.reset()
+            steps = 1
+            if idle.frame_rate():
+                if profiler: profiler.begin_frame()
+                clock_obj.tick(idle.frame_rate())
+                if profiler: profiler.mark('tick')
+                events = pygame.event.get()
+            else:
+                # Hidden (or paused in the background): no simulation or drawing until a window event arrives
+                hidden = True
+                events, repaint = idle.wait_events()
+                if repaint:
+                    renderer.invalidate() # Window shown again: repaint everything
 
         # --- Event Handling ---
-        for event in pygame.event.get():
+        for event in events:
+            if idle and not hidden and idle.handle_event(event):
+                renderer.invalidate()
             if event.type == pygame.QUIT:
-                return 'QUIT', player.score # Return current score on quit
-            if event.type == pygame.KEYDOWN:
-                if event.key == BOMB_KEY and not game_over_local:
-                    killed_by_bomb = player.use_bomb(enemies)
-                    player.score += killed_by_bomb # Add score for bomb kills
-
-        # --- Game Logic Update ---
-        if not game_over_local and not level_passed:
-            all_sprites.update()
-
-            # Player Shooting
-            keys = pygame.key.get_pressed()
-            mouse_buttons = pygame.mouse.get_pressed()
-            if keys[pygame.K_SPACE] or mouse_buttons[0]:
-                new_player_bullets = player.shoot()
-                for bullet in new_player_bullets:
-                    all_sprites.add(bullet)
-                    bullets.add(bullet)
-
-
-            # --- *** 修改后的 Boss 生成逻辑 *** ---
-            # Check if it's a boss level, if boss hasn't been spawned yet, and if delay time is reached
-            if is_boss_level and not boss_spawned: # Check if spawn attempted
-                elapsed_seconds = (now - level_start_time) / 1000
-                if elapsed_seconds >= boss_appear_delay_seconds:
-                    print(f"Boss appear delay reached ({boss_appear_delay_seconds}s). Spawning Boss!")
-                    if not boss_img:
-                        print(f"Error: Boss image missing for boss level {level_num}. Failing level.")
-                        game_over_local = True # Treat as failure if boss can't spawn
-                    else:
-                        boss_instance = EnemyBoss(boss_img, sounds.get('boss_shoot'), all_sprites, enemy_bullets)
-                        all_sprites.add(boss_instance)
-                        boss_group.add(boss_instance)
-                        boss_active = True   # Boss is now active
-                        boss_spawned = True # Mark as spawned so we don't try again
-                        print("Boss Incoming!")
-                        if sounds.get('boss_intro'):
-                            try: sounds.get('boss_intro').play()
-                            except pygame.error as e: print(f"Warning: Could not play boss intro sound: {e}")
-
-            # --- *** 修改后的普通小兵生成逻辑 *** ---
-            # Spawn regular enemies based on interval and count limit.
-            # This runs independently of the boss state (before and during boss fight).
-            if available_enemy_images: # Only spawn if types are defined
-                enemy_spawn_timer += 1
-                if enemy_spawn_timer >= spawn_interval and len(enemies) < max_on_screen:
-                    enemy_spawn_timer = 0
-                    chosen_img = random.choice(available_enemy_images)
-                    enemy = Enemy(chosen_img, speed_y_range=enemy_speed_y_range, speed_x_range=enemy_speed_x_range)
-                    all_sprites.add(enemy)
-                    enemies.add(enemy)
-
-            # --- Powerup Spawning (代码不变) ---
-            if now - powerup_last_spawn_time > powerup_interval:
-                powerup_last_spawn_time = now
-                if powerup_images: # Check if powerup images were loaded
-                    powerup = PowerUp(powerup_images)
-                    all_sprites.add(powerup)
-                    powerups.add(powerup)
-
-            # --- Collisions ---
-            # ... (碰撞检测代码基本不变, 确保 Boss 击败逻辑设置 level_passed) ...
-            # Player Bullets vs Enemies
-            enemy_hits = pygame.sprite.groupcollide(enemies, bullets, True, True)
-            for _ in enemy_hits:
-                player.score += 1
-                if sounds.get('enemy_explode'):
-                    try: sounds.get('enemy_explode').play()
-                    except pygame.error as e: print(f"Warning: Could not play enemy explode sound: {e}")
-
-            # Player Bullets vs Boss
-            if boss_active and boss_instance:
-                bullets_hitting_boss = pygame.sprite.spritecollide(boss_instance, bullets, True)
-                if bullets_hitting_boss:
-                    if sounds.get('boss_hit'):
-                        try: sounds.get('boss_hit').play()
-                        except pygame.error as e: print(f"Warning: Could not play boss hit sound: {e}")
-                    boss_instance.health -= len(bullets_hitting_boss)
-                    if boss_instance.health <= 0:
-                        # --- Boss Defeated ---
-                        if sounds.get('boss_explode'):
-                            try: sounds.get('boss_explode').play()
-                            except pygame.error as e: print(f"Warning: Could not play boss explode sound: {e}")
-                        if sounds.get('game_win'): # Play win sound immediately
-                            try: sounds.get('game_win').play()
-                            except pygame.error as e: print(f"Warning: Could not play game win sound: {e}")
-
-                        boss_instance.kill()
-                        player.score += 50
-                        print("Boss Defeated!")
-                        boss_defeated = True
-                        boss_active = False
-                        boss_instance = None
-                        # *** 关卡通过条件 ***
-                        level_passed = True # Level passed ONLY when boss is defeated
-
-            # Player vs Powerups
-            # ... (不变) ...
-            powerup_hits = pygame.sprite.spritecollide(player, powerups, True)
-            for hit_powerup in powerup_hits:
-                player.activate_powerup(hit_powerup.type)
-
-
-            # --- Player Death Check ---
-            # ... (不变, 但现在只会在 boss 关卡发生) ...
-            if now - level_start_time > STARTUP_GRACE_PERIOD:
-                if player.alive() and not player.shield_active:
-                    player_enemy_hits = pygame.sprite.spritecollide(player, enemies, True) # Kill enemy on collision
-                    player_boss_collision = boss_active and boss_instance and pygame.sprite.collide_rect(player, boss_instance)
-                    enemy_bullet_hits = pygame.sprite.spritecollide(player, enemy_bullets, True) # Kill bullet
-
-                    if player_enemy_hits or player_boss_collision or enemy_bullet_hits:
-                        reason = "Enemy" if player_enemy_hits else ("Boss Collision" if player_boss_collision else "Boss Bullet")
-                        print(f"Player hit by {reason}! Level Failed!")
-                        if sounds.get('player_lose'):
-                            try: sounds.get('player_lose').play()
-                            except pygame.error as e: print(f"Warning: Could not play player lose sound: {e}")
-                        player.kill()
-                        game_over_local = True
-
-
-            # --- Level Completion Check (REMOVED Time Check) ---
-            # Level now only completes if level_passed is set (by defeating boss)
-
-        # --- Drawing ---
-        screen_surf.fill(BLACK)
-        all_sprites.draw(screen_surf)
-        # ... (UI 绘制代码不变, 但时间显示部分可以移除了) ...
-        try:
-            score_text = font_score.render(f"Score: {player.score}", True, WHITE)
-            screen_surf.blit(score_text, (10, 10))
-            bomb_text = font_score.render(f"Bombs: {player.bomb_count}", True, ORANGE)
-            screen_surf.blit(bomb_text, (10, 40))
-            level_text_surf = font_score.render(f"Level: {level_num}", True, WHITE)
-            screen_surf.blit(level_text_surf, (SCREEN_WIDTH - level_text_surf.get_width() - 10, 10))
-            # Time display removed as levels are no longer timed
-        except Exception as e:
-            print(f"Error rendering UI: {e}")
-
-
-        # Boss Health Bar
-        if boss_active and boss_instance:
-            boss_instance.draw_health_bar(screen_surf)
-
-        # --- Check Level End Condition ---
-        if game_over_local or level_passed:
-            running_this_level = False
-
-        pygame.display.flip()
+                if recorder: recorder.end_level(state)
+                return 'QUIT', state.player.score # Return current score on quit
+            if event.type == pygame.KEYDOWN and event.key == BOMB_KEY:
+                bomb_pressed = True
+            elif event.type == pygame.KEYDOWN and event.key == PROFILER_TOGGLE_KEY and profiler_overlay:
+                profiler_overlay.toggle()
+            elif event.type == pygame.KEYDOWN and event.key == PROFILER_EXPORT_KEY and profiler:
+                print(f"Profiler trace written: {profiler.export_chrome_trace(default_trace_path())}")
+            elif event.type == pygame.KEYDOWN and event.key == AUTOPILOT_TOGGLE_KEY and autopilot:
+                autopilot.toggle()
+                if not autopilot.enabled:
+                    pygame.mouse.set_pos(state.player.rect.center) # Hand back control where the bot left the ship
+        if hidden:
+            continue
+
+        if level_library and state.level_num in level_library.poll(pygame.time.get_ticks()):
+            reloaded = level_library.get(state.level_num)
+            if reloaded:
+                state.configure(reloaded)
+                print(f"Level {state.level_num} reloaded from disk.")
+        if profiler: profiler.mark('events')
+
+        # --- Fixed-timestep Simulation (input is sampled and recorded per step) ---
+        for _ in range(steps):
+            if autopilot and autopilot.enabled:
+                frame_input = autopilot_frame_input(state, autopilot, bomb_pressed, recorder)
+            else:
+                frame_input = read_frame_input(bomb_pressed, recorder)
+            bomb_pressed = False
+            step_level(state, frame_input, profiler)
+            if state.finished:
+                break
+        renderer.render(state, profiler, timestep.alpha)
+        if profiler: profiler.end_frame()
 
     # --- Level Loop Ended ---
-    result = 'PASSED' if level_passed else ('FAILED' if game_over_local else 'QUIT')
-    print(f"--- Level {level_num} Ended. Result: {result}, Score: {player.score} ---")
-    time.sleep(1.0)
-    return result, player.score
+    if recorder: recorder.end_level(state)
+    result = state.result
+    print(f"--- Level {level_num} Ended. Result: {result}, Score: {state.player.score} ---")
+    print(f"Projectile pools: player {state.bullets.stats()}, boss {state.enemy_bullets.stats()}")
+    print(f"Text cache: {text_cache.stats()}")
+    print(f"Audio: {state.audio.stats()}")
+    print(f"Frame pacing: {pacer.stats()}, simulation steps dropped: {timestep.dropped}")
+    if profiler and profiler.summary():
+        summary = profiler.summary()
+        print(f"Frame time (last {summary['frames']} frames): busy {summary['busy_ms']}, total {summary['frame_ms']}")
+    return result, state.player.score
 
 # ==============================================================================
 # --- Main Application Entry Point ---
 # ==============================================================================
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PlaneWar - 飞机大战")
+    parser.add_argument('--record', metavar='PATH', help="Record every level's inputs to PATH (replay with headless.py --replay)")
+    parser.add_argument('--autopilot', action='store_true', help="Start with the autopilot bot flying (toggle with F2)")
+    parser.add_argument('--player', default=PLAYER_NAME, help="Name to record scores under in the leaderboard")
+    parser.add_argument('--seed', type=seed_arg, help="Fix the random seed: level N uses seed + N - 1")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Initializes Pygame, loads all assets, and runs the main game loop."""
+    args = parse_args(argv)
+    recorder = InputRecorder() if args.record else None
     print("--- Pygame Initialization ---")
     try:
         pygame.init()
@@ -485,6 +393,7 @@ def main():
             fonts['title'] = pygame.font.Font(UI_FONT_PATH, FONT_SIZE_TITLE)
             fonts['large'] = pygame.font.Font(UI_FONT_PATH, FONT_SIZE_LARGE)
             fonts['score'] = pygame.font.Font(UI_FONT_PATH, FONT_SIZE_SCORE)
+            fonts['small'] = pygame.font.Font(UI_FONT_PATH, FONT_SIZE_SMALL)
             print(f"Successfully loaded font: {os.path.basename(UI_FONT_PATH)}")
         else:
             # If path doesn't exist or isn't set, force fallback
@@ -496,6 +405,7 @@ def main():
             fonts['title'] = pygame.font.SysFont(None, FONT_SIZE_TITLE)
             fonts['large'] = pygame.font.SysFont(None, FONT_SIZE_LARGE)
             fonts['score'] = pygame.font.SysFont(None, FONT_SIZE_SCORE)
+            fonts['small'] = pygame.font.SysFont(None, FONT_SIZE_SMALL)
             print("Loaded system default font.")
         except Exception as e_sys:
             # If even system font fails, it's critical
@@ -503,85 +413,36 @@ def main():
             pygame.quit()
             sys.exit("Font Loading Error")
 
-    # --- Load General Assets (Images & Sounds) ---
-    images = {}
-    sounds = {}
+    # --- Start Loading General Assets & Level Data (background) ---
+    # The start screen is shown right away; images/sounds/levels stream in on worker threads
+    # and gameplay only waits for an asset that is still missing when it is first used.
+    print("\n--- Loading General Assets (background) ---")
+    # Prebaked pack (memory-mapped, no decoding) when available; sources otherwise
+    asset_pack = open_asset_pack() if USE_ASSET_PACK else None
+    if asset_pack: print(f"Using asset pack: {os.path.basename(asset_pack.path)}")
+    loader = AssetLoader(asset_pack)
+    loader.submit('levels', LevelLibrary, LEVELS_DIR) # Compiled + validated, served from the level cache
+    images, sounds = loader.images, loader.sounds
+    LEVELS = None # Taken from the loader when the first level starts
+    level_library = None
     music_paths = {} # Store paths to level-specific music files
-    print("\n--- Loading General Assets ---")
-    try:
-        # Load Player Image
-        images['player'] = load_and_scale_image(PLAYER_IMG_PATH, PLAYER_WIDTH, PLAYER_HEIGHT)
-        if not images['player']: raise ValueError("Failed to load essential player image.")
-
-        # Load Enemy Images (Add more keys as needed based on settings.py)
-        enemy_image_configs = {
-            'enemy1': (ENEMY1_IMG_PATH, ENEMY1_WIDTH, ENEMY1_HEIGHT),
-            'enemy2': (ENEMY2_IMG_PATH, ENEMY2_WIDTH, ENEMY2_HEIGHT),
-            'enemy3': (ENEMY3_IMG_PATH, ENEMY3_WIDTH, ENEMY3_HEIGHT),
-            'enemy4': (ENEMY4_IMG_PATH, ENEMY4_WIDTH, ENEMY4_HEIGHT),
-            'boss':   (ENEMY_BOSS_IMG_PATH, ENEMY_BOSS_WIDTH, ENEMY_BOSS_HEIGHT),
-        }
-        for key, (path, w, h) in enemy_image_configs.items():
-             images[key] = load_and_scale_image(path, w, h)
-             # Optionally check if essential images loaded: if key == 'boss' and not images[key]: raise ...
-
-        # Load Powerup Images
-        images['powerups'] = {}
-        for type_key, path in POWERUP_IMAGES.items():
-            img = load_and_scale_image(path, POWERUP_WIDTH, POWERUP_HEIGHT)
-            if img: images['powerups'][type_key] = img
-            else: print(f"Warning: Failed to load powerup image for type '{type_key}'")
-
-        # Load Sound Effects
-        sound_configs = {
-            'player_shoot': (SHOOT_SOUND_PATH, PLAYER_SHOOT_VOLUME),
-            'enemy_explode': (ENEMY_EXPLODE_SOUND_PATH, ENEMY_EXPLODE_VOLUME),
-            'boss_explode': (BOSS_EXPLODE_SOUND_PATH, BOSS_EXPLODE_VOLUME),
-            'powerup_pickup': (POWERUP_PICKUP_SOUND_PATH, POWERUP_PICKUP_VOLUME),
-            'game_win': (WIN_SOUND_PATH, WIN_VOLUME),
-            'player_lose': (LOSE_SOUND_PATH, LOSE_VOLUME),
-            'boss_intro': (BOSS_INTRO_SOUND_PATH, BOSS_INTRO_VOLUME),
-            'boss_hit': (BOSS_HIT_SOUND_PATH, BOSS_HIT_VOLUME),
-            'shield_up': (SHIELD_UP_SOUND_PATH, SHIELD_UP_VOLUME),
-            'shield_down': (SHIELD_DOWN_SOUND_PATH, SHIELD_DOWN_VOLUME),
-            'bomb': (BOMB_SOUND_PATH, BOMB_VOLUME),
-            'boss_shoot': (BOSS_SHOOT_SOUND_PATH, BOSS_SHOOT_VOLUME),
-        }
-        for key, (path, vol) in sound_configs.items():
-            snd = load_sound(path, vol)
-            if snd: sounds[key] = snd
-            # No warning here as load_sound already prints warnings
-
-        print("--- General Assets Loaded ---")
-
-    except Exception as e:
-        print(f"CRITICAL ERROR during asset loading: {e}")
-        pygame.quit()
-        sys.exit("Asset Loading Error")
 
-    # --- Load Level Data ---
-    LEVELS = load_level_data(LEVELS_DIR)
-    if not LEVELS:
-        print("CRITICAL ERROR: No level data found or loaded. Exiting.")
-        pygame.quit()
-        sys.exit("Level Data Error")
+    # --- Frame Profiler (kept across levels so the overlay toggle sticks) ---
+    profiler = FrameProfiler() if PROFILER_ENABLED else None
+    profiler_overlay = ProfilerOverlay(profiler, fonts.get('small') or fonts.get('score')) if profiler else None
+    autopilot = Autopilot(enabled=args.autopilot)
+    idle = IdleScheduler() # Menus sleep on events; the level pauses/throttles in the background
 
-    # --- Prepare Music Paths (after loading LEVELS) ---
-    print("\n--- Checking Level Music Paths ---")
-    for level_cfg in LEVELS:
-        level_num = level_cfg.get('level_number')
-        music_filename = level_cfg.get('music') # e.g., "level1.ogg" or null
-        if level_num is not None and music_filename:
-            full_music_path = os.path.join(SND_DIR, music_filename)
-            if os.path.exists(full_music_path):
-                music_paths[level_num] = full_music_path
-                print(f"  Found music for Level {level_num}: {music_filename}")
-            else:
-                print(f"  Warning: Music file '{music_filename}' for Level {level_num} not found.")
-
-    # --- Load High Score ---
-    high_score = load_high_score(HIGH_SCORE_FILE_PATH)
+    # --- Leaderboard (imports the old highscore.txt on first use) ---
+    try:
+        leaderboard = Leaderboard()
+        high_score = leaderboard.best_score()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Leaderboard unavailable, scores won't be saved: {e}")
+        leaderboard = None
+        high_score = 0
     print(f"\n--- High Score Loaded: {high_score} ---")
+    run_id = None
 
     # --- Application State Machine ---
     app_running = True
@@ -589,6 +450,8 @@ def main():
     current_level_index = 0
     final_score_this_run = 0
     current_music_path = None # Track the path of the music currently playing
+    prefetch = None # level_transition.LevelPrefetch of the level about to start
+    transition = None # level_transition.Transition on screen in LEVEL_INTRO / LEVEL_END
 
     # --- Main Game Loop ---
     while app_running:
@@ -600,68 +463,112 @@ def main():
                  pygame.mixer.music.stop()
             current_music_path = None
             # Show screen and wait for key press
-            show_start_screen(screen, clock, fonts.get('title'), fonts.get('score'), high_score)
+            idle.enter('start_screen')
+            show_start_screen(screen, clock, fonts.get('title'), fonts.get('score'), high_score, loader, idle)
             # Reset for new game attempt
             current_level_index = 0
             final_score_this_run = 0
+            prefetch = None
+            run_started = pygame.time.get_ticks()
+            if leaderboard: run_id = leaderboard.begin_run(args.player, args.seed)
             game_state = 'LEVEL_START' # Proceed to first level prep
 
         # --- State: LEVEL_START ---
         elif game_state == 'LEVEL_START':
+            idle.enter('transition')
+            if LEVELS is None:
+                try:
+                    level_library = loader.result('levels') # Normally finished while the start screen was up
+                    LEVELS = level_library.levels # Kept up to date in place by hot reload
+                except Exception as e:
+                    print(f"CRITICAL ERROR during level loading: {e}")
+                    LEVELS = []
+                if not LEVELS:
+                    print("CRITICAL ERROR: No level data found or loaded. Exiting.")
+                    loader.shutdown()
+                    pygame.quit()
+                    sys.exit("Level Data Error")
+                music_paths = find_level_music(LEVELS)
+
             if current_level_index < len(LEVELS):
                 level_data = LEVELS[current_level_index]
                 level_num = level_data.get('level_number', current_level_index + 1)
-
-                # --- Handle Music for the Level ---
-                track_to_play = music_paths.get(level_num) # Specific track for this level?
-                if not track_to_play:
-                    # No specific track, try default BGM
-                    default_bgm = Default_BGM_PATH # Use constant directly
-                    if default_bgm and os.path.exists(default_bgm):
-                         track_to_play = default_bgm
-                    # else: print(f"Level {level_num}: No specific or default music.")
-
-                # Play if track found and different from current
-                if track_to_play and track_to_play != current_music_path:
-                    if pygame.mixer and pygame.mixer.get_init():
-                        print(f"Playing music: {os.path.basename(track_to_play)}")
-                        try:
-                            pygame.mixer.music.load(track_to_play)
-                            pygame.mixer.music.set_volume(BGM_VOLUME)
-                            pygame.mixer.music.play(loops=-1)
-                            current_music_path = track_to_play
-                        except pygame.error as e:
-                            print(f"Error playing music '{track_to_play}': {e}")
-                            current_music_path = None
-                # Stop if no track for this level but music was playing
-                elif not track_to_play and current_music_path:
-                     if pygame.mixer and pygame.mixer.get_init():
-                         pygame.mixer.music.stop()
-                     current_music_path = None
-                # --- End Music Handling ---
-
-                # Show transition screen
-                show_level_start_screen(screen, clock, fonts.get('large'), level_num)
-                game_state = 'RUNNING_LEVEL' # Start playing the level
+                # Usually already started during the previous level's end banner
+                if not prefetch or prefetch.level_data is not level_data:
+                    level_seed = None if args.seed is None else args.seed + current_level_index
+                    prefetch = LevelPrefetch(level_data, images, sounds, level_seed, loader,
+                                             level_music_track(level_num, music_paths))
+                transition = Transition(f"Level {level_num}", fonts.get('large'), LEVEL_INTRO_MS)
+                music_pending = True
+                game_state = 'LEVEL_INTRO' # Animated; the level starts once it and the prefetch are done
             else:
                 # All levels completed successfully
                 game_state = 'GAME_WON'
 
+        # --- State: LEVEL_INTRO / LEVEL_END (animated transitions, prefetching the next level) ---
+        elif game_state in ('LEVEL_INTRO', 'LEVEL_END'):
+            idle.enter('transition')
+            if not run_transition_frame(screen, clock, transition, prefetch, idle):
+                if leaderboard: leaderboard.end_run(run_id, final_score_this_run, 'QUIT', current_level_index,
+                                                    pygame.time.get_ticks() - run_started)
+                app_running = False
+            elif game_state == 'LEVEL_INTRO':
+                if music_pending and prefetch.music_ready:
+                    current_music_path = play_level_music(prefetch, current_music_path)
+                    music_pending = False
+                if transition.finished and prefetch.done:
+                    game_state = 'RUNNING_LEVEL' # Start playing the level
+            elif transition.finished:
+                game_state = level_end_next
+
         # --- State: RUNNING_LEVEL ---
         elif game_state == 'RUNNING_LEVEL':
-            level_data = LEVELS[current_level_index]
-            # Run the actual level gameplay
-            level_result, score_at_level_end = run_game(screen, clock, fonts, images, sounds, level_data)
+            level_data = prefetch.level_data
+            level_num = level_data.get('level_number', current_level_index + 1)
+            if level_library and not level_library.get(level_num):
+                # Its file was deleted (or broken) since the prefetch: go on with the next level, if any
+                print(f"Level {level_num} is no longer on disk; skipping it.")
+                current_level_index = level_index_after(LEVELS, level_num)
+                prefetch = None
+                game_state = 'LEVEL_START'
+                continue
+            # Run the actual level gameplay, starting from the state the prefetch built
+            level_state = prefetch.take_state()
+            prefetch = None
+            level_started = pygame.time.get_ticks()
+            level_result, score_at_level_end = run_game(screen, clock, fonts, images, sounds, level_data,
+                                                        recorder=recorder,
+                                                        level_library=level_library if LEVEL_HOT_RELOAD else None,
+                                                        profiler=profiler, profiler_overlay=profiler_overlay,
+                                                        autopilot=autopilot, idle=idle, state=level_state)
+            if recorder: print(f"Recording saved: {recorder.save(args.record)}")
             final_score_this_run = score_at_level_end # Record score achieved in this run
+            if leaderboard: # Queued; written by the leaderboard's background thread
+                leaderboard.record_level(run_id, args.player, level_data.get('level_number', current_level_index + 1),
+                                         score_at_level_end, pygame.time.get_ticks() - level_started, level_result)
 
             # Process level outcome
             if level_result == 'PASSED':
-                current_level_index += 1 # Move to next level index
+                # Next level by number: hot reload may have changed LEVELS while this one ran
+                current_level_index = level_index_after(LEVELS, level_num)
                 # Check if that was the last level
-                game_state = 'LEVEL_START' if current_level_index < len(LEVELS) else 'GAME_WON'
+                level_end_next = 'LEVEL_START' if current_level_index < len(LEVELS) else 'GAME_WON'
+                if level_end_next == 'LEVEL_START': # Get the next level ready while the banner is up
+                    next_level = LEVELS[current_level_index]
+                    next_seed = None if args.seed is None else args.seed + current_level_index
+                    prefetch = LevelPrefetch(next_level, images, sounds, next_seed, loader,
+                                             level_music_track(next_level.get('level_number', current_level_index + 1), music_paths))
+                transition = Transition(f"Level {level_num} Clear!", fonts.get('large'), LEVEL_END_MS, GREEN,
+                                        backdrop=screen.copy(), fade_out=False)
+                game_state = 'LEVEL_END'
             elif level_result == 'FAILED':
-                game_state = 'GAME_OVER' # Player lost
+                level_end_next = 'GAME_OVER' # Player lost
+                transition = Transition(f"Level {level_num} Failed", fonts.get('large'), LEVEL_END_MS, RED,
+                                        backdrop=screen.copy(), fade_out=False)
+                game_state = 'LEVEL_END'
             elif level_result == 'QUIT':
+                if leaderboard: leaderboard.end_run(run_id, final_score_this_run, 'QUIT', current_level_index,
+                                                    pygame.time.get_ticks() - run_started)
                 app_running = False # Player quit mid-game
 
         # --- State: GAME_WON ---
@@ -683,21 +590,28 @@ def main():
                 pygame.mixer.music.stop()
             current_music_path = None
 
-            # Check & Save High Score
+            # Record the run; the high score is just the top leaderboard entry
+            if leaderboard:
+                leaderboard.end_run(run_id, final_score_this_run, game_result_for_screen, current_level_index,
+                                    pygame.time.get_ticks() - run_started)
             if final_score_this_run > high_score:
                 print(f"New High Score: {final_score_this_run}")
-                save_high_score(HIGH_SCORE_FILE_PATH, final_score_this_run)
                 high_score = final_score_this_run # Update score shown on start screen if replaying
 
             # Show End Screen and get player choice
-            player_choice = show_end_screen(screen, clock, fonts, game_result_for_screen, final_score_this_run)
+            idle.enter('end_screen')
+            player_choice = show_end_screen(screen, clock, fonts, game_result_for_screen, final_score_this_run, idle)
             if player_choice == 'QUIT':
                 app_running = False
             elif player_choice == 'REPLAY':
                 game_state = 'START_SCREEN' # Loop back to start
 
     # --- Game Exit ---
+    print("CPU use by state:")
+    idle.report()
     print("Exiting PlaneWar.")
+    loader.shutdown()
+    if leaderboard: leaderboard.close() # Waits for queued writes
     pygame.quit()
     sys.exit()
 
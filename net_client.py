@@ -0,0 +1,282 @@
+# /Users/junluo/Desktop/PlaneWar/net_client.py
+"""
+Test and play clients for net_server.py.
+
+A GameClient joins a room, sends one input per tick and keeps the latest
+snapshot (decoding each delta against the one before it). Without --render the
+clients are scripted pilots, so many can run in one process against a local
+server to load it; with --render the first client opens a window and is flown
+with the mouse like the single-player game (SPACE / left button fires,
+BOMB_KEY drops a bomb).
+
+Each client counts what it receives: snapshots, keyframes, bytes, decode time
+and the gaps between snapshots (jitter), printed per client at the end.
+
+Usage:
+    python net_client.py                               # one scripted client in room 'default'
+    python net_client.py --clients 8 --rooms 2 --seconds 30
+    python net_client.py --render --room coop          # play; add scripted wingmen with --clients 3
+"""
+import os
+import json
+import math
+import time
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+import pygame
+from settings import *
+from simulation import FrameInput
+from assets import load_images
+from asset_pack import open_asset_pack
+from bullet import get_projectile_surface
+from powerup import get_powerup_images
+from sprite_variants import player_variants, boss_damage_variants, damage_stage
+from net_protocol import (MSG_HELLO, MSG_WELCOME, MSG_LEVEL, MSG_SNAPSHOT, MSG_ERROR, MSG_BYE, KEYFRAME, read_message,
+                          message_size, pack_json, pack_message, pack_input, unpack_snapshot,
+                          PLAYER_ALIVE, PLAYER_SHIELD)
+
+
+def sweep_pilot(phase=0.0):
+    """ Scripted pilot: sweeps along the bottom (offset by phase so clients spread out), always firing. """
+    def pilot(client, frame):
+        x = SCREEN_WIDTH // 2 + int((SCREEN_WIDTH // 2 - PLAYER_WIDTH) * math.sin(frame / 90 + phase))
+        return FrameInput((x, SCREEN_HEIGHT - 60), fire=True, bomb=(frame % 600 == 599))
+    return pilot
+
+
+class GameClient:
+    """ One connection to the server: inputs up, snapshots down. """
+    def __init__(self, name, room, pilot=None, host=NET_HOST, port=NET_PORT):
+        self.name = name
+        self.room = room
+        self.pilot = pilot or sweep_pilot()
+        self.host = host
+        self.port = port
+        self.client_id = None
+        self.tick_rate = FPS
+        self.level = None     # Latest LEVEL message
+        self.snapshot = None  # Latest decoded Snapshot
+        self.error = None
+        self.frame = 0
+        self._writer = None
+        # Stats
+        self.bytes_in = self.bytes_out = self.raw_bytes = 0
+        self.snapshots = self.keyframes = 0
+        self.decode_ms = deque(maxlen=FPS * 60)
+        self.gaps_ms = deque(maxlen=FPS * 60)
+        self._last_arrival = None
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._send(pack_json(MSG_HELLO, {'name': self.name, 'room': self.room}))
+        msg_type, body = await read_message(reader)
+        self.bytes_in += message_size(body)
+        if msg_type != MSG_WELCOME:
+            self.error = json.loads(body).get('error') if msg_type == MSG_ERROR else f"unexpected message {msg_type}"
+            raise ConnectionError(self.error)
+        welcome = json.loads(body)
+        self.client_id = welcome['client_id']
+        self.tick_rate = welcome['tick_rate']
+        return reader
+
+    def _send(self, message):
+        self._writer.write(message)
+        self.bytes_out += len(message)
+
+    def _on_message(self, msg_type, body):
+        self.bytes_in += message_size(body)
+        if msg_type == MSG_SNAPSHOT:
+            start = time.perf_counter()
+            # The server only deltas against the latest snapshot it sent us
+            base_tick, raw_size, self.snapshot = unpack_snapshot(body, self.snapshot)
+            self.decode_ms.append((time.perf_counter() - start) * 1000)
+            self.snapshots += 1
+            self.raw_bytes += raw_size
+            if base_tick == KEYFRAME: self.keyframes += 1
+            now = time.perf_counter()
+            if self._last_arrival is not None: self.gaps_ms.append((now - self._last_arrival) * 1000)
+            self._last_arrival = now
+        elif msg_type == MSG_LEVEL:
+            self.level = json.loads(body)
+        elif msg_type == MSG_ERROR:
+            self.error = json.loads(body).get('error')
+
+    async def receive(self, reader):
+        try:
+            while True:
+                self._on_message(*await read_message(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass # Server closed the connection
+
+    def send_input(self, frame_input):
+        self._send(pack_input(self.frame, frame_input))
+        self.frame += 1
+
+    async def run(self, seconds=None):
+        """ Scripted session: one pilot input per tick for seconds (or until the server disconnects). """
+        reader = await self.connect()
+        receiver = asyncio.create_task(self.receive(reader))
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        end = next_tick + seconds if seconds else None
+        try:
+            while not receiver.done() and (end is None or loop.time() < end):
+                self.send_input(self.pilot(self, self.frame))
+                next_tick += period
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        finally:
+            await self.close(receiver)
+
+    async def close(self, receiver=None):
+        if self._writer and not self._writer.is_closing():
+            self._send(pack_message(MSG_BYE))
+            self._writer.close()
+        if receiver:
+            receiver.cancel()
+
+    def stats(self, seconds):
+        gaps = np.array(self.gaps_ms) if self.gaps_ms else np.zeros(1)
+        own = self.snapshot.player(self.client_id)[1] if self.snapshot else None
+        return {'name': self.name, 'room': self.room, 'snapshots': self.snapshots, 'keyframes': self.keyframes,
+                'in_kbps': round(self.bytes_in * 8 / 1000 / seconds, 1),
+                'out_kbps': round(self.bytes_out * 8 / 1000 / seconds, 1),
+                'bytes_per_snapshot': round(self.bytes_in / self.snapshots) if self.snapshots else None,
+                'compression': round(self.raw_bytes / self.bytes_in, 2) if self.bytes_in else None,
+                'decode_ms': round(float(np.mean(self.decode_ms)), 4) if self.decode_ms else None,
+                'gap_ms': round(float(gaps.mean()), 2), 'jitter_ms': round(float(gaps.std()), 2),
+                'score': int(own['score']) if own is not None else None}
+
+
+# --- Rendered client ---
+class SnapshotView:
+    """ Draws snapshots with the game's images. """
+    def __init__(self, screen_surf, images, font):
+        self.screen = screen_surf
+        self.images = images
+        self.font = font
+        player_img = images.get('player')
+        radius = max(player_img.get_size()) // 2 + 8 # Same shield ring as Player
+        self.player_variants = player_variants(player_img, radius, SHIELD_VISUAL_COLOR)
+        self.boss_variants = boss_damage_variants(images['boss']) if images.get('boss') else None
+        self.powerup_images = get_powerup_images(images.get('powerups', {}))
+        self.bullet = get_projectile_surface('bullet')
+        self.enemy_bullet = get_projectile_surface('enemy_bullet')
+
+    def draw(self, snap, level, client_id):
+        screen = self.screen
+        screen.fill(BLACK)
+        if snap is None or level is None:
+            pygame.display.flip()
+            return
+        enemy_images = [self.images.get(etype) for etype in level['enemy_types']]
+        items = []
+        for images, cols in ((enemy_images, snap.enemies), (self.powerup_images, snap.powerups)):
+            items += [(images[k], (x, y)) for x, y, k in zip(cols.x.tolist(), cols.y.tolist(), cols.kind.tolist())]
+        for image, cols in ((self.bullet, snap.bullets), (self.enemy_bullet, snap.boss_bullets)):
+            items += [(image, pos) for pos in zip(cols.x.tolist(), cols.y.tolist())]
+        screen.blits(items, doreturn=False)
+        if snap.boss and self.boss_variants:
+            x, y, health, max_health = snap.boss
+            screen.blit(self.boss_variants[damage_stage(health, max_health)], (x, y))
+        hud_y = 10
+        own_slot, _ = snap.player(client_id)
+        for slot, player in enumerate(snap.players):
+            if player['flags'] & PLAYER_ALIVE:
+                variant = 'shielded' if player['flags'] & PLAYER_SHIELD else 'normal'
+                screen.blit(self.player_variants[variant], (int(player['x']), int(player['y'])))
+            color = ORANGE if slot == own_slot else WHITE
+            status = "" if player['flags'] & PLAYER_ALIVE else " (down)"
+            text = self.font.render(f"P{slot + 1}: {player['score']}  Bombs: {player['bombs']}{status}", True, color)
+            screen.blit(text, (10, hud_y))
+            hud_y += 30
+        level_text = self.font.render(f"Level: {snap.level_number}", True, WHITE)
+        screen.blit(level_text, (SCREEN_WIDTH - level_text.get_width() - 10, 10))
+        if snap.result:
+            banner = self.font.render(f"Level {snap.result}", True, GREEN if snap.result == 'PASSED' else RED)
+            screen.blit(banner, banner.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+        pygame.display.flip()
+
+
+async def run_rendered(client, seconds=None):
+    """ Plays one client in a window: mouse/keyboard input up, snapshots drawn as they arrive. """
+    screen_surf = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption(f"PlaneWar co-op - {client.room}")
+    try:
+        font = pygame.font.Font(UI_FONT_PATH, FONT_SIZE_SCORE)
+    except (FileNotFoundError, pygame.error):
+        font = pygame.font.SysFont(None, FONT_SIZE_SCORE)
+    view = SnapshotView(screen_surf, load_images(open_asset_pack() if USE_ASSET_PACK else None), font)
+    reader = await client.connect()
+    receiver = asyncio.create_task(client.receive(reader))
+    loop = asyncio.get_running_loop()
+    period = 1.0 / client.tick_rate
+    next_tick = loop.time()
+    end = next_tick + seconds if seconds else None
+    try:
+        while not receiver.done() and (end is None or loop.time() < end):
+            bomb = False
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    return
+                if event.type == pygame.KEYDOWN and event.key == BOMB_KEY:
+                    bomb = True
+            fire = pygame.key.get_pressed()[pygame.K_SPACE] or pygame.mouse.get_pressed()[0]
+            client.send_input(FrameInput(pygame.mouse.get_pos(), fire, bomb))
+            view.draw(client.snapshot, client.level, client.client_id)
+            next_tick += period
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    finally:
+        await client.close(receiver)
+
+
+async def run_clients(args):
+    clients = []
+    for i in range(args.clients):
+        room = args.room if args.rooms <= 1 else f"{args.room}{i % args.rooms}"
+        clients.append(GameClient(f"{args.name}{i + 1}", room, sweep_pilot(i * 1.3), args.host, args.port))
+    start = time.perf_counter()
+    tasks = [client.run(args.seconds) for client in clients[1 if args.render else 0:]]
+    if args.render:
+        tasks.append(run_rendered(clients[0], args.seconds))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = max(1e-9, time.perf_counter() - start)
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Warning: client failed: {result!r}")
+    return [client.stats(elapsed) for client in clients], elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Connect test (or play) clients to a PlaneWar server.")
+    parser.add_argument('--host', default=NET_HOST)
+    parser.add_argument('--port', type=int, default=NET_PORT)
+    parser.add_argument('--room', default='default', help="Room to join (with --rooms N: prefix of N rooms)")
+    parser.add_argument('--rooms', type=int, default=1, help="Spread the clients over this many rooms")
+    parser.add_argument('--clients', type=int, default=1, help="Clients to run in this process")
+    parser.add_argument('--name', default=PLAYER_NAME)
+    parser.add_argument('--seconds', type=float, help="Disconnect after this long (default: until the server closes)")
+    parser.add_argument('--render', action='store_true', help="Play the first client in a window")
+    args = parser.parse_args(argv)
+    if not args.render:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    try:
+        stats, elapsed = asyncio.run(run_clients(args))
+    except KeyboardInterrupt:
+        stats, elapsed = [], 0
+    for s in stats:
+        print(f"  {s['name']:<12} room={s['room']:<10} snapshots={s['snapshots']} (keyframes {s['keyframes']}) "
+              f"in {s['in_kbps']} kbit/s, {s['bytes_per_snapshot']} B/snapshot (x{s['compression']}), "
+              f"out {s['out_kbps']} kbit/s, decode {s['decode_ms']} ms, gap {s['gap_ms']}±{s['jitter_ms']} ms, "
+              f"score {s['score']}")
+    if stats:
+        print(f"{len(stats)} client(s), {elapsed:.1f}s: "
+              f"{sum(s['in_kbps'] for s in stats):.0f} kbit/s in, {sum(s['out_kbps'] for s in stats):.0f} kbit/s out")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+# /Users/junluo/Desktop/PlaneWar/net_protocol.py
+"""
+Wire format for the multiplayer server (net_server.py) and its clients (net_client.py).
+
+Every message on the TCP stream is
+
+    u32 body length | u8 type | body
+
+HELLO, WELCOME, LEVEL and ERROR bodies are JSON (rare control messages). The two
+per-tick messages are binary:
+
+    INPUT     u32 client frame | i16 mouse x | i16 mouse y | u8 flags
+              (the replay.py frame record; flags are its FLAG_* bits)
+    SNAPSHOT  u32 tick | u32 base tick | u32 raw size | zlib(world)
+
+A snapshot is the whole visible world, quantized to whole pixels. Every entity
+also carries its velocity: how far it moved since the previous snapshot (0 for
+new ones). The world is
+
+    header    u32 frame | u16 level | u8 result | u8 players | u16 enemies
+              | u16 bullets | u16 boss bullets | u16 power-ups
+              | u8 boss present | i16 boss x, y, health, max health
+    players   (u16 client id | i16 x | i16 y | u8 flags | u8 bombs | i32 score) per slot
+    stores    enemies, player bullets, boss bullets, power-ups, each either
+
+      keyframe  x, y, vx, vy columns (i16) [, kind column (u8)]
+      delta     survivor bits (one per row of the base) | dx, dy for the
+                survivors [, kind change] | x, y [, kind] of the new rows
+
+A delta is against the base snapshot (base tick) the client already holds. It
+relies on entity_store's row order: rows are only appended and compaction keeps
+their order, so this snapshot's rows are the base's surviving rows, in order,
+followed by the newly spawned ones. A survivor is sent as its error against
+dead reckoning (base position + base velocity), which is 0 for anything moving
+in a straight line at a steady speed, so zlib squeezes the bulk of a bullet-hell
+screen down to almost nothing. Comparing bytes at the same offsets (e.g. XOR
+with the base) doesn't work here: every kill shifts all later rows.
+
+TCP delivers in order, so the base is simply the last snapshot sent; base tick
+KEYFRAME means "no base" (a new client, a new level, or a client whose snapshots
+were skipped). raw size is the world without velocities, uncompressed, for the
+bandwidth stats.
+"""
+import json
+import zlib
+import struct
+import numpy as np
+from settings import *
+from replay import pack_input_flags, frame_input_from_record
+
+MSG_HELLO = 1    # client -> server  {"name", "room"}
+MSG_WELCOME = 2  # server -> client  {"client_id", "room", "tick_rate", "snapshot_interval"}
+MSG_LEVEL = 3    # server -> client  {"level_number", "enemy_types", "is_boss_level", "seed"}
+MSG_INPUT = 4    # client -> server  binary, see above
+MSG_SNAPSHOT = 5 # server -> client  binary, see above
+MSG_ERROR = 6    # server -> client  {"error"}, then the server closes the connection
+MSG_BYE = 7      # client -> server  empty; leaving on purpose
+
+KEYFRAME = 0xFFFFFFFF # Base tick of a snapshot that isn't a delta
+
+_MESSAGE = struct.Struct("<IB")
+_INPUT = struct.Struct("<I")
+_FRAME = struct.Struct("<hhB") # Same record as a replay.py frame
+_SNAPSHOT = struct.Struct("<III")
+_WORLD = struct.Struct("<IHBBHHHHBhhhh")
+STORES = (('enemies', True), ('bullets', False), ('boss_bullets', False), ('powerups', True)) # (name, has kinds)
+PLAYER_DTYPE = np.dtype([('id', '<u2'), ('x', '<i2'), ('y', '<i2'), ('flags', 'u1'), ('bombs', 'u1'), ('score', '<i4')])
+
+PLAYER_ALIVE = 1
+PLAYER_SHIELD = 2
+PLAYER_DOUBLE_SHOT = 4
+
+_RESULT_CODES = {None: 0, 'PASSED': 1, 'FAILED': 2}
+_RESULT_NAMES = {code: name for name, code in _RESULT_CODES.items()}
+
+
+# --- Framing ---
+def pack_message(msg_type, body=b""):
+    return _MESSAGE.pack(len(body), msg_type) + body
+
+def pack_json(msg_type, obj):
+    return pack_message(msg_type, json.dumps(obj).encode('utf-8'))
+
+async def read_message(reader):
+    """ (type, body) of the next message. Raises asyncio.IncompleteReadError at end of stream. """
+    length, msg_type = _MESSAGE.unpack(await reader.readexactly(_MESSAGE.size))
+    return msg_type, await reader.readexactly(length)
+
+def message_size(body):
+    """ Bytes a message with this body takes on the wire. """
+    return _MESSAGE.size + len(body)
+
+
+# --- Input ---
+def pack_input(frame, frame_input):
+    x, y = frame_input.mouse_pos
+    flags = pack_input_flags((frame_input.fire, False, False), False, frame_input.bomb)
+    return pack_message(MSG_INPUT, _INPUT.pack(frame & 0xFFFFFFFF) + _FRAME.pack(int(x), int(y), flags))
+
+def unpack_input(body):
+    """ (client frame, FrameInput). """
+    (frame,) = _INPUT.unpack_from(body)
+    return frame, frame_input_from_record(*_FRAME.unpack_from(body, _INPUT.size))
+
+
+# --- Snapshots ---
+class EntityColumns:
+    """ One store's entities in a snapshot: i16 x, y, vx, vy and u8 kind columns. """
+    def __init__(self, x, y, kind, vx=None, vy=None, serial=None):
+        self.x, self.y, self.kind = x, y, kind
+        self.vx = vx if vx is not None else np.zeros(x.size, np.int16)
+        self.vy = vy if vy is not None else np.zeros(x.size, np.int16)
+        self.serial = serial # Server side only: entity_store serials, to match rows with the next snapshot
+        self.keep = None     # Server side only: which rows of the base survived into this snapshot
+
+    def __len__(self):
+        return self.x.size
+
+
+class Snapshot:
+    """ The visible world at one tick: header fields, the players array and one EntityColumns per STORES entry. """
+    def __init__(self, tick=0):
+        self.tick = tick
+        self.frame = 0
+        self.level_number = 0
+        self.result = None
+        self.boss = None # (x, y, health, max health) while the boss is on screen
+        self.players = np.zeros(0, dtype=PLAYER_DTYPE)
+
+    def player(self, client_id):
+        """ (slot, player record) of a client, or (None, None) if it has no slot in this level. """
+        slots = np.flatnonzero(self.players['id'] == client_id)
+        return (int(slots[0]), self.players[slots[0]]) if slots.size else (None, None)
+
+    def raw_size(self):
+        """ Bytes of this world with positions and kinds only, uncompressed (the stats' yardstick). """
+        size = _WORLD.size + self.players.nbytes
+        for name, kinds in STORES:
+            size += len(getattr(self, name)) * (5 if kinds else 4)
+        return size
+
+    def _header(self):
+        boss = self.boss or (0, 0, 0, 0)
+        return _WORLD.pack(self.frame, self.level_number, _RESULT_CODES[self.result], len(self.players),
+                           *(len(getattr(self, name)) for name, _kinds in STORES), 1 if self.boss else 0, *boss)
+
+
+def _survivors(base, cols):
+    """ Which base rows are still alive in cols (they are cols' first rows; see the module docstring). """
+    keep = np.isin(base.serial, cols.serial, assume_unique=True)
+    if not np.array_equal(base.serial[keep], cols.serial[:int(keep.sum())]):
+        keep[:] = False # Rows out of order (not the entity_store contract): send them all as new
+    return keep
+
+def capture_snapshot(state, client_ids, tick, base=None):
+    """
+    Snapshot of a LevelState. client_ids[slot] is the client playing that slot (0 = nobody).
+    base is the previous snapshot sent; velocities are measured against it, and only
+    snapshots captured against a base can be packed as a delta of it.
+    """
+    snap = Snapshot(tick)
+    snap.frame = state.frame
+    snap.level_number = state.level_num if isinstance(state.level_num, int) else 0
+    snap.result = state.result
+    boss = state.boss_instance if state.boss_active else None
+    if boss:
+        snap.boss = (boss.rect.x, boss.rect.y, boss.health, boss.max_health)
+    snap.players = np.zeros(len(state.players), dtype=PLAYER_DTYPE)
+    for slot, player in enumerate(state.players):
+        flags = PLAYER_ALIVE if player.alive() else 0
+        if player.shield_active: flags |= PLAYER_SHIELD
+        if player.powerup_type == 'double_shot': flags |= PLAYER_DOUBLE_SHOT
+        snap.players[slot] = (client_ids[slot] if slot < len(client_ids) else 0, player.rect.x, player.rect.y,
+                              flags, min(player.bomb_count, 255), player.score)
+    for (name, _kinds), store in zip(STORES, (state.enemies, state.bullets, state.enemy_bullets, state.powerups)):
+        idx = store.live_indices()
+        cols = EntityColumns(store.x[idx].astype(np.int16), store.y[idx].astype(np.int16),
+                             store.kind[idx].astype(np.uint8), serial=store.serial[idx])
+        if base is not None:
+            old = getattr(base, name)
+            cols.keep = _survivors(old, cols)
+            k = int(cols.keep.sum())
+            cols.vx[:k] = cols.x[:k] - old.x[cols.keep]
+            cols.vy[:k] = cols.y[:k] - old.y[cols.keep]
+        setattr(snap, name, cols)
+    return snap
+
+def pack_snapshot(snap, base=None, level=NET_ZLIB_LEVEL):
+    """ SNAPSHOT message: a delta against base (the snapshot snap was captured against), or a keyframe. """
+    parts = [snap._header(), snap.players]
+    for name, kinds in STORES:
+        cols = getattr(snap, name)
+        if base is None:
+            parts += [cols.x, cols.y, cols.vx, cols.vy] + ([cols.kind] if kinds else [])
+            continue
+        old = getattr(base, name)
+        keep = cols.keep
+        k = int(keep.sum())
+        # Dead reckoning: a survivor is sent as its error against base position + base velocity
+        parts += [np.packbits(keep),
+                  cols.x[:k] - (old.x[keep] + old.vx[keep]), cols.y[:k] - (old.y[keep] + old.vy[keep])]
+        if kinds: parts.append(cols.kind[:k] - old.kind[keep])
+        parts += [cols.x[k:], cols.y[k:]] + ([cols.kind[k:]] if kinds else [])
+    world = b"".join(part if isinstance(part, bytes) else part.tobytes() for part in parts)
+    header = _SNAPSHOT.pack(snap.tick, KEYFRAME if base is None else base.tick, snap.raw_size())
+    return pack_message(MSG_SNAPSHOT, header + zlib.compress(world, level))
+
+
+class _Cursor:
+    """ Reads consecutive arrays out of a bytes object. """
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def take(self, dtype, n):
+        dtype = np.dtype(dtype)
+        array = np.frombuffer(self.data, dtype, n, self.offset)
+        self.offset += n * dtype.itemsize
+        return array
+
+def unpack_snapshot(body, base=None):
+    """
+    (base tick, raw size, Snapshot) from a SNAPSHOT body. base is the receiver's
+    latest Snapshot; raises ValueError if a delta is against a different one.
+    """
+    tick, base_tick, raw_size = _SNAPSHOT.unpack_from(body)
+    if base_tick != KEYFRAME and (base is None or base.tick != base_tick):
+        raise ValueError(f"snapshot {tick} is a delta against {base_tick}, which this client doesn't hold")
+    world = zlib.decompress(body[_SNAPSHOT.size:])
+    snap = Snapshot(tick)
+    (snap.frame, snap.level_number, result, n_players, *counts, boss, boss_x, boss_y, boss_health,
+     boss_max) = _WORLD.unpack_from(world)
+    snap.result = _RESULT_NAMES.get(result)
+    snap.boss = (boss_x, boss_y, boss_health, boss_max) if boss else None
+    cursor = _Cursor(world, _WORLD.size)
+    snap.players = cursor.take(PLAYER_DTYPE, n_players)
+    for (name, kinds), n in zip(STORES, counts):
+        if base_tick == KEYFRAME:
+            x, y, vx, vy = (cursor.take('<i2', n) for _ in range(4))
+            kind = cursor.take('u1', n) if kinds else np.zeros(n, np.uint8)
+            setattr(snap, name, EntityColumns(x, y, kind, vx, vy))
+            continue
+        old = getattr(base, name)
+        keep = np.unpackbits(cursor.take('u1', (len(old) + 7) // 8), count=len(old)).astype(bool)
+        k = int(keep.sum())
+        x, y = np.empty(n, np.int16), np.empty(n, np.int16)
+        vx, vy = np.zeros(n, np.int16), np.zeros(n, np.int16)
+        kind = np.zeros(n, np.uint8)
+        x[:k] = old.x[keep] + old.vx[keep] + cursor.take('<i2', k)
+        y[:k] = old.y[keep] + old.vy[keep] + cursor.take('<i2', k)
+        vx[:k], vy[:k] = x[:k] - old.x[keep], y[:k] - old.y[keep]
+        if kinds: kind[:k] = old.kind[keep] + cursor.take('u1', k)
+        x[k:], y[k:] = cursor.take('<i2', n - k), cursor.take('<i2', n - k)
+        if kinds: kind[k:] = cursor.take('u1', n - k)
+        setattr(snap, name, EntityColumns(x, y, kind, vx, vy))
+    return base_tick, raw_size, snap
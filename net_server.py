@@ -0,0 +1,395 @@
+# /Users/junluo/Desktop/PlaneWar/net_server.py
+"""
+Authoritative co-op server.
+
+Clients connect over TCP (see net_protocol.py for the wire format), join a room
+and each get a Player slot in that room's LevelState. Only inputs travel
+upstream; the server steps every room with simulation.step_level on one asyncio
+tick loop (FPS ticks per second) and sends each room's clients a delta-compressed
+snapshot every NET_SNAPSHOT_INTERVAL ticks. A room plays the levels in order:
+after a level ends it waits NET_LEVEL_RESTART_MS, then starts the next level if
+the players passed, or the same one again if they failed. A room closes when its
+last client leaves.
+
+A snapshot is encoded once per room: all clients that hold the previous one get
+the same delta bytes, new clients get one shared keyframe. A client whose socket
+buffer is over NET_MAX_WRITE_BUFFER is skipped (and gets a keyframe once it has
+caught up), so one slow reader can't stall the tick loop.
+
+Instrumentation, every NET_STATS_INTERVAL seconds and at exit: tick time (mean,
+p99, overruns past the tick budget), the time one room costs per tick and how many
+rooms one core could therefore host, bandwidth in/out per client and the snapshot
+compression ratio. Everything runs on one thread, so tick time / tick budget is
+the core's load.
+
+Usage:
+    python net_server.py                           # 127.0.0.1:7777, levels in order
+    python net_server.py --port 7800 --level 2 --max-players 2
+    python net_server.py --seconds 60 --json build/net_stats.json
+    python net_client.py --clients 8 --rooms 2     # (another terminal) scripted test clients
+"""
+import os
+# Must be set before pygame is imported anywhere
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+from collections import deque
+import numpy as np
+import pygame
+from settings import *
+from assets import load_images
+from asset_pack import open_asset_pack
+from level_compiler import load_level_data
+from simulation import LevelState, FrameInput, step_level
+from replay import seed_arg
+from net_protocol import (MSG_HELLO, MSG_WELCOME, MSG_LEVEL, MSG_INPUT, MSG_ERROR, MSG_BYE, read_message,
+                          message_size, pack_json, unpack_input, capture_snapshot, pack_snapshot)
+
+
+class RemotePlayer:
+    """ One connected client: its stream, latest input and the snapshot it holds. """
+    def __init__(self, client_id, name, writer):
+        self.client_id = client_id
+        self.name = name
+        self.writer = writer
+        self.slot = None          # Player slot in the room's current LevelState
+        self.input = None         # Latest FrameInput; held until the next one arrives
+        self.bomb = False         # Bomb presses are latched until a tick consumes them
+        self.baseline_tick = None # Tick of the last snapshot sent (the delta base); None = send a keyframe
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.skipped = 0
+
+    def set_input(self, frame_input):
+        self.input = frame_input
+        self.bomb = self.bomb or frame_input.bomb
+
+    def take_input(self):
+        """ This tick's FrameInput (None until the first input arrives). """
+        if self.input is None:
+            return None
+        frame_input = FrameInput(self.input.mouse_pos, self.input.fire, self.bomb)
+        self.bomb = False
+        return frame_input
+
+    def send(self, message):
+        self.writer.write(message)
+        self.bytes_out += len(message)
+
+
+class ServerStats:
+    """ Tick times and traffic, per reporting interval and in total. """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = {'ticks': 0, 'overruns': 0, 'bytes_in': 0, 'bytes_out': 0, 'raw_bytes': 0,
+                       'snapshots': 0, 'keyframes': 0, 'skipped': 0}
+        self.tick_ms = deque(maxlen=FPS * 60)     # Whole ticks (every room), ms
+        self.room_tick_ms = deque(maxlen=FPS * 60) # One room's step + snapshot, ms
+        self._reset_interval()
+
+    def _reset_interval(self):
+        self.interval = dict.fromkeys(self.totals, 0)
+        self.interval_start = time.perf_counter()
+        self.interval_ticks = []
+
+    def add(self, key, amount=1):
+        self.totals[key] += amount
+        self.interval[key] += amount
+
+    def record_tick(self, ms, room_ms, overrun):
+        self.add('ticks')
+        if overrun: self.add('overruns')
+        self.tick_ms.append(ms)
+        self.interval_ticks.append(ms)
+        self.room_tick_ms.extend(room_ms)
+
+    def summary(self, rooms, clients, counts=None, ticks=None, seconds=None):
+        """ Stats dict for the current interval (default) or for given counters/tick times/seconds. """
+        counts = counts or self.interval
+        ticks = np.array(self.interval_ticks if ticks is None else ticks)
+        if ticks.size == 0: ticks = np.zeros(1)
+        seconds = seconds or max(1e-9, time.perf_counter() - self.interval_start)
+        budget_ms = 1000.0 / FPS
+        room_ms = float(np.mean(self.room_tick_ms)) if self.room_tick_ms else 0.0
+        # Per client from the mean snapshot size, so it stays meaningful after clients leave
+        snapshot_bytes = counts['bytes_out'] / counts['snapshots'] if counts['snapshots'] else 0.0
+        return {
+            'rooms': rooms, 'clients': clients,
+            'tick_mean_ms': round(float(ticks.mean()), 3), 'tick_p99_ms': round(float(np.percentile(ticks, 99)), 3),
+            'load': round(float(ticks.mean()) / budget_ms, 3), 'overruns': counts['overruns'],
+            'room_ms': round(room_ms, 3),
+            'rooms_per_core': int(budget_ms / room_ms) if room_ms else None,
+            'out_kbps': round(counts['bytes_out'] * 8 / 1000 / seconds, 1),
+            'in_kbps': round(counts['bytes_in'] * 8 / 1000 / seconds, 1),
+            'out_kbps_per_client': round(snapshot_bytes * 8 / 1000 * FPS / NET_SNAPSHOT_INTERVAL, 1),
+            'bytes_per_snapshot': round(snapshot_bytes),
+            'compression': round(counts['raw_bytes'] / counts['bytes_out'], 2) if counts['bytes_out'] else None,
+            'snapshots': counts['snapshots'], 'keyframes': counts['keyframes'], 'skipped': counts['skipped'],
+        }
+
+    def report(self, rooms, clients):
+        s = self.summary(rooms, clients)
+        print(f"[net] rooms={s['rooms']} clients={s['clients']} tick {s['tick_mean_ms']:.2f}ms "
+              f"(p99 {s['tick_p99_ms']:.2f}, load {s['load'] * 100:.0f}%, overruns {s['overruns']}) "
+              f"room {s['room_ms']:.3f}ms -> ~{s['rooms_per_core']} rooms/core | "
+              f"out {s['out_kbps']:.0f} kbit/s ({s['out_kbps_per_client']:.0f}/client, "
+              f"{s['bytes_per_snapshot']} B/snapshot, x{s['compression']} zlib+delta) "
+              f"in {s['in_kbps']:.0f} kbit/s | keyframes {s['keyframes']} skipped {s['skipped']}")
+        self._reset_interval()
+        return s
+
+    def total_summary(self, rooms, clients):
+        return self.summary(rooms, clients, self.totals, list(self.tick_ms), time.perf_counter() - self.started)
+
+
+class Session:
+    """ One room: a LevelState shared by up to max_players clients, stepped once per server tick. """
+    def __init__(self, room, levels, images, stats, level_index=0, seed=None, quiet=True):
+        self.room = room
+        self.levels = levels
+        self.images = images
+        self.stats = stats
+        self.level_index = level_index
+        self.seed = seed
+        self.quiet = quiet
+        self.clients = {} # client_id -> RemotePlayer, in join order
+        self.state = None
+        self.tick = 0
+        self.restart_tick = None # Tick the next level starts at, once the current one has ended
+        self.last_snap = None    # Last snapshot sent: the base of the next delta
+
+    def _game_output(self):
+        """ The simulation's progress prints are noise with many rooms: silenced unless --verbose. """
+        return contextlib.redirect_stdout(_NULL_OUT) if self.quiet else contextlib.nullcontext()
+
+    def level_message(self):
+        state = self.state
+        kinds = sorted(state.enemy_kind_index, key=state.enemy_kind_index.get) # Enemy type of each store kind
+        return pack_json(MSG_LEVEL, {'level_number': state.level_num, 'enemy_types': kinds,
+                                     'is_boss_level': state.is_boss_level, 'seed': state.seed})
+
+    def start_level(self):
+        level_data = self.levels[self.level_index]
+        with self._game_output():
+            self.state = LevelState(level_data, self.images, seed=self.seed, players=len(self.clients))
+        for slot, client in enumerate(self.clients.values()):
+            client.slot = slot
+        self.restart_tick = None
+        self.last_snap = None # Serials restart with the level: everyone gets a keyframe
+        print(f"[{self.room}] Level {self.state.level_num} started with {len(self.clients)} player(s).")
+        message = self.level_message()
+        for client in self.clients.values():
+            client.send(message)
+
+    def join(self, client):
+        self.clients[client.client_id] = client
+        if self.state is None:
+            self.start_level()
+            return
+        client.slot = self.state.add_player() # Drops into the running level
+        client.send(self.level_message())
+
+    def leave(self, client):
+        self.clients.pop(client.client_id, None)
+        if self.state is not None and client.slot is not None:
+            self.state.remove_player(client.slot)
+
+    def step(self):
+        """ One server tick: next level if due, step the simulation, send a snapshot every NET_SNAPSHOT_INTERVAL. """
+        self.tick += 1
+        state = self.state
+        if state.finished:
+            if self.restart_tick is None:
+                print(f"[{self.room}] Level {state.level_num} {state.result}, scores "
+                      f"{[player.score for player in state.players]}")
+                self.restart_tick = self.tick + NET_LEVEL_RESTART_MS * FPS // 1000
+            elif self.tick >= self.restart_tick:
+                if state.result == 'PASSED':
+                    self.level_index = (self.level_index + 1) % len(self.levels)
+                self.start_level()
+                state = self.state
+        inputs = [None] * len(state.players)
+        for client in self.clients.values():
+            if client.slot is not None:
+                inputs[client.slot] = client.take_input()
+        with self._game_output():
+            step_level(state, inputs)
+        if self.tick % NET_SNAPSHOT_INTERVAL == 0:
+            self.send_snapshot()
+
+    def send_snapshot(self):
+        state = self.state
+        client_ids = [0] * len(state.players)
+        for client in self.clients.values():
+            client_ids[client.slot] = client.client_id
+        base = self.last_snap
+        snap = capture_snapshot(state, client_ids, self.tick, base)
+        raw_size = snap.raw_size()
+        delta = keyframe = None # Each encoded at most once, then shared by every client that needs it
+        for client in self.clients.values():
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > NET_MAX_WRITE_BUFFER:
+                client.baseline_tick = None # Its base is gone once it misses one: keyframe when it catches up
+                client.skipped += 1
+                self.stats.add('skipped')
+                continue
+            if base is not None and client.baseline_tick == base.tick:
+                if delta is None:
+                    delta = pack_snapshot(snap, base)
+                message = delta
+            else:
+                if keyframe is None:
+                    keyframe = pack_snapshot(snap)
+                message = keyframe
+                self.stats.add('keyframes')
+            client.send(message)
+            client.baseline_tick = self.tick
+            self.stats.add('snapshots')
+            self.stats.add('raw_bytes', raw_size)
+            self.stats.add('bytes_out', len(message))
+        self.last_snap = snap
+
+
+class GameServer:
+    """ Accepts clients, groups them into rooms and runs every room on one tick loop. """
+    def __init__(self, levels, images, host=NET_HOST, port=NET_PORT, max_players=NET_MAX_PLAYERS, level_index=0,
+                 seed=None, quiet=True):
+        self.levels = levels
+        self.images = images
+        self.host = host
+        self.port = port
+        self.max_players = max_players
+        self.level_index = level_index
+        self.seed = seed
+        self.quiet = quiet
+        self.sessions = {} # room -> Session
+        self.stats = ServerStats()
+        self._next_client_id = 1
+
+    @property
+    def client_count(self):
+        return sum(len(session.clients) for session in self.sessions.values())
+
+    async def handle_client(self, reader, writer):
+        session = client = None
+        try:
+            msg_type, body = await read_message(reader)
+            self.stats.add('bytes_in', message_size(body))
+            if msg_type != MSG_HELLO:
+                return
+            hello = json.loads(body)
+            room = str(hello.get('room') or 'default')
+            session = self.sessions.get(room)
+            if session and len(session.clients) >= self.max_players:
+                writer.write(pack_json(MSG_ERROR, {'error': f"room '{room}' is full ({self.max_players} players)"}))
+                session = None
+                return
+            if session is None:
+                session = Session(room, self.levels, self.images, self.stats, self.level_index, self.seed, self.quiet)
+                self.sessions[room] = session
+            client = RemotePlayer(self._next_client_id, str(hello.get('name') or 'player'), writer)
+            self._next_client_id = (self._next_client_id % 0xFFFF) + 1 # u16 on the wire, 0 = nobody
+            client.send(pack_json(MSG_WELCOME, {'client_id': client.client_id, 'room': room, 'tick_rate': FPS,
+                                                'snapshot_interval': NET_SNAPSHOT_INTERVAL}))
+            session.join(client)
+            print(f"[{room}] {client.name} (#{client.client_id}) joined, slot {client.slot}.")
+            while True:
+                msg_type, body = await read_message(reader)
+                client.bytes_in += message_size(body)
+                self.stats.add('bytes_in', message_size(body))
+                if msg_type == MSG_INPUT:
+                    client.set_input(unpack_input(body)[1])
+                elif msg_type == MSG_BYE:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            if client is None: print(f"Warning: Dropped a connection before it joined: {e!r}")
+        finally:
+            if session and client:
+                session.leave(client)
+                print(f"[{session.room}] {client.name} (#{client.client_id}) left "
+                      f"(in {client.bytes_in} B, out {client.bytes_out} B, skipped {client.skipped}).")
+                if not session.clients:
+                    del self.sessions[session.room]
+            writer.close()
+
+    async def tick_loop(self, seconds=None):
+        """ Steps every room FPS times per second (for seconds, or until cancelled). """
+        loop = asyncio.get_running_loop()
+        period = 1.0 / FPS
+        next_tick = loop.time()
+        end = next_tick + seconds if seconds else None
+        next_report = time.perf_counter() + NET_STATS_INTERVAL
+        while end is None or loop.time() < end:
+            start = time.perf_counter()
+            room_ms = []
+            for session in list(self.sessions.values()):
+                room_start = time.perf_counter()
+                session.step()
+                room_ms.append((time.perf_counter() - room_start) * 1000)
+            tick_ms = (time.perf_counter() - start) * 1000
+            next_tick += period
+            delay = next_tick - loop.time()
+            self.stats.record_tick(tick_ms, room_ms, overrun=delay < 0)
+            if delay < -period:
+                next_tick = loop.time() # Fell more than a tick behind: don't burst to catch up
+            if time.perf_counter() >= next_report:
+                if self.sessions: self.stats.report(len(self.sessions), self.client_count)
+                next_report += NET_STATS_INTERVAL
+            await asyncio.sleep(max(0.0, delay))
+
+    async def serve(self, seconds=None):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"PlaneWar server on {self.host}:{self.port} - {FPS} ticks/s, "
+              f"{FPS // NET_SNAPSHOT_INTERVAL} snapshots/s, up to {self.max_players} players per room")
+        async with server:
+            await self.tick_loop(seconds)
+        return self.stats.total_summary(len(self.sessions), self.client_count)
+
+
+_NULL_OUT = open(os.devnull, 'w')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the PlaneWar co-op server.")
+    parser.add_argument('--host', default=NET_HOST)
+    parser.add_argument('--port', type=int, default=NET_PORT)
+    parser.add_argument('--level', type=int, help="Level number rooms start at (default: the first)")
+    parser.add_argument('--max-players', type=int, default=NET_MAX_PLAYERS, help="Players per room")
+    parser.add_argument('--seed', type=seed_arg, help="RNG seed for every level (random if omitted)")
+    parser.add_argument('--seconds', type=float, help="Stop after this long (default: run until Ctrl+C)")
+    parser.add_argument('--json', metavar='PATH', help="Write the final stats to PATH")
+    parser.add_argument('--verbose', action='store_true', help="Show the simulation's progress messages")
+    args = parser.parse_args(argv)
+
+    images = load_images(open_asset_pack() if USE_ASSET_PACK else None)
+    levels = load_level_data(LEVELS_DIR)
+    if not levels:
+        raise SystemExit("No levels to serve.")
+    numbers = [lvl.get('level_number') for lvl in levels]
+    if args.level is not None and args.level not in numbers:
+        raise SystemExit(f"Level {args.level} not found (have {numbers}).")
+    level_index = numbers.index(args.level) if args.level is not None else 0
+
+    server = GameServer(levels, images, args.host, args.port, args.max_players, level_index, args.seed,
+                        quiet=not args.verbose)
+    try:
+        summary = asyncio.run(server.serve(args.seconds))
+    except KeyboardInterrupt:
+        summary = server.stats.total_summary(len(server.sessions), server.client_count)
+    print(f"Server totals: {summary}")
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
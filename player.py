@@ -1,21 +1,23 @@
 # /Users/junluo/Desktop/PlaneWar/player.py
 import pygame
 from settings import *
-from bullet import Bullet
+from bullet import spawn_bullet
+from sprite_variants import player_variants
 
 class Player(pygame.sprite.Sprite):
     """ Represents the player's spaceship. """
-    def __init__(self, player_img, shoot_sound, shield_up_sound, shield_down_sound, powerup_sound, bomb_sound):
+    def __init__(self, player_img, audio=None, start_time=None):
         super().__init__()
         self.image_orig = player_img
-        self.image = self.image_orig.copy()
+        self.image = self.image_orig
         self.rect = self.image.get_rect(centerx=SCREEN_WIDTH // 2, bottom=SCREEN_HEIGHT - 20)
 
         # --- ADDED score initialization ---
         self.score = 0
 
         # Timing
-        self.last_shot_time = pygame.time.get_ticks()
+        # start_time / now arguments let the simulation drive timers from its own frame clock
+        self.last_shot_time = pygame.time.get_ticks() if start_time is None else start_time
         self.shoot_delay = PLAYER_SHOOT_DELAY
 
         # Power-ups
@@ -28,39 +30,37 @@ class Player(pygame.sprite.Sprite):
         # Shield Visuals
         self.shield_visual_radius = max(self.rect.width, self.rect.height) // 2 + 8
         self.shield_visual_color = SHIELD_VISUAL_COLOR
+        self.variants = player_variants(self.image_orig, self.shield_visual_radius, self.shield_visual_color)
 
-        # Sounds
-        self.shoot_sound = shoot_sound
-        self.shield_up_sound = shield_up_sound
-        self.shield_down_sound = shield_down_sound
-        self.powerup_sound = powerup_sound
-        self.bomb_sound = bomb_sound
+        # Sounds go through the level's AudioScheduler (None = silent)
+        self.audio = audio
 
-    def shoot(self):
-        """ Creates and returns new bullet sprites based on power-up status. """
-        now = pygame.time.get_ticks()
+    def play_sound(self, key):
+        if self.audio: self.audio.trigger(key)
+
+    def shoot(self, bullet_store, now=None):
+        """ Spawns bullets into the player bullet store based on power-up status. Returns how many were fired. """
+        if now is None: now = pygame.time.get_ticks()
         if now - self.last_shot_time > self.shoot_delay:
             self.last_shot_time = now
-            new_bullets = []
             if self.powerup_type == 'double_shot':
-                bullet_left = Bullet(self.rect.centerx - 10, self.rect.top)
-                bullet_right = Bullet(self.rect.centerx + 10, self.rect.top)
-                new_bullets.extend([bullet_left, bullet_right])
+                spawn_bullet(bullet_store, self.rect.centerx - 10, self.rect.top)
+                spawn_bullet(bullet_store, self.rect.centerx + 10, self.rect.top)
+                fired = 2
             else:
-                bullet = Bullet(self.rect.centerx, self.rect.top)
-                new_bullets.append(bullet)
+                spawn_bullet(bullet_store, self.rect.centerx, self.rect.top)
+                fired = 1
 
-            if self.shoot_sound:
-                try:
-                    self.shoot_sound.play()
-                except pygame.error as e:
-                    print(f"Warning: Could not play shoot sound: {e}")
-            return new_bullets
-        return []
+            self.play_sound('player_shoot')
+            return fired
+        return 0
 
-    def update(self):
-        """ Updates player state: position, power-up timers, visuals. """
-        now = pygame.time.get_ticks()
+    def update(self, now=None, mouse_pos=None):
+        """
+        Updates player state: position, power-up timers, visuals.
+        now / mouse_pos default to the live clock and mouse when not supplied.
+        """
+        if now is None: now = pygame.time.get_ticks()
 
         # Check power-up timers
         if self.powerup_type == 'double_shot' and now > self.powerup_end_time:
@@ -69,14 +69,10 @@ class Player(pygame.sprite.Sprite):
         if self.shield_active and now > self.shield_end_time:
             print("护盾效果结束")
             self.shield_active = False
-            if self.shield_down_sound:
-                 try:
-                     self.shield_down_sound.play()
-                 except pygame.error as e:
-                     print(f"Warning: Could not play shield down sound: {e}")
+            self.play_sound('shield_down')
 
         # Update position based on mouse
-        mouse_pos = pygame.mouse.get_pos()
+        if mouse_pos is None: mouse_pos = pygame.mouse.get_pos()
         self.rect.centerx = mouse_pos[0]
         self.rect.centery = mouse_pos[1]
 
@@ -86,62 +82,40 @@ class Player(pygame.sprite.Sprite):
         if self.rect.top < 0: self.rect.top = 0
         if self.rect.bottom > SCREEN_HEIGHT: self.rect.bottom = SCREEN_HEIGHT
 
-        # Apply shield visual if active
-        self.image = self.image_orig.copy() # Reset to base image
-        if self.shield_active:
-            try:
-                # Draw semi-transparent circle onto the image
-                center = self.image.get_rect().center
-                pygame.draw.circle(self.image, self.shield_visual_color, center, self.shield_visual_radius, 3)
-            except TypeError: # Handle potential issue if color doesn't have alpha
-                 pygame.draw.circle(self.image, CYAN, center, self.shield_visual_radius, 3) # Fallback color
-
-    def activate_powerup(self, type):
+        # Swap to the prebuilt shield visual if active
+        self.image = self.variants['shielded' if self.shield_active else 'normal']
+
+    def activate_powerup(self, type, now=None):
         """ Activates the effect of a collected power-up. """
         print(f"激活道具: {type}")
-        now = pygame.time.get_ticks()
+        if now is None: now = pygame.time.get_ticks()
         if type == 'double_shot':
             self.powerup_type = type
             self.powerup_end_time = now + POWERUP_DURATION
         elif type == 'shield':
             self.shield_active = True
             self.shield_end_time = now + SHIELD_DURATION
-            if self.shield_up_sound:
-                 try:
-                     self.shield_up_sound.play()
-                 except pygame.error as e:
-                     print(f"Warning: Could not play shield up sound: {e}")
+            self.play_sound('shield_up')
         elif type == 'bomb':
             self.bomb_count += 1
             print(f"获得炸弹! 当前数量: {self.bomb_count}")
 
-        if self.powerup_sound:
-            try:
-                self.powerup_sound.play()
-            except pygame.error as e:
-                print(f"Warning: Could not play powerup sound: {e}")
+        self.play_sound('powerup_pickup')
 
     # --- MODIFIED use_bomb ---
-    def use_bomb(self, enemies_group):
+    def use_bomb(self, enemy_store):
         """
-        Uses one bomb if available, destroying all enemies in the provided group.
+        Uses one bomb if available, destroying all enemies in the provided EntityStore.
         Returns the number of enemies killed (used by run_game for scoring).
         """
         killed_count = 0
         if self.bomb_count > 0:
             print("使用炸弹！清屏！")
             self.bomb_count -= 1
-            # Iterate safely if modifying group during iteration (killing sprites)
-            for enemy in enemies_group.sprites():
-                 enemy.kill()
-                 killed_count += 1
+            killed_count = enemy_store.kill_all()
 
             print(f"炸弹消灭了 {killed_count} 个普通敌机。剩余炸弹: {self.bomb_count}")
-            if self.bomb_sound:
-                 try:
-                     self.bomb_sound.play()
-                 except pygame.error as e:
-                     print(f"Warning: Could not play bomb sound: {e}")
+            self.play_sound('bomb')
         else:
             print("没有炸弹可用!")
         # run_game will handle adding score based on killed_count
@@ -3,29 +3,37 @@ import pygame
 import random
 from settings import *
 
-class PowerUp(pygame.sprite.Sprite):
-    """ Represents a power-up item that falls from the top. """
-    def __init__(self, powerup_images): # Takes a dictionary of pre-loaded images
-        super().__init__()
-        self.type = random.choice(POWERUP_TYPES)
+# Power-ups live as rows in an entity_store.EntityStore; the row's kind is the
+# index of its type in POWERUP_TYPES.
 
-        # Get the correct pre-loaded image, or create a fallback surface
-        self.image = powerup_images.get(self.type)
-        if self.image is None:
-            print(f"警告: 未能加载道具图片 '{self.type}'. 使用备用方块.")
-            self.image = pygame.Surface((POWERUP_WIDTH, POWERUP_HEIGHT))
-            fallback_color = POWERUP_FALLBACK_COLORS.get(self.type, BLUE) # Default to blue if type somehow invalid
-            self.image.fill(fallback_color)
-            pygame.draw.rect(self.image, WHITE, self.image.get_rect(), 1) # Add border
+# Fallback blocks are built once per type and reused by every level, so the sprite
+# atlas and mask cache (both keyed by surface) see the same surface each time.
+_fallback_images = {}
 
-        self.rect = self.image.get_rect()
-        self.rect.x = random.randint(0, SCREEN_WIDTH - self.rect.width)
-        self.rect.y = random.randint(-100, -40) # Start above screen
-        self.speedy = POWERUP_SPEED_Y
+def get_powerup_images(powerup_images):
+    """
+    Returns one surface per entry of POWERUP_TYPES (indexed by kind), using a
+    fallback block for any type whose image failed to load.
+    """
+    surfaces = []
+    for type_key in POWERUP_TYPES:
+        image = powerup_images.get(type_key)
+        if image is None:
+            image = _fallback_images.get(type_key)
+        if image is None:
+            print(f"警告: 未能加载道具图片 '{type_key}'. 使用备用方块.")
+            image = pygame.Surface((POWERUP_WIDTH, POWERUP_HEIGHT))
+            fallback_color = POWERUP_FALLBACK_COLORS.get(type_key, BLUE) # Default to blue if type somehow invalid
+            image.fill(fallback_color)
+            pygame.draw.rect(image, WHITE, image.get_rect(), 1) # Add border
+            _fallback_images[type_key] = image
+        surfaces.append(image)
+    return surfaces
 
-    def update(self):
-        """ Move the power-up down the screen. """
-        self.rect.y += self.speedy
-        # Kill if it moves off the bottom of the screen
-        if self.rect.top > SCREEN_HEIGHT:
-            self.kill()
\ No newline at end of file
+def spawn_powerup(powerup_store, kind_images, rng=random):
+    """ Spawns a random power-up above the screen. kind_images comes from get_powerup_images; rng is a random.Random stream. """
+    kind = rng.randrange(len(POWERUP_TYPES))
+    width, height = kind_images[kind].get_size()
+    x = rng.randint(0, SCREEN_WIDTH - width)
+    y = rng.randint(-100, -40) # Start above screen
+    return powerup_store.spawn(x, y, 0, POWERUP_SPEED_Y, width, height, kind)
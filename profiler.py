@@ -0,0 +1,170 @@
+# /Users/junluo/Desktop/PlaneWar/profiler.py
+"""
+Per-phase frame profiler.
+
+Each frame, run_game calls begin_frame() and then mark(phase) at the end
+of each section: waiting on the frame cap, event polling, sprite/entity
+updates, spawning, collisions, audio, drawing, HUD and the present. A mark
+is one perf_counter_ns() call plus an add into a preallocated ring buffer
+of the last PROFILER_FRAMES frames, so it stays on all the time. A mark
+charges the time since the previous mark to its phase, and repeated marks
+add up: a catch-up frame that runs several simulation steps gets the sum
+of every step's update/spawn/collide/audio time. A phase that didn't run
+in a frame, like an early return, counts as zero.
+
+- summary() gives per-phase mean/max and frame-time percentiles for the window.
+- ProfilerOverlay draws that on screen (PROFILER_TOGGLE_KEY).
+- export_chrome_trace() writes the window as Chrome trace-event JSON
+  (PROFILER_EXPORT_KEY). Load it in chrome://tracing or https://ui.perfetto.dev.
+"""
+import os
+import json
+import time
+import numpy as np
+import pygame
+from settings import *
+from text_cache import render_text
+
+# In frame order. 'tick' is time spent waiting for the frame deadline (idle, not work)
+PHASES = ('tick', 'events', 'update', 'spawn', 'collide', 'audio', 'draw', 'hud', 'present')
+PHASE_INDEX = {name: i for i, name in enumerate(PHASES)}
+_WORK = np.array([name != 'tick' for name in PHASES])
+
+
+class FrameProfiler:
+    """ Ring buffer of per-phase durations for the most recent frames. """
+    def __init__(self, capacity=PROFILER_FRAMES):
+        self.capacity = capacity
+        # Column 0 = frame start, column i + 1 = total ns spent in PHASES[i] this frame
+        self._rows = np.zeros((capacity, len(PHASES) + 1), dtype=np.int64)
+        self._row = None
+        self._last = 0 # Time of the previous mark (or the frame start)
+        self.frames = 0 # Frames recorded in total (the buffer keeps the last `capacity`)
+
+    def begin_frame(self):
+        self._row = self._rows[self.frames % self.capacity]
+        self._row[:] = 0
+        self._row[0] = self._last = time.perf_counter_ns()
+
+    def mark(self, phase):
+        """ Ends `phase` now, adding to any earlier time it got this frame. Safe to call outside a frame (ignored). """
+        if self._row is not None:
+            now = time.perf_counter_ns()
+            self._row[PHASE_INDEX[phase] + 1] += now - self._last
+            self._last = now
+
+    def end_frame(self):
+        if self._row is None:
+            return
+        self._row = None
+        self.frames += 1
+
+    def _window(self):
+        """ Completed frames in chronological order, shape (n, len(PHASES) + 1). """
+        n = min(self.frames, self.capacity)
+        if self.frames <= self.capacity:
+            return self._rows[:n]
+        start = self.frames % self.capacity
+        return np.concatenate((self._rows[start:], self._rows[:start]))
+
+    def durations_ms(self):
+        """ (n_frames, len(PHASES)) phase durations in ms for the captured window. """
+        return self._window()[:, 1:] / 1e6
+
+    def summary(self):
+        """ Per-phase mean/max ms and percentiles of total and busy (non-tick) frame time. None if empty. """
+        durations = self.durations_ms()
+        if not len(durations):
+            return None
+        total = durations.sum(axis=1)
+        busy = durations[:, _WORK].sum(axis=1)
+        p_total = np.percentile(total, (50, 95, 99))
+        p_busy = np.percentile(busy, (50, 95, 99))
+        return {
+            'frames': len(durations),
+            'phases': {name: {'mean_ms': float(durations[:, i].mean()), 'max_ms': float(durations[:, i].max())}
+                       for i, name in enumerate(PHASES)},
+            'frame_ms': dict(zip(('p50', 'p95', 'p99'), map(float, p_total))),
+            'busy_ms': dict(zip(('p50', 'p95', 'p99'), map(float, p_busy))),
+        }
+
+    def export_chrome_trace(self, path):
+        """ Writes the captured window as Chrome trace-event JSON ('X' complete events, microseconds). """
+        window = self._window()
+        if not len(window):
+            return None
+        origin = window[0, 0]
+        events = []
+        pid = os.getpid()
+        for frame_no, row in enumerate(window, start=self.frames - len(window)):
+            # Each phase is drawn as one block with its total for the frame, in PHASES order
+            ends = row[0] + np.cumsum(row[1:])
+            events.append({'name': 'frame', 'ph': 'X', 'pid': pid, 'tid': 1, 'ts': (row[0] - origin) / 1000,
+                           'dur': (ends[-1] - row[0]) / 1000, 'args': {'frame': frame_no}})
+            for i, name in enumerate(PHASES):
+                if row[i + 1] > 0:
+                    events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': 1,
+                                   'ts': (ends[i] - row[i + 1] - origin) / 1000, 'dur': row[i + 1] / 1000})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+def default_trace_path():
+    return os.path.join(BUILD_DIR, time.strftime("trace_%Y%m%d_%H%M%S.json"))
+
+
+class ProfilerOverlay:
+    """ On-screen phase breakdown; the text is rebuilt every PROFILER_OVERLAY_REFRESH frames. """
+    BAR_SCALE_MS = 1000 / FPS # A full-width bar = one whole frame budget
+
+    def __init__(self, profiler, font):
+        self.profiler = profiler
+        self.font = font
+        self.visible = False
+        self._surface = None
+        self._built_at = None
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._surface = None
+
+    def _build(self):
+        summary = self.profiler.summary()
+        if summary is None:
+            return None
+        line_h = self.font.get_linesize()
+        bar_w = 120
+        lines = [f"frame p50/95/99 {summary['frame_ms']['p50']:.1f}/{summary['frame_ms']['p95']:.1f}/{summary['frame_ms']['p99']:.1f} ms",
+                 f"busy  p50/95/99 {summary['busy_ms']['p50']:.1f}/{summary['busy_ms']['p95']:.1f}/{summary['busy_ms']['p99']:.1f} ms"]
+        text_w = max(self.font.size(line)[0] for line in lines)
+        width = max(text_w, 90 + bar_w + 70) + 12
+        # Numbers change every refresh, so they are rendered directly rather than through the shared text cache
+        surface = pygame.Surface((width, line_h * (len(lines) + len(PHASES)) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        y = 4
+        for line in lines:
+            surface.blit(self.font.render(line, True, WHITE), (6, y))
+            y += line_h
+        for name in PHASES:
+            mean = summary['phases'][name]['mean_ms']
+            surface.blit(render_text(self.font, name, True, WHITE if name != 'tick' else GREY), (6, y))
+            fill = int(bar_w * min(1.0, mean / self.BAR_SCALE_MS))
+            pygame.draw.rect(surface, GREEN if name != 'tick' else GREY, (90, y + line_h // 4, max(1, fill), line_h // 2))
+            value = self.font.render(f"{mean:5.2f}", True, WHITE)
+            surface.blit(value, (90 + bar_w + 6, y))
+            y += line_h
+        return surface
+
+    def draw(self, surface):
+        """ Draws the overlay (top-right, under the HUD) if visible. Returns the Rect drawn, or None. """
+        if not self.visible:
+            return None
+        frames = self.profiler.frames
+        if self._surface is None or frames - self._built_at >= PROFILER_OVERLAY_REFRESH:
+            self._surface = self._build()
+            self._built_at = frames
+        if self._surface is None:
+            return None
+        return surface.blit(self._surface, self._surface.get_rect(topright=(SCREEN_WIDTH - 10, 50)))
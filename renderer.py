@@ -0,0 +1,169 @@
+# /Users/junluo/Desktop/PlaneWar/renderer.py
+"""
+Level rendering.
+
+draw_level() paints a LevelState and returns the Rects it touched. Two
+presenters sit on top of it:
+
+- FullRenderer:      clear the whole screen, draw, pygame.display.flip()
+- DirtyRectRenderer: erase only last frame's rects, draw, and push just the
+                     old + new rects with pygame.display.update(rects)
+
+DIRTY_RECT_RENDERING in settings.py picks the mode. Dirty rects pay off when
+little of the 1000x600 screen changes per frame (the common case); when the
+touched area grows past DIRTY_RECT_MAX_COVERAGE a full flip is cheaper, so the
+dirty renderer falls back to it for that frame.
+
+alpha (0..1, from frame_pacer.FixedTimestep) draws moving things that far
+between their positions before and after the last simulation step, so render
+rates above the simulation rate show smooth motion instead of repeated frames.
+
+With SPRITE_ATLAS, all sprites and entities are drawn from sprite_atlas in one
+Surface.blits call per frame (layers in order); otherwise one call per store.
+"""
+from itertools import chain
+import pygame
+from settings import *
+from bullet import get_projectile_surface
+from text_cache import render_text
+from sprite_atlas import sprite_atlas, FBLITS
+
+
+def _lerp_pos(prev, pos, alpha):
+    if prev is None or alpha >= 1.0:
+        return pos
+    return (round(prev[0] + (pos[0] - prev[0]) * alpha), round(prev[1] + (pos[1] - prev[1]) * alpha))
+
+def _draw_batched(screen_surf, state, alpha, track_rects):
+    """ Every sprite layer from the atlas in a single blits (or fblits) call. Returns the touched Rects or []. """
+    use_fblits = FBLITS and not track_rects
+    areas = not use_fblits
+    def sources(images):
+        return sprite_atlas.sources(images, view=use_fblits)
+
+    sprites = []
+    for sprite in state.all_sprites: # Player and boss
+        pos = _lerp_pos(state.prev_sprite_pos.get(sprite), sprite.rect.topleft, alpha)
+        surface, area = sprite_atlas.source(sprite.image, view=use_fblits)
+        sprites.append((surface, pos, area) if areas else (surface, pos))
+    sequence = chain(
+        sprites,
+        state.enemies.blit_sequence(sources(state.available_enemy_images), alpha, areas),
+        state.powerups.blit_sequence(sources(state.powerup_kind_images), alpha, areas),
+        state.bullets.blit_sequence(sources([get_projectile_surface('bullet')]), alpha, areas),
+        state.enemy_bullets.blit_sequence(sources([get_projectile_surface('enemy_bullet')]), alpha, areas),
+    )
+    if use_fblits:
+        screen_surf.fblits(sequence)
+    elif track_rects:
+        return screen_surf.blits(sequence)
+    else:
+        screen_surf.blits(sequence, doreturn=False)
+    return []
+
+def draw_level(screen_surf, state, font_score, profiler=None, alpha=1.0, track_rects=True):
+    """
+    Draws sprites, HUD and boss health bar for the current level state. Returns the touched Rects
+    (with track_rects=False, only those of the HUD and health bar).
+    """
+    dirty = []
+    if SPRITE_ATLAS:
+        dirty.extend(_draw_batched(screen_surf, state, alpha, track_rects))
+    else:
+        for sprite in state.all_sprites: # Player and boss
+            pos = _lerp_pos(state.prev_sprite_pos.get(sprite), sprite.rect.topleft, alpha)
+            dirty.append(screen_surf.blit(sprite.image, pos))
+        state.enemies.draw(screen_surf, state.available_enemy_images, dirty, alpha)
+        state.powerups.draw(screen_surf, state.powerup_kind_images, dirty, alpha)
+        state.bullets.draw(screen_surf, [get_projectile_surface('bullet')], dirty, alpha)
+        state.enemy_bullets.draw(screen_surf, [get_projectile_surface('enemy_bullet')], dirty, alpha)
+    if profiler: profiler.mark('draw')
+    try:
+        score_text = render_text(font_score, f"Score: {state.player.score}", True, WHITE)
+        dirty.append(screen_surf.blit(score_text, (10, 10)))
+        bomb_text = render_text(font_score, f"Bombs: {state.player.bomb_count}", True, ORANGE)
+        dirty.append(screen_surf.blit(bomb_text, (10, 40)))
+        level_text_surf = render_text(font_score, f"Level: {state.level_num}", True, WHITE)
+        dirty.append(screen_surf.blit(level_text_surf, (SCREEN_WIDTH - level_text_surf.get_width() - 10, 10)))
+    except Exception as e:
+        print(f"Error rendering UI: {e}")
+
+    # Boss Health Bar
+    if state.boss_active and state.boss_instance:
+        bar_rect = state.boss_instance.draw_health_bar(screen_surf)
+        if bar_rect: dirty.append(bar_rect)
+    if profiler: profiler.mark('hud')
+    return dirty
+
+
+def _draw_overlay(screen_surf, overlay, dirty):
+    """ Draws a debug overlay (e.g. profiler.ProfilerOverlay) on top, if any, tracking its Rect. """
+    if overlay:
+        rect = overlay.draw(screen_surf)
+        if rect: dirty.append(rect)
+
+
+class FullRenderer:
+    """ Clears and re-presents the whole screen every frame. """
+    def __init__(self, screen_surf, font_score):
+        self.screen = screen_surf
+        self.font_score = font_score
+        self.overlay = None # Drawn over the HUD; see _draw_overlay
+
+    def render(self, state, profiler=None, alpha=1.0):
+        self.screen.fill(BLACK)
+        dirty = draw_level(self.screen, state, self.font_score, profiler, alpha, track_rects=False)
+        _draw_overlay(self.screen, self.overlay, dirty)
+        pygame.display.flip()
+        if profiler: profiler.mark('present')
+
+    def invalidate(self):
+        """ Nothing to do: every frame is a full redraw. """
+
+
+class DirtyRectRenderer:
+    """ Redraws and presents only the regions touched this frame or last frame. """
+    def __init__(self, screen_surf, font_score):
+        self.screen = screen_surf
+        self.font_score = font_score
+        self.screen_rect = screen_surf.get_rect()
+        self.max_dirty_area = self.screen_rect.width * self.screen_rect.height * DIRTY_RECT_MAX_COVERAGE
+        self.previous = None # None = next frame must present the whole screen
+        self.full_frames = 0
+        self.dirty_frames = 0
+        self.overlay = None # Drawn over the HUD; see _draw_overlay
+
+    def render(self, state, profiler=None, alpha=1.0):
+        if self.previous is None:
+            self.screen.fill(BLACK)
+        else:
+            for rect in self.previous:
+                self.screen.fill(BLACK, rect)
+        dirty = draw_level(self.screen, state, self.font_score, profiler, alpha)
+        _draw_overlay(self.screen, self.overlay, dirty)
+        current = [r for r in dirty if r.width and r.height]
+
+        if self.previous is None:
+            pygame.display.flip()
+            self.full_frames += 1
+        else:
+            dirty = self.previous + current
+            if sum(r.width * r.height for r in dirty) > self.max_dirty_area:
+                pygame.display.flip() # Busy frame: one full present beats thousands of small ones
+                self.full_frames += 1
+            else:
+                pygame.display.update(dirty)
+                self.dirty_frames += 1
+        self.previous = current
+        if profiler: profiler.mark('present')
+
+    def invalidate(self):
+        """ Forces a full redraw next frame (e.g. after something else drew over the screen). """
+        self.previous = None
+
+
+def make_level_renderer(screen_surf, font_score):
+    """ Returns the renderer selected by DIRTY_RECT_RENDERING. """
+    if DIRTY_RECT_RENDERING:
+        return DirtyRectRenderer(screen_surf, font_score)
+    return FullRenderer(screen_surf, font_score)
@@ -0,0 +1,164 @@
+# /Users/junluo/Desktop/PlaneWar/replay.py
+"""
+Binary input recordings.
+
+A level is fully determined by its JSON, its seed (simulation.make_rng_streams)
+and the per-frame input, so a recording only stores the input:
+
+    header   b"PWREPL" | u16 version | u16 segment count
+    segment  u16 level number | u32 seed | 8-byte level digest | u8 result
+             | i32 final score | u32 frame count
+    frames   zlib( i16 mouse x | i16 mouse y | u8 flags  per frame )
+
+flags holds the three mouse buttons, SPACE and BOMB_KEY (FLAG_*). One segment
+is written per level played. Replaying a segment (headless.py --replay) just
+re-runs step_level with the same seed and inputs, uncapped, and checks that
+the result and score match what was recorded.
+
+Usage:
+    python main.py --record run.pwrec
+    python headless.py --replay run.pwrec
+"""
+import os
+import json
+import argparse
+import zlib
+import struct
+import hashlib
+from settings import *
+from simulation import FrameInput, SEED_MASK
+
+REPLAY_MAGIC = b"PWREPL"
+REPLAY_VERSION = 1
+_HEADER = struct.Struct("<6sHH")
+_SEGMENT = struct.Struct("<HI8sBiI")
+_FRAME = struct.Struct("<hhB")
+
+FLAG_MOUSE_LEFT = 1
+FLAG_MOUSE_MIDDLE = 2
+FLAG_MOUSE_RIGHT = 4
+FLAG_SPACE = 8
+FLAG_BOMB = 16
+
+_RESULT_CODES = {None: 0, 'PASSED': 1, 'FAILED': 2}
+_RESULT_NAMES = {code: name for name, code in _RESULT_CODES.items()}
+
+
+def level_digest(level_data):
+    """ 8-byte digest of a level's config, to detect replaying against an edited level. """
+    return hashlib.sha1(json.dumps(level_data, sort_keys=True).encode('utf-8')).digest()[:8]
+
+def seed_arg(text):
+    """ argparse type for --seed: an integer that fits the u32 seed field (0 <= seed < 2**32). """
+    try:
+        seed = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid seed {text!r}: must be an integer")
+    if not 0 <= seed <= SEED_MASK:
+        raise argparse.ArgumentTypeError(f"seed {seed} out of range: must be 0 <= seed < 2**32")
+    return seed
+
+def pack_input_flags(mouse_buttons, space, bomb):
+    flags = FLAG_SPACE if space else 0
+    if bomb: flags |= FLAG_BOMB
+    for bit, pressed in zip((FLAG_MOUSE_LEFT, FLAG_MOUSE_MIDDLE, FLAG_MOUSE_RIGHT), mouse_buttons):
+        if pressed: flags |= bit
+    return flags
+
+def frame_input_from_record(x, y, flags):
+    """ The FrameInput main.read_frame_input built for this recorded frame. """
+    return FrameInput((x, y), fire=bool(flags & (FLAG_SPACE | FLAG_MOUSE_LEFT)), bomb=bool(flags & FLAG_BOMB))
+
+
+class ReplaySegment:
+    """ Inputs (and outcome) of one recorded level. """
+    def __init__(self, level_number, seed, digest, frames=b"", result=None, score=0):
+        self.level_number = level_number
+        self.seed = seed
+        self.digest = digest
+        self.frames = frames # Packed _FRAME records
+        self.result = result
+        self.score = score
+        self._decoded = None
+
+    @property
+    def frame_count(self):
+        return len(self.frames) // _FRAME.size
+
+    def inputs(self):
+        """ List of FrameInputs, one per recorded frame (decoded once). """
+        if self._decoded is None:
+            self._decoded = [frame_input_from_record(*rec) for rec in _FRAME.iter_unpack(self.frames)]
+        return self._decoded
+
+    def input_fn(self):
+        """ input_fn(frame) for headless.run_level_headless. """
+        inputs = self.inputs()
+        return lambda frame: inputs[frame]
+
+
+class InputRecorder:
+    """ Collects per-frame inputs of an interactive session, one segment per level. """
+    def __init__(self):
+        self.segments = []
+        self._frames = None
+
+    def begin_level(self, level_data, seed):
+        self.segments.append(ReplaySegment(level_data.get('level_number', 0), seed, level_digest(level_data)))
+        self._frames = bytearray()
+
+    def record(self, mouse_pos, mouse_buttons, space, bomb):
+        x = max(-32768, min(32767, int(mouse_pos[0])))
+        y = max(-32768, min(32767, int(mouse_pos[1])))
+        self._frames += _FRAME.pack(x, y, pack_input_flags(mouse_buttons, space, bomb))
+
+    def end_level(self, state):
+        """ Closes the current segment with the level outcome (result is None if the player quit). """
+        segment = self.segments[-1]
+        segment.frames = bytes(self._frames)
+        segment.result = state.result
+        segment.score = state.player.score
+        self._frames = None
+
+    def save(self, path):
+        """ Writes all closed segments atomically. """
+        closed = [seg for seg in self.segments if self._frames is None or seg is not self.segments[-1]]
+        parts = [_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, len(closed))]
+        for seg in closed:
+            body = zlib.compress(seg.frames, 9)
+            parts.append(_SEGMENT.pack(seg.level_number, seg.seed, seg.digest, _RESULT_CODES[seg.result],
+                                       seg.score, seg.frame_count))
+            parts.append(struct.pack("<I", len(body)))
+            parts.append(body)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(parts))
+        os.replace(tmp_path, path)
+        return path
+
+
+def load_recording(path):
+    """ Reads a recording. Returns a list of ReplaySegments; raises ValueError if the file is not one. """
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        magic, version, count = _HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"not a version {REPLAY_VERSION} PlaneWar recording")
+        offset = _HEADER.size
+        segments = []
+        for _ in range(count):
+            level_number, seed, digest, result, score, frame_count = _SEGMENT.unpack_from(data, offset)
+            offset += _SEGMENT.size
+            (body_len,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            frames = zlib.decompress(data[offset:offset + body_len])
+            offset += body_len
+            if len(frames) != frame_count * _FRAME.size:
+                raise ValueError(f"segment for level {level_number} is truncated")
+            segments.append(ReplaySegment(level_number, seed, digest, frames, _RESULT_NAMES.get(result), score))
+    except (struct.error, zlib.error) as e:
+        raise ValueError(f"corrupt recording: {e}") from e
+    return segments
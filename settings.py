@@ -9,11 +9,62 @@ IMG_DIR = os.path.join(MEDIA_DIR, 'images')
 SND_DIR = os.path.join(MEDIA_DIR, 'sounds')
 FONT_DIR = os.path.join(MEDIA_DIR, 'fonts')
 LEVELS_DIR = os.path.join(BASE_DIR, 'levels') # Added path for levels directory
+BUILD_DIR = os.path.join(BASE_DIR, 'build') # Generated files (asset pack, caches); safe to delete
 
 # --- Screen Dimensions ---
 SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 600
 FPS = 60
 
+# --- Frame Pacing (see frame_pacer.py) ---
+# The simulation always steps FPS times per second; rendering runs at RENDER_FPS and interpolates in between.
+RENDER_FPS = 0                # Render frame cap; 0 = the display's refresh rate (FPS if pygame can't tell)
+FRAME_PACING = 'precise'      # 'precise' (sleep + spin), 'tick' (pygame Clock.tick) or 'uncapped'
+PACER_SPIN_MS = 2.0           # 'precise': busy-wait this long before each deadline instead of sleeping
+PACER_HISTORY = 600           # Frame intervals kept for the jitter report
+SIM_MAX_STEPS_PER_FRAME = 5   # Catch-up limit after a long frame; the level slows down beyond it
+
+# --- Rendering ---
+DIRTY_RECT_RENDERING = False  # True = only repaint/present regions that changed (low-end kiosks)
+DIRTY_RECT_MAX_COVERAGE = 0.5 # Above this share of the screen, a full flip is used for that frame
+SPRITE_ATLAS = True           # Draw every sprite from one atlas in a single blits call per frame (see sprite_atlas.py)
+SPRITE_ATLAS_SIZE = (1024, 1024) # Per page (one per-pixel-alpha page, one opaque page)
+SPRITE_ATLAS_PADDING = 1      # Pixels between packed images
+
+# --- Level Transitions (see level_transition.py) ---
+LEVEL_INTRO_MS = 1500         # "Level N" intro (at least this long; also waits for the level prefetch)
+LEVEL_END_MS = 1000           # End-of-level banner over the last frame
+TRANSITION_DIM_ALPHA = 160    # How far the end-of-level banner darkens the last frame
+
+# --- Idle Scheduling (see idle.py) ---
+IDLE_UNFOCUSED_FPS = 10       # Level frame rate while the window is visible but unfocused (0 = pause)
+IDLE_LOADING_POLL_MS = 100    # Start screen wake-up interval while assets are still loading
+
+# --- Frame Profiler (see profiler.py) ---
+PROFILER_ENABLED = True       # Per-phase timers in run_game (a few ns-clock reads per frame)
+PROFILER_FRAMES = 600         # Ring buffer length (10 s at 60 FPS)
+PROFILER_OVERLAY_REFRESH = 15 # Frames between overlay text updates
+
+# --- Benchmark Suite (see benchmark.py) ---
+BENCHMARK_BASELINE_PATH = os.path.join(BUILD_DIR, "benchmark_baseline.json") # Written by --save-baseline
+BENCHMARK_FRAMES = 600        # Measured frames per scenario
+BENCHMARK_WARMUP_FRAMES = 60  # Unmeasured frames first (fills pools and caches)
+BENCHMARK_SEED = 1234
+BENCHMARK_TOLERANCE = 0.15    # Allowed slowdown vs the baseline (0.15 = 15%) before a scenario fails
+
+# --- Balancing Sweeps (see sweep.py) ---
+SWEEP_RUNS_PER_POINT = 3      # Seeds simulated per parameter combination
+SWEEP_MAX_SECONDS = 120       # Simulated time limit per run
+
+# --- Network Multiplayer (see net_server.py / net_client.py) ---
+NET_HOST = '127.0.0.1'
+NET_PORT = 7777
+NET_MAX_PLAYERS = 4           # Players per session (room)
+NET_SNAPSHOT_INTERVAL = 2     # Simulation ticks between snapshots (2 = 30 snapshots/s at 60 FPS)
+NET_ZLIB_LEVEL = 1            # Snapshot compression level (1 = fastest)
+NET_MAX_WRITE_BUFFER = 256 * 1024 # Bytes queued to a client before its snapshots are skipped
+NET_LEVEL_RESTART_MS = 3000   # Pause after a level ends before the session starts the next one
+NET_STATS_INTERVAL = 5        # Seconds between server/client stats lines
+
 # --- File Paths ---
 PLAYER_IMG_PATH = os.path.join(IMG_DIR, "player.png")
 ENEMY1_IMG_PATH = os.path.join(IMG_DIR, "Enemy1.png")
@@ -40,11 +91,23 @@ SHIELD_DOWN_SOUND_PATH = os.path.join(SND_DIR, "shield_down.mp3")
 BOMB_SOUND_PATH = os.path.join(SND_DIR, "bomb_explode.wav") # Using bomb_explode as likely intended
 BOSS_SHOOT_SOUND_PATH = os.path.join(SND_DIR, "boss_shoot.wav")
 
+# --- Asset Pack (see asset_pack.py) ---
+ASSET_PACK_PATH = os.path.join(BUILD_DIR, "assets.pwpack")
+USE_ASSET_PACK = True # Load from the pack when it is present and up to date
+ASSET_LOADER_WORKERS = 4 # Threads decoding images/sounds/levels behind the start screen (asset_loader.py)
+
+# --- Level Compiler (see level_compiler.py) ---
+LEVEL_CACHE_PATH = os.path.join(BUILD_DIR, "levels_cache.json")
+LEVEL_HOT_RELOAD = True # Re-check levels/*.json while playing and apply edits to the running level
+LEVEL_HOT_RELOAD_INTERVAL = 1000 # ms between checks
+
 # --- Font Settings ---
 UI_FONT_PATH = os.path.join(FONT_DIR, "NotoSansSC-Regular.ttf")
 FONT_SIZE_LARGE = 60
 FONT_SIZE_SCORE = 36
 FONT_SIZE_TITLE = 90
+FONT_SIZE_SMALL = 20 # Debug overlays
+TEXT_CACHE_MAX_ENTRIES = 128 # Rendered text surfaces kept by text_cache (LRU)
 
 # --- Sprite Dimensions ---
 PLAYER_WIDTH = 55
@@ -76,15 +139,29 @@ ENEMY_MAX_SPEED_Y = 4
 ENEMY_MIN_SPEED_X = -2
 ENEMY_MAX_SPEED_X = 2
 MAX_ONSCREEN_ENEMIES = 15 # Default max enemies if not specified in level
+WAVE_DEFAULT_SPACING = 70 # px between members of a scripted wave
+WAVE_DEFAULT_SPEED_Y = 2
+TIMELINE_CHUNK_SECONDS = 30 # Periodic spawn events are precomputed this far ahead (spawn_timeline.py)
+SPATIAL_HASH_CELL_SIZE = 64 # Collision broadphase grid cell (px); ~ the largest regular sprite
+PIXEL_COLLISIONS = True # Confirm box hits with per-image masks (see collision_masks.py)
+MASK_ALPHA_THRESHOLD = 127 # Pixels with alpha above this are solid in collision masks
 
 # Boss defaults (can be overridden by level data for the boss level)
 BOSS_SPAWN_SCORE = 99999 # Effectively disable score-based boss spawn if using level system
+BOSS_APPEAR_DELAY_SECONDS = 99999 # Default if a level doesn't set boss_appear_delay_seconds
 BOSS_ENTRY_Y = 100
 BOSS_SPEED_X = 3
 BOSS_SHOOT_DELAY = 1500
 BOSS_MAX_HEALTH = 50
+BOSS_DAMAGE_STAGES = 4          # Prebuilt boss tints from healthy to nearly dead
+BOSS_DAMAGE_TINT_STRENGTH = 140 # How far green/blue drop at the last stage (0-255)
 ENEMY_BULLET_SPEED_Y = 6
 
+# Projectile pools (rows preallocated per level; they grow if exceeded)
+PLAYER_BULLET_POOL_SIZE = 128
+ENEMY_BULLET_POOL_SIZE = 4096 # Boss bullet patterns keep thousands alive at once
+ENEMY_BULLET_MAX_FRAMES = FPS * 20 # Boss bullets still on screen after this long (e.g. decelerated to a stop) are removed
+
 # Player / Powerup defaults
 STARTUP_GRACE_PERIOD = 1500
 PLAYER_SHOOT_DELAY = 150
@@ -93,6 +170,17 @@ POWERUP_DURATION = 5000
 SHIELD_DURATION = 7000
 POWERUP_SPEED_Y = 3
 BOMB_KEY = pygame.K_b
+PROFILER_TOGGLE_KEY = pygame.K_F3 # Show/hide the frame profiler overlay
+PROFILER_EXPORT_KEY = pygame.K_F4 # Write the profiler window as a Chrome trace to build/
+AUTOPILOT_TOGGLE_KEY = pygame.K_F2 # Hand the ship to the autopilot bot and back
+
+# Autopilot bot (see autopilot.py)
+AUTOPILOT_SPEED = 12              # Max px the bot moves the ship per frame (the mouse has no limit)
+AUTOPILOT_LOOKAHEAD_FRAMES = 45   # How far ahead threats are extrapolated
+AUTOPILOT_MARGIN = 6              # Extra clearance (px) kept around the ship
+AUTOPILOT_SCAN_ABOVE = 300        # Threat query reaches this far above the ship...
+AUTOPILOT_SCAN_SIDE = 150         # ...and this far to each side
+AUTOPILOT_AIM_RANGE = 250         # Enemies within this x distance are aimed at
 
 # --- PowerUp Types ---
 POWERUP_TYPES = ['double_shot', 'shield', 'bomb']
@@ -141,5 +229,19 @@ BOMB_VOLUME = 0.7
 BOSS_SHOOT_VOLUME = 0.5
 BGM_VOLUME = 0.3
 
-# --- High Score File Path ---
-HIGH_SCORE_FILE_PATH = os.path.join(BASE_DIR, "highscore.txt")
\ No newline at end of file
+# --- Audio Scheduler (see audio.py) ---
+AUDIO_CHANNELS = 12 # Mixer channels owned by the scheduler; music plays outside this pool
+# Higher priority wins a channel when all are busy; unlisted sounds get 0
+SOUND_PRIORITIES = {
+    'player_lose': 100, 'game_win': 100,
+    'boss_explode': 90, 'boss_intro': 80, 'bomb': 70,
+    'shield_up': 60, 'shield_down': 60, 'powerup_pickup': 50,
+    'boss_hit': 40, 'enemy_explode': 30, 'boss_shoot': 20, 'player_shoot': 10,
+}
+
+# --- Leaderboard (see leaderboard.py) ---
+LEADERBOARD_DB_PATH = os.path.join(BASE_DIR, "leaderboard.db")
+LEADERBOARD_BATCH = 256       # Max queued writes applied per transaction
+PLAYER_NAME = os.environ.get('PLANEWAR_PLAYER', 'player') # Name runs are recorded under (main.py --player)
+LEGACY_PLAYER_NAME = 'legacy' # Owner of the score imported from highscore.txt
+HIGH_SCORE_FILE_PATH = os.path.join(BASE_DIR, "highscore.txt") # Pre-leaderboard high score, imported once
\ No newline at end of file
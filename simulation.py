@@ -0,0 +1,399 @@
+# /Users/junluo/Desktop/PlaneWar/simulation.py
+"""
+Render-free level simulation.
+
+LevelState holds everything a single level needs; step_level() advances it by
+one frame from a FrameInput (or one FrameInput per player slot, for the
+co-op sessions net_server.py runs). Nothing here touches the display, the mixer (unless
+sounds are passed in) or the wall clock - time comes from the frame counter - so
+the same code drives the interactive loop in main.py and uncapped headless runs.
+
+All randomness comes from per-subsystem random.Random streams derived from the
+level seed, so a seed plus the per-frame inputs reproduces a run exactly
+(see replay.py).
+"""
+import random
+import numpy as np
+import pygame
+from settings import *
+from player import Player
+from enemy import EnemyBoss, spawn_enemy
+from powerup import get_powerup_images, spawn_powerup
+from entity_store import EntityStore, OwnedProjectilePool
+from bullet_patterns import PatternBulletPool
+from spatial_hash import SpatialHash
+from bullet import get_projectile_surface
+from collision_masks import mask_cache, store_masks, pair_filter, rows_hitting, sprites_overlap
+from audio import AudioScheduler
+from spawn_timeline import SpawnTimeline, FRAME_MS
+
+RNG_STREAMS = ('enemy_spawn', 'powerup_spawn') # One independent stream per subsystem
+SEED_MASK = 0xFFFFFFFF # Seeds are u32 (replay.py segments store them as such)
+
+
+def make_rng_streams(seed):
+    """ name -> random.Random for every RNG_STREAMS entry. String seeds hash the same in every process. """
+    return {name: random.Random(f"{seed}:{name}") for name in RNG_STREAMS}
+
+
+class FrameInput:
+    """ Player input for one simulation frame. """
+    def __init__(self, mouse_pos=None, fire=False, bomb=False):
+        # Default position matches where the player spawns
+        self.mouse_pos = mouse_pos if mouse_pos is not None else (SCREEN_WIDTH // 2, SCREEN_HEIGHT - 20 - PLAYER_HEIGHT // 2)
+        self.fire = fire   # SPACE or left mouse button held
+        self.bomb = bomb   # BOMB_KEY pressed this frame
+
+
+class LevelState:
+    """ Complete state of a running level. Created once per level attempt. """
+    def __init__(self, level_data, images, sounds=None, seed=None, players=1):
+        self.level_data = level_data
+        # Folded into u32 (seed + level index can overflow), so a recording replays with the same seed
+        self.seed = (random.getrandbits(32) if seed is None else seed) & SEED_MASK
+        self.rng = make_rng_streams(self.seed)
+        self.level_num = level_data.get('level_number', '?')
+
+        # --- Resources ---
+        self.sounds = sounds or {} # Empty dict = silent (headless)
+        self.audio = AudioScheduler(self.sounds) # Played once per step; no-op without a mixer
+        self.boss_img = images.get('boss')
+        self.powerup_images = images.get('powerups', {})
+        self.powerup_kind_images = get_powerup_images(self.powerup_images) # Indexed by store kind
+        self.images = images
+        self.player_img = player_img = images.get('player')
+        if not player_img:
+            raise ValueError("Player image not loaded, cannot start level.")
+
+        # --- Frame Clock ---
+        self.frame = 0
+        self.now = 0 # Simulated ms since level start
+        self.powerup_last_spawn_time = self.now
+        self.enemy_spawn_pending = False # A regular-enemy tick is waiting for room under max_on_screen
+
+        # --- Entities ---
+        # Player and boss stay Sprites; everything that comes in numbers is array-backed.
+        self.all_sprites = pygame.sprite.Group()
+        self.boss_group = pygame.sprite.GroupSingle()
+        self.enemies = EntityStore(bounce_x=True, cull_margin=10) # Regular enemies, kind = index into available_enemy_images
+        self.bullets = OwnedProjectilePool(PLAYER_BULLET_POOL_SIZE) # Player bullets, owner = player slot
+        self.enemy_bullets = PatternBulletPool(ENEMY_BULLET_POOL_SIZE) # Boss bullets
+        self.powerups = EntityStore(capacity=8)                   # kind = index into POWERUP_TYPES
+        # Collision broadphase, one grid per store, rebuilt every frame
+        self.enemy_grid = SpatialHash()
+        self.bullet_grid = SpatialHash()
+        self.enemy_bullet_grid = SpatialHash()
+        self.powerup_grid = SpatialHash()
+        self.pixel_collisions = PIXEL_COLLISIONS # Mask narrowphase after the box tests (collision_masks.py)
+
+        self.players = [] # One Player per slot; a slot outlives its player, so bullet owners stay valid
+        for _ in range(max(1, players)):
+            self.add_player()
+        self.player = self.players[0] # Single-player code (HUD, autopilot, replays) uses slot 0
+        self.prev_sprite_pos = {} # Sprite -> rect.topleft before the last movement, for render interpolation
+
+        # --- Flags ---
+        self.game_over = False     # Player died this level
+        self.level_passed = False  # Boss defeated
+        self.boss_active = False
+        self.boss_spawned = False
+        self.boss_instance = None
+
+        self.configure(level_data)
+
+    def configure(self, level_data):
+        """
+        Applies a (compiled) level config. Called on creation and again by hot reload,
+        which keeps everything already on screen and only changes the rules from now on.
+        """
+        self.level_data = level_data
+        self.is_boss_level = level_data.get('is_boss_level', False)
+        self.enemy_types = level_data.get('enemy_types', ['enemy1'])
+        self.spawn_interval = level_data.get('spawn_interval', ENEMY_SPAWN_INTERVAL)
+        self.max_on_screen = level_data.get('max_on_screen', MAX_ONSCREEN_ENEMIES)
+        self.enemy_speed_y_range = level_data.get('enemy_speed_y_range')
+        self.enemy_speed_x_range = level_data.get('enemy_speed_x_range')
+        self.powerup_interval = level_data.get('powerup_interval', POWERUP_SPAWN_INTERVAL)
+        self.boss_appear_delay_seconds = level_data.get('boss_appear_delay_seconds', BOSS_APPEAR_DELAY_SECONDS)
+        self.duration_seconds = level_data.get('duration_seconds')
+        self.boss_patterns = level_data.get('boss_patterns', [])
+        if self.boss_instance and self.boss_instance.patterns_config != self.boss_patterns:
+            self.boss_instance.set_patterns(self.boss_patterns) # Hot reload: the boss on screen switches patterns
+
+        # Enemy kinds: the random-spawn types first, then any extra types only scripted waves use
+        wave_types = [etype for wave in level_data.get('waves', []) for etype in wave.get('enemies') or []]
+        kind_types = [etype for etype in dict.fromkeys(self.enemy_types + wave_types) if self.images.get(etype)]
+        self.enemy_kind_index = {etype: i for i, etype in enumerate(kind_types)}
+        self.random_enemy_kinds = [self.enemy_kind_index[etype] for etype in self.enemy_types if etype in self.enemy_kind_index]
+        old_images = getattr(self, 'available_enemy_images', None)
+        self.available_enemy_images = [self.images.get(etype) for etype in kind_types]
+        if old_images is not None and old_images != self.available_enemy_images:
+            # Hot reload changed the enemy list: point live enemies at their image's new index,
+            # dropping those whose type was removed
+            new_index = {id(img): i for i, img in enumerate(self.available_enemy_images)}
+            self.enemies.remap_kinds([new_index.get(id(img), -1) for img in old_images])
+        if self.pixel_collisions:
+            # Masks and summed-area tables up front (during LevelPrefetch), not on the level's first hits
+            store_masks(self.available_enemy_images)
+            for image in (self.player_img, self.boss_img):
+                if image: mask_cache.get(image)
+
+        # Everything scheduled from the next frame on; on a reload, past waves stay past
+        self.timeline = SpawnTimeline(level_data, start_frame=self.frame, powerup_last_ms=self.powerup_last_spawn_time,
+                                      boss_spawned=self.boss_spawned)
+
+    def add_player(self):
+        """ Adds a Player in a new slot (drop-in co-op). Returns the slot. """
+        player = Player(self.player_img, self.audio, start_time=self.now)
+        self.all_sprites.add(player)
+        self.players.append(player)
+        return len(self.players) - 1
+
+    def remove_player(self, slot):
+        """ Takes a slot's Player out of the level (a client left). The level fails once nobody is left. """
+        self.players[slot].kill()
+        if not self.finished and not self.living_players():
+            self.game_over = True
+
+    def living_players(self):
+        return [player for player in self.players if player.alive()]
+
+    @property
+    def finished(self):
+        return self.game_over or self.level_passed
+
+    @property
+    def result(self):
+        """ 'PASSED', 'FAILED' or None while the level is still running. """
+        if self.level_passed: return 'PASSED'
+        if self.game_over: return 'FAILED'
+        return None
+
+    def play_sound(self, key):
+        """ Queues a named sound for this step; silently does nothing headless. """
+        self.audio.trigger(key)
+
+
+def step_level(state, frame_input, profiler=None):
+    """
+    Advances the level by one frame. Mutates and returns state.
+    Order: bomb, update, shoot, due timeline events (boss, waves, enemy tick,
+    powerups, end of duration), collisions, death check.
+    frame_input is a FrameInput for slot 0, or a list with one per slot (None =
+    no input this frame: the player holds position and doesn't fire).
+    profiler (profiler.FrameProfiler) gets the update/spawn/collide/audio phase marks.
+    """
+    state.frame += 1
+    state.now = int(state.frame * FRAME_MS)
+    now = state.now
+    inputs = frame_input if isinstance(frame_input, (list, tuple)) else [frame_input]
+    active = [(slot, player, inputs[slot] if slot < len(inputs) else None)
+              for slot, player in enumerate(state.players) if player.alive()]
+
+    for _slot, player, player_input in active:
+        if player_input and player_input.bomb and not state.game_over:
+            killed_by_bomb = player.use_bomb(state.enemies)
+            player.score += killed_by_bomb # Add score for bomb kills
+
+    if state.finished:
+        state.audio.flush()
+        if profiler: profiler.mark('audio')
+        return state
+
+    # --- Movement ---
+    state.prev_sprite_pos = {sprite: sprite.rect.topleft for sprite in state.all_sprites}
+    for _slot, player, player_input in active:
+        player.update(now, player_input.mouse_pos if player_input else player.rect.center)
+    state.enemies.update()
+    state.bullets.update()
+    state.enemy_bullets.update()
+    state.powerups.update()
+    if state.boss_instance:
+        state.boss_instance.target = _boss_target(state)
+    state.boss_group.update(now)
+
+    # --- Player Shooting ---
+    for slot, player, player_input in active:
+        if player_input and player_input.fire:
+            first_row = state.bullets.count
+            player.shoot(state.bullets, now)
+            state.bullets.owner[first_row:state.bullets.count] = slot
+    if profiler: profiler.mark('update')
+
+    # --- Spawning: only the timeline events due this frame (boss, waves, enemy ticks, powerups) ---
+    enemy_tick = False
+    for _frame, _order, _seq, kind, payload in state.timeline.pop_due(state.frame):
+        if kind == 'boss':
+            _spawn_boss(state)
+        elif kind == 'wave':
+            _spawn_wave_member(state, payload)
+        elif kind == 'enemy':
+            state.enemy_spawn_pending = True
+            enemy_tick = True
+        elif kind == 'powerup':
+            state.powerup_last_spawn_time = now
+            if state.powerup_images:
+                spawn_powerup(state.powerups, state.powerup_kind_images, rng=state.rng['powerup_spawn'])
+        elif kind == 'end':
+            _end_of_duration(state)
+
+    # --- Regular Enemy Spawn (runs before and during the boss fight) ---
+    if state.enemy_spawn_pending and len(state.enemies) < state.max_on_screen:
+        state.enemy_spawn_pending = False
+        if not enemy_tick:
+            state.timeline.restart_enemy_ticks(state.frame) # It waited for room: later ticks shift with it
+        if state.random_enemy_kinds:
+            rng = state.rng['enemy_spawn']
+            kind = state.random_enemy_kinds[rng.randrange(len(state.random_enemy_kinds))]
+            spawn_enemy(state.enemies, kind, state.available_enemy_images[kind],
+                        speed_y_range=state.enemy_speed_y_range, speed_x_range=state.enemy_speed_x_range, rng=rng)
+    if profiler: profiler.mark('spawn')
+
+    _resolve_collisions(state)
+
+    # Drop rows killed by movement, collisions or a bomb
+    for store in (state.enemies, state.bullets, state.enemy_bullets, state.powerups):
+        store.compact()
+    if profiler: profiler.mark('collide')
+    state.audio.flush() # One voice per sound per frame, on the scheduler's channel pool
+    if profiler: profiler.mark('audio')
+    return state
+
+
+def _spawn_boss(state):
+    """ Timeline 'boss' event: the boss enters (boss_appear_delay_seconds reached). """
+    if state.boss_spawned or not state.is_boss_level:
+        return
+    print(f"Boss appear delay reached ({state.boss_appear_delay_seconds}s). Spawning Boss!")
+    if not state.boss_img:
+        print(f"Error: Boss image missing for boss level {state.level_num}. Failing level.")
+        state.game_over = True # Treat as failure if boss can't spawn
+        return
+    boss = EnemyBoss(state.boss_img, state.audio, state.enemy_bullets, start_time=state.now,
+                     patterns=state.boss_patterns, target=state.player)
+    state.all_sprites.add(boss)
+    state.boss_group.add(boss)
+    state.boss_instance = boss
+    state.boss_active = True
+    state.boss_spawned = True
+    print("Boss Incoming!")
+    state.play_sound('boss_intro')
+
+def _boss_target(state):
+    """ The living player closest to the boss (aimed patterns fire at it), or None. """
+    boss_x, boss_y = state.boss_instance.rect.center
+    players = state.living_players()
+    if not players:
+        return None
+    return min(players, key=lambda p: (p.rect.centerx - boss_x) ** 2 + (p.rect.centery - boss_y) ** 2)
+
+def _spawn_wave_member(state, member):
+    """ Timeline 'wave' event: one scripted enemy at its formation slot, just above the screen. """
+    kind = state.enemy_kind_index.get(member['type'])
+    if kind is None:
+        return # Type has no image
+    width, height = state.available_enemy_images[kind].get_size()
+    x = member['x']
+    if x is None: # 'random' formation
+        x = state.rng['enemy_spawn'].randint(width // 2, SCREEN_WIDTH - width // 2)
+    left = max(0, min(SCREEN_WIDTH - width, int(x - width / 2)))
+    state.enemies.spawn(left, -height + int(member['dy']), member['vx'], member['vy'], width, height, kind)
+
+def _end_of_duration(state):
+    """ Timeline 'end' event: duration_seconds reached. Survival levels pass; boss levels stop regular spawning. """
+    if state.is_boss_level:
+        print(f"Level {state.level_num}: duration reached, waves over - defeat the boss!")
+        state.enemy_spawn_pending = False # The timeline has no enemy ticks past the end
+    else:
+        print(f"Level {state.level_num}: survived {state.duration_seconds}s. Level passed!")
+        state.level_passed = True
+
+
+def _resolve_collisions(state):
+    """
+    All per-frame collision passes, each answered by the spatial hash broadphase
+    (Rect tests for the player and boss). With state.pixel_collisions, the box hits
+    are then confirmed with the cached image masks.
+    """
+    now = state.now
+    players = state.players
+    pixel = state.pixel_collisions
+    enemy_grid = state.enemy_grid.build(state.enemies)
+    bullet_grid = state.bullet_grid.build(state.bullets)
+    if pixel:
+        enemy_masks = store_masks(state.available_enemy_images)
+        bullet_masks = store_masks([get_projectile_surface('bullet')])
+        player_mask = mask_cache.get(state.player_img)[0] # The hull; the shield ring isn't hittable anyway
+
+    # Player Bullets vs Enemies (each kill scores for the owner of the first bullet that hit it)
+    bullet_hits, consumers = enemy_grid.consume(
+        state.bullets, pair_filter(state.enemies, enemy_masks, state.bullets, bullet_masks) if pixel else None)
+    enemy_hits, first = np.unique(consumers, return_index=True)
+    state.enemies.kill(enemy_hits)
+    state.bullets.kill(bullet_hits)
+    for slot in state.bullets.owner[bullet_hits[first]].tolist():
+        players[slot].score += 1
+        state.play_sound('enemy_explode')
+
+    # Player Bullets vs Boss
+    boss = state.boss_instance
+    if state.boss_active and boss:
+        bullets_hitting_boss = bullet_grid.query_rect(boss.rect) # Skips bullets already spent on enemies
+        if pixel:
+            bullets_hitting_boss = rows_hitting(state.bullets, bullets_hitting_boss, bullet_masks,
+                                                mask_cache.get(boss.image_orig)[0], boss.rect.topleft)
+        if bullets_hitting_boss.size:
+            state.bullets.kill(bullets_hitting_boss)
+            state.play_sound('boss_hit')
+            boss.health -= len(bullets_hitting_boss)
+            if boss.health <= 0:
+                state.play_sound('boss_explode')
+                state.play_sound('game_win')
+                boss.kill()
+                players[state.bullets.owner[bullets_hitting_boss[0]]].score += 50
+                print("Boss Defeated!")
+                state.boss_active = False
+                state.boss_instance = None
+                state.level_passed = True # Level passed ONLY when boss is defeated
+
+    # Player vs Powerups (box test only: pickups are generous on purpose)
+    powerup_grid = state.powerup_grid.build(state.powerups)
+    for player in state.living_players():
+        powerup_hits = powerup_grid.query_rect(player.rect) # Skips power-ups a lower slot just took
+        state.powerups.kill(powerup_hits)
+        for kind in state.powerups.kind[powerup_hits].tolist():
+            player.activate_powerup(POWERUP_TYPES[kind], now)
+
+    # Player Death Check (after the startup grace period)
+    if now <= STARTUP_GRACE_PERIOD:
+        return
+    enemy_bullet_grid = None # Built on first use: often every player is shielded
+    for slot, player in enumerate(players):
+        if not player.alive() or player.shield_active:
+            continue
+        player_enemy_hits = enemy_grid.query_rect(player.rect)
+        if pixel: player_enemy_hits = rows_hitting(state.enemies, player_enemy_hits, enemy_masks, player_mask, player.rect.topleft)
+        state.enemies.kill(player_enemy_hits) # Kill enemy on collision
+        boss = state.boss_instance
+        player_boss_collision = state.boss_active and boss and player.rect.colliderect(boss.rect)
+        if player_boss_collision and pixel:
+            player_boss_collision = sprites_overlap(player_mask, player.rect.topleft,
+                                                    mask_cache.get(boss.image_orig)[0], boss.rect.topleft)
+        if enemy_bullet_grid is None:
+            enemy_bullet_grid = state.enemy_bullet_grid.build(state.enemy_bullets)
+        enemy_bullet_hits = enemy_bullet_grid.query_rect(player.rect)
+        if pixel:
+            enemy_bullet_hits = rows_hitting(state.enemy_bullets, enemy_bullet_hits,
+                                             store_masks([get_projectile_surface('enemy_bullet')]),
+                                             player_mask, player.rect.topleft)
+        state.enemy_bullets.kill(enemy_bullet_hits) # Kill bullet
+
+        if player_enemy_hits.size or player_boss_collision or enemy_bullet_hits.size:
+            reason = "Enemy" if player_enemy_hits.size else ("Boss Collision" if player_boss_collision else "Boss Bullet")
+            state.play_sound('player_lose')
+            player.kill()
+            if state.living_players():
+                print(f"Player {slot + 1} hit by {reason}!")
+            else:
+                print(f"Player hit by {reason}! Level Failed!")
+                state.game_over = True
@@ -0,0 +1,170 @@
+# /Users/junluo/Desktop/PlaneWar/spatial_hash.py
+"""
+Uniform-grid broadphase for EntityStore collisions.
+
+The 1000x600 playfield is split into square cells (SPATIAL_HASH_CELL_SIZE).
+build() buckets every live row of a store into the cells its box touches;
+entities above/below/beside the screen are clamped into the edge cells, which
+keeps the test exact because clamping never separates two overlapping boxes.
+Queries only run the exact Rect.colliderect-style test on rows that share a
+cell, so a frame costs roughly O(entities) instead of O(enemies x bullets).
+Builds and pair queries are vectorized; the grid is rebuilt once per frame.
+"""
+import numpy as np
+from settings import *
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+class SpatialHash:
+    """ Cell -> row index buckets for one EntityStore. """
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        self.inv_cell_size = 1.0 / cell_size
+        self.cols = -(-SCREEN_WIDTH // cell_size)  # Ceiling division
+        self.rows = -(-SCREEN_HEIGHT // cell_size)
+        self.store = None
+        self.rows_sorted = _EMPTY                  # Store rows, grouped by cell
+        self.cell_offsets = np.zeros(self.cols * self.rows + 1, dtype=np.intp)
+        self.left = self.top = self.right = self.bottom = np.empty(0)
+
+    # --- Cell Coverage ---
+    def _cell_index(self, v, last):
+        """ Cell coordinate of each value, clamped to [0, last]. (Float floor_divide is slow.) """
+        return np.clip(np.floor(v * self.inv_cell_size), 0, last).astype(np.intp)
+
+    def _cell_span(self, x, y, w, h):
+        """ Inclusive (x0, x1, y0, y1) cell ranges covered by boxes, clamped to the grid. """
+        last_col, last_row = self.cols - 1, self.rows - 1
+        x0 = self._cell_index(x, last_col)
+        y0 = self._cell_index(y, last_row)
+        x1 = np.maximum(np.clip(np.ceil((x + w) * self.inv_cell_size) - 1, 0, last_col).astype(np.intp), x0)
+        y1 = np.maximum(np.clip(np.ceil((y + h) * self.inv_cell_size) - 1, 0, last_row).astype(np.intp), y0)
+        return x0, x1, y0, y1
+
+    def _expand(self, rows, x, y, w, h):
+        """ One (row, cell) entry per cell each box touches. """
+        x0, x1, y0, y1 = self._cell_span(x, y, w, h)
+        nx = x1 - x0 + 1
+        per_row = nx * (y1 - y0 + 1)
+        total = int(per_row.sum())
+        first = np.repeat(np.cumsum(per_row) - per_row, per_row)
+        k = np.arange(total) - first # Index of the cell within each box's span
+        nx_rep = np.repeat(nx, per_row)
+        cx = np.repeat(x0, per_row) + k % nx_rep
+        cy = np.repeat(y0, per_row) + k // nx_rep
+        return np.repeat(rows, per_row), cy * self.cols + cx
+
+    # --- Build ---
+    def build(self, store):
+        """ Buckets every live row of the store. Call after movement, before queries. """
+        self.store = store
+        rows = store.live_indices()
+        if rows.size == 0:
+            self.rows_sorted = _EMPTY
+            self.cell_offsets[:] = 0
+            return self
+        entry_rows, cells = self._expand(rows, store.x[rows], store.y[rows], store.w[rows], store.h[rows])
+        order = np.argsort(cells, kind='stable')
+        self.rows_sorted = entry_rows[order]
+        counts = np.bincount(cells, minlength=self.cols * self.rows)
+        self.cell_offsets[0] = 0
+        np.cumsum(counts, out=self.cell_offsets[1:])
+        # Box edges laid out in bucket order so pair tests gather from contiguous arrays
+        r = self.rows_sorted
+        self.left = store.x[r]
+        self.top = store.y[r]
+        self.right = self.left + store.w[r]
+        self.bottom = self.top + store.h[r]
+        return self
+
+    # --- Queries ---
+    def _candidates(self, cells):
+        """ For each query cell entry: how many bucket entries share it, and their bucket positions. """
+        starts = self.cell_offsets[cells]
+        lens = self.cell_offsets[cells + 1] - starts
+        total = int(lens.sum())
+        if total == 0:
+            return lens, _EMPTY
+        first = np.repeat(np.cumsum(lens) - lens, lens)
+        return lens, np.repeat(starts, lens) + (np.arange(total) - first)
+
+    def query_rect(self, rect):
+        """ Live rows of the hashed store overlapping a pygame.Rect, in spawn order. """
+        s = self.store
+        if s is None or self.rows_sorted.size == 0 or rect.width <= 0 or rect.height <= 0:
+            return _EMPTY
+        # A single rect touches only a few cells, so walk them directly
+        cs = self.cell_size
+        x0 = min(max(rect.left // cs, 0), self.cols - 1)
+        x1 = min(max((rect.right - 1) // cs, x0), self.cols - 1)
+        y0 = min(max(rect.top // cs, 0), self.rows - 1)
+        y1 = min(max((rect.bottom - 1) // cs, y0), self.rows - 1)
+        offsets = self.cell_offsets
+        buckets = [self.rows_sorted[offsets[c]:offsets[c + 1]]
+                   for cy in range(y0, y1 + 1)
+                   for c in range(cy * self.cols + x0, cy * self.cols + x1 + 1)
+                   if offsets[c + 1] > offsets[c]]
+        if not buckets:
+            return _EMPTY
+        rows = np.unique(np.concatenate(buckets))
+        hit = (s.alive[rows]
+               & (s.x[rows] < rect.right) & (s.x[rows] + s.w[rows] > rect.left)
+               & (s.y[rows] < rect.bottom) & (s.y[rows] + s.h[rows] > rect.top)
+               & (s.w[rows] > 0) & (s.h[rows] > 0))
+        return rows[hit]
+
+    def query_pairs(self, other):
+        """
+        All overlapping (hashed_row, other_row) pairs between the hashed store and
+        another store's live rows, sorted by hashed row then other row.
+        """
+        a = self.store
+        rows = other.live_indices()
+        if a is None or rows.size == 0 or self.rows_sorted.size == 0:
+            return _EMPTY, _EMPTY
+        q_rows, q_cells = self._expand(rows, other.x[rows], other.y[rows], other.w[rows], other.h[rows])
+        lens, positions = self._candidates(q_cells)
+        if positions.size == 0:
+            return _EMPTY, _EMPTY
+        ib = np.repeat(q_rows, lens)
+        bx, by = other.x[ib], other.y[ib]
+        ax, ay = self.left[positions], self.top[positions]
+        hit = ((ax < bx + other.w[ib]) & (self.right[positions] > bx)
+               & (ay < by + other.h[ib]) & (self.bottom[positions] > by))
+        # Pairs sharing several cells show up once per cell: keep only the copy found in
+        # the cell holding the top-left corner of their intersection
+        ia, ib, cells = self.rows_sorted[positions[hit]], ib[hit], np.repeat(q_cells, lens)[hit]
+        corner_x = self._cell_index(np.maximum(ax[hit], bx[hit]), self.cols - 1)
+        corner_y = self._cell_index(np.maximum(ay[hit], by[hit]), self.rows - 1)
+        keep = (corner_y * self.cols + corner_x == cells) & a.alive[ia] & other.alive[ib]
+        keys = np.sort(ia[keep] * other.count + ib[keep])
+        return keys // other.count, keys % other.count
+
+    def collide(self, other, pair_filter=None):
+        """
+        Resolves hashed store vs other the way pygame.sprite.groupcollide(a, b, True, True)
+        does when iterating 'a' in spawn order: each 'other' row is consumed by the first
+        hashed row it overlaps. Returns (hashed_hit, other_hit); the caller kills them.
+        pair_filter(rows_a, rows_b) -> bool array, if given, is a narrowphase run on the
+        overlapping box pairs (e.g. collision_masks.pair_filter).
+        """
+        b_hit, consumer = self.consume(other, pair_filter)
+        if b_hit.size == 0:
+            return _EMPTY, _EMPTY
+        return np.unique(consumer), b_hit
+
+    def consume(self, other, pair_filter=None):
+        """
+        The per-row answer behind collide(): (other_hit, consumer), where consumer[i]
+        is the hashed row that consumed other_hit[i]. Lets the caller attribute hits
+        (e.g. which player's bullet killed an enemy).
+        """
+        pair_a, pair_b = self.query_pairs(other)
+        if pair_filter and pair_a.size:
+            keep = pair_filter(pair_a, pair_b)
+            pair_a, pair_b = pair_a[keep], pair_b[keep]
+        if pair_a.size == 0:
+            return _EMPTY, _EMPTY
+        b_hit, first = np.unique(pair_b, return_index=True)
+        return b_hit, pair_a[first]
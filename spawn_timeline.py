@@ -0,0 +1,155 @@
+# /Users/junluo/Desktop/PlaneWar/spawn_timeline.py
+"""
+Precomputed spawn timeline.
+
+A compiled level becomes a list of (frame, order, seq, kind, payload) events
+sorted by frame. step_level pops the events that are due with a cursor, so a
+frame with nothing scheduled costs one comparison, and no spawn rule is
+re-evaluated per frame. Event kinds:
+
+- 'boss':    the boss enters (boss_appear_delay_seconds, boss levels only)
+- 'wave':    one member of a scripted wave, with its own position and speed
+- 'enemy':   a regular random-enemy tick, every spawn_interval frames
+- 'powerup': a power-up drop, every powerup_interval ms
+- 'end':     duration_seconds reached
+
+Waves ("waves" in the level JSON) are expanded when the timeline is built.
+Each member gets its spawn frame (at + repeat * every + index * delay_ms)
+and its formation position. Formations: line, v, column, diagonal, random.
+
+The 'enemy' and 'powerup' rules never end, so they are generated
+TIMELINE_CHUNK_SECONDS at a time, and the next chunk is merged in when the
+cursor reaches the end of the current one. A regular-enemy tick that finds
+max_on_screen reached stays pending until there is room. Like the old
+per-frame spawn timer, which reset on every spawn, a delayed spawn restarts
+the cadence: the next tick is spawn_interval frames after it
+(restart_enemy_ticks).
+"""
+import math
+from settings import *
+
+FRAME_MS = 1000 / FPS # Simulated milliseconds per step
+FORMATIONS = ('line', 'v', 'column', 'diagonal', 'random')
+# Same-frame order matches the old per-frame checks: boss, enemies, powerups; 'end' last
+_ORDER = {'boss': 0, 'wave': 1, 'enemy': 2, 'powerup': 3, 'end': 4}
+
+
+def frame_at_ms(ms):
+    """ First frame whose simulated time int(frame * FRAME_MS) is >= ms. """
+    frame = max(0, math.ceil(ms / FRAME_MS))
+    while int(frame * FRAME_MS) < ms: frame += 1
+    while frame > 0 and int((frame - 1) * FRAME_MS) >= ms: frame -= 1
+    return frame
+
+def formation_offsets(formation, count, spacing):
+    """ (dx, dy) per member relative to the wave's anchor; dy <= 0 (members further up enter later). """
+    offsets = []
+    for i in range(count):
+        centered = i - (count - 1) / 2
+        if formation == 'line':
+            offsets.append((centered * spacing, 0))
+        elif formation == 'v':
+            offsets.append((centered * spacing, -abs(centered) * spacing / 2)) # Point leads
+        elif formation == 'column':
+            offsets.append((0, -i * spacing))
+        elif formation == 'diagonal':
+            offsets.append((centered * spacing, -i * spacing / 2))
+        else: # 'random': x is rolled at spawn time
+            offsets.append((None, 0))
+    return offsets
+
+
+class SpawnTimeline:
+    """ Sorted spawn events for one level, consumed with pop_due(frame). """
+    def __init__(self, level, start_frame=0, powerup_last_ms=0, boss_spawned=False):
+        self.cursor = 0
+        self._seq = 0
+        self._horizon = start_frame # Periodic events are generated up to this frame
+        self._chunk = max(1, int(TIMELINE_CHUNK_SECONDS * FPS))
+        duration = level.get('duration_seconds')
+        self.end_frame = max(1, frame_at_ms(duration * 1000)) if duration is not None else None
+
+        # step_level's first frame is 1: anything at 0 ms (a 0 s boss delay, a wave "at": 0) happens then
+        events = []
+        if level.get('is_boss_level') and not boss_spawned:
+            # A boss that is already overdue (hot reload shortened the delay) enters on the next frame
+            boss_frame = frame_at_ms(level.get('boss_appear_delay_seconds', BOSS_APPEAR_DELAY_SECONDS) * 1000)
+            events.append(self._event(max(boss_frame, start_frame + 1), 'boss', None))
+        for wave_index, wave in enumerate(level.get('waves', [])):
+            for member in self._expand_wave(wave_index, wave):
+                if member[0] > start_frame and (self.end_frame is None or member[0] <= self.end_frame):
+                    events.append(self._event(*member))
+        if self.end_frame is not None and self.end_frame > start_frame:
+            events.append(self._event(self.end_frame, 'end', None))
+
+        # Periodic rules: regular enemies on a frame cadence, powerups on the ms clock
+        self.spawn_interval = level.get('spawn_interval', ENEMY_SPAWN_INTERVAL)
+        self.powerup_interval = level.get('powerup_interval', POWERUP_SPAWN_INTERVAL)
+        self._next_enemy = (start_frame // self.spawn_interval + 1) * self.spawn_interval
+        self._powerup_last = powerup_last_ms
+        self._next_powerup = frame_at_ms(self._powerup_last + self.powerup_interval + 1)
+
+        self.events = sorted(events)
+        self._extend()
+
+    def _event(self, frame, kind, payload):
+        self._seq += 1
+        return (frame, _ORDER[kind], self._seq, kind, payload)
+
+    def _expand_wave(self, wave_index, wave):
+        """ Yields (frame, 'wave', payload) for every member of every repeat of a wave. """
+        offsets = formation_offsets(wave['formation'], wave['count'], wave['spacing'])
+        anchor_x = wave['x'] if wave['x'] is not None else SCREEN_WIDTH // 2
+        enemies = wave['enemies']
+        for repeat in range(wave['repeat']):
+            start_ms = (wave['at'] + repeat * wave['every']) * 1000
+            for i, (dx, dy) in enumerate(offsets):
+                payload = {'wave': wave_index, 'type': enemies[i % len(enemies)],
+                           'x': None if dx is None else anchor_x + dx, 'dy': dy,
+                           'vx': wave['speed_x'], 'vy': wave['speed_y']}
+                yield max(1, frame_at_ms(start_ms + i * wave['delay_ms'])), 'wave', payload
+
+    def _extend(self):
+        """ Generates the next chunk of periodic events and merges it in. """
+        end = self._horizon + self._chunk
+        new = self._enemy_ticks(end)
+        while self._next_powerup <= end:
+            new.append(self._event(self._next_powerup, 'powerup', None))
+            # Next drop is powerup_interval after this one's simulated time, like the old ms check
+            self._powerup_last = int(self._next_powerup * FRAME_MS)
+            self._next_powerup = frame_at_ms(self._powerup_last + self.powerup_interval + 1)
+        self.events = sorted(self.events[self.cursor:] + new)
+        self.cursor = 0
+        self._horizon = end
+
+    def _enemy_ticks(self, end):
+        """ Regular-enemy tick events from _next_enemy up to end (and never past end_frame). """
+        if self.end_frame is not None:
+            end = min(end, self.end_frame)
+        ticks = []
+        while self._next_enemy <= end:
+            ticks.append(self._event(self._next_enemy, 'enemy', None))
+            self._next_enemy += self.spawn_interval
+        return ticks
+
+    def restart_enemy_ticks(self, frame):
+        """ A pending enemy spawned late, at frame: the following ticks restart from frame + spawn_interval. """
+        queued = [event for event in self.events[self.cursor:] if event[3] != 'enemy']
+        self._next_enemy = frame + self.spawn_interval
+        self.events = sorted(queued + self._enemy_ticks(self._horizon))
+        self.cursor = 0
+
+    def pop_due(self, frame):
+        """ Events scheduled at or before frame that haven't been returned yet, in order. """
+        while frame > self._horizon:
+            self._extend()
+        events = self.events
+        start = end = self.cursor
+        while end < len(events) and events[end][0] <= frame:
+            end += 1
+        self.cursor = end
+        return events[start:end]
+
+    def __len__(self):
+        """ Events still queued in the generated part of the timeline. """
+        return len(self.events) - self.cursor
@@ -0,0 +1,112 @@
+# /Users/junluo/Desktop/PlaneWar/sprite_atlas.py
+"""
+Sprite atlas for batched drawing.
+
+Every image the level draws (player and shield variant, enemy types, boss and
+its damage tints, power-ups, projectiles) is copied once into a shared atlas
+surface and then drawn as (atlas, position, source rect). With a single source
+surface per layer, EntityStore.blit_sequence builds each frame's blit list with
+zip() over NumPy columns instead of a Python loop per entity, and draw_level
+hands the whole frame - every layer, in order - to one Surface.blits call.
+
+There are two pages, one per pixel format: images with per-pixel alpha (or a
+colorkey) go on an SRCALPHA page, opaque ones (the projectiles) on an opaque
+page, so thousands of bullets keep their cheaper opaque blit. An image that no
+longer fits is drawn from its own surface (counted in fallbacks).
+
+Surface.fblits (pygame-ce) takes no source rect, so when it is available and
+no dirty rects are needed, entries are drawn through subsurface views of the
+atlas instead.
+
+Images are keyed by identity and kept referenced, so a cached id is never reused.
+pack_level() packs a level's images up front (tallest first); anything not
+packed yet (e.g. after a hot reload) is added on first draw.
+"""
+import pygame
+from settings import *
+from bullet import get_projectile_surface
+from sprite_variants import boss_damage_variants
+
+FBLITS = hasattr(pygame.Surface, 'fblits') # pygame-ce 2.1.4+
+
+
+class AtlasPage:
+    """ One atlas surface filled shelf by shelf (rows of images, left to right). """
+    def __init__(self, size, alpha):
+        self.size = size
+        self.alpha = alpha
+        self.surface = None # Created on first add(), once a display mode exists for convert()
+        self._x = self._y = self._shelf_h = 0
+
+    def _create(self):
+        if self.alpha:
+            surface = pygame.Surface(self.size, pygame.SRCALPHA)
+            return surface.convert_alpha() if pygame.display.get_surface() else surface
+        surface = pygame.Surface(self.size)
+        return surface.convert() if pygame.display.get_surface() else surface
+
+    def add(self, image):
+        """ Copies image onto the page. Returns its area Rect, or None if the page is full. """
+        w, h = image.get_size()
+        if self._x + w > self.size[0]: # Start a new shelf
+            self._x, self._y, self._shelf_h = 0, self._y + self._shelf_h, 0
+        if w > self.size[0] or self._y + h > self.size[1]:
+            return None
+        if self.surface is None:
+            self.surface = self._create()
+        area = pygame.Rect(self._x, self._y, w, h)
+        self.surface.fill((0, 0, 0, 0) if self.alpha else BLACK, area)
+        self.surface.blit(image, area)
+        self._x += w + SPRITE_ATLAS_PADDING
+        self._shelf_h = max(self._shelf_h, h + SPRITE_ATLAS_PADDING)
+        return area
+
+
+class SpriteAtlas:
+    """ image -> (atlas surface, area) it is drawn from. """
+    def __init__(self, size=SPRITE_ATLAS_SIZE):
+        self.pages = {True: AtlasPage(size, alpha=True), False: AtlasPage(size, alpha=False)}
+        self._entries = {} # id(image) -> (image, surface, area, view)
+        self.fallbacks = 0
+
+    def _add(self, image):
+        alpha = bool(image.get_flags() & pygame.SRCALPHA) or image.get_colorkey() is not None
+        page = self.pages[alpha]
+        area = page.add(image)
+        if area is None:
+            print(f"Warning: Sprite atlas page full, drawing a {image.get_size()} image on its own.")
+            self.fallbacks += 1
+            entry = (image, image, None, image)
+        else:
+            entry = (image, page.surface, area, page.surface.subsurface(area))
+        self._entries[id(image)] = entry
+        return entry
+
+    def pack(self, images):
+        """ Adds images not in the atlas yet, tallest first (tighter shelves). """
+        new = {id(image): image for image in images if image and id(image) not in self._entries}
+        for image in sorted(new.values(), key=lambda image: image.get_height(), reverse=True):
+            self._add(image)
+
+    def source(self, image, view=False):
+        """ (surface, area) to blit image from; view=True gives (subsurface of the atlas, None) for fblits. """
+        entry = self._entries.get(id(image)) or self._add(image)
+        return (entry[3], None) if view else (entry[1], entry[2])
+
+    def sources(self, images, view=False):
+        return [self.source(image, view) for image in images]
+
+    def stats(self):
+        return {'images': len(self._entries), 'fallbacks': self.fallbacks}
+
+
+sprite_atlas = SpriteAtlas()
+
+
+def pack_level(state):
+    """ Packs every image a LevelState can draw into sprite_atlas. """
+    images = list(state.player.variants.values()) + list(state.available_enemy_images) + list(state.powerup_kind_images)
+    images += [get_projectile_surface('bullet'), get_projectile_surface('enemy_bullet')]
+    if state.is_boss_level and state.boss_img:
+        images += boss_damage_variants(state.boss_img)
+    sprite_atlas.pack(images)
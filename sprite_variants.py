@@ -0,0 +1,74 @@
+# /Users/junluo/Desktop/PlaneWar/sprite_variants.py
+"""
+Precomputed visual states for the Player and EnemyBoss sprites.
+
+Instead of copying image_orig and redrawing effects every frame, each visual
+state (player normal/shielded, boss damage tints) is built once per source
+image and cached; the sprite then just swaps its .image reference.
+"""
+import pygame
+from settings import *
+
+
+class VariantCache:
+    """ (source surface, variant name) -> prebuilt surface. """
+    def __init__(self):
+        self._surfaces = {}
+        self.builds = 0
+
+    def get(self, base, name, build):
+        """ Returns the cached variant, calling build(base) the first time it is requested. """
+        key = (base, name)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = build(base)
+            self._surfaces[key] = surface
+            self.builds += 1
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+
+variant_cache = VariantCache()
+
+
+def _shielded(radius, color):
+    def build(base):
+        image = base.copy()
+        center = image.get_rect().center
+        try:
+            # Draw semi-transparent circle onto the image
+            pygame.draw.circle(image, color, center, radius, 3)
+        except TypeError: # Handle potential issue if color doesn't have alpha
+            pygame.draw.circle(image, CYAN, center, radius, 3) # Fallback color
+        return image
+    return build
+
+def player_variants(image_orig, shield_radius, shield_color):
+    """ {'normal': surface, 'shielded': surface} for a player image. """
+    return {
+        'normal': image_orig,
+        'shielded': variant_cache.get(image_orig, ('shielded', shield_radius, shield_color),
+                                      _shielded(shield_radius, shield_color)),
+    }
+
+
+def _damage_tint(stage):
+    def build(base):
+        image = base.copy()
+        # Multiply green/blue down so the boss reddens as it takes damage; alpha is untouched
+        keep = 255 - int(BOSS_DAMAGE_TINT_STRENGTH * stage / (BOSS_DAMAGE_STAGES - 1))
+        image.fill((255, keep, keep), special_flags=pygame.BLEND_RGB_MULT)
+        return image
+    return build
+
+def boss_damage_variants(image_orig):
+    """ List of BOSS_DAMAGE_STAGES surfaces, from undamaged (index 0) to nearly dead. """
+    return [image_orig] + [variant_cache.get(image_orig, ('damage', stage), _damage_tint(stage))
+                           for stage in range(1, BOSS_DAMAGE_STAGES)]
+
+def damage_stage(health, max_health):
+    """ Index into boss_damage_variants for the current health. """
+    lost = 1 - max(0, health) / max_health
+    return min(BOSS_DAMAGE_STAGES - 1, int(lost * BOSS_DAMAGE_STAGES))
@@ -0,0 +1,209 @@
+# /Users/junluo/Desktop/PlaneWar/sweep.py
+"""
+Level-balancing parameter sweeps.
+
+Takes one level file and a grid of overrides for its fields, and simulates
+every combination (SWEEP_RUNS_PER_POINT seeds each) with headless.py's scripted
+player or the autopilot bot (--pilot bot), spread over a process pool - one
+worker per core by default. Each worker loads the images once and then runs
+levels uncapped.
+
+For every grid point the report aggregates pass/fail rate, survival time,
+score, peak entity counts and simulation cost per frame (FrameProfiler).
+
+Usage:
+    python sweep.py levels/level_1.json --param spawn_interval=30,60,90 --param max_on_screen=5,10,15
+    python sweep.py levels/level_2.json --param enemy_speed_y_range=1:3,2:5 \\
+        --param boss_appear_delay_seconds=30,45,60 --runs 5 --seconds 180 --out build/boss_sweep
+
+Any int / number / bool / [min, max] field of level_compiler.LEVEL_SCHEMA can
+be swept; ranges are written min:max. Every combination is validated with
+compile_level before anything runs. Writes <out>.csv (one row per grid point)
+and <out>.json (grid points plus every individual run).
+"""
+import os
+# Must be set before pygame is imported anywhere (workers import this module too)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import io
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from settings import *
+from assets import load_images
+from asset_pack import open_asset_pack
+from level_compiler import LEVEL_SCHEMA, compile_level
+from headless import run_level_headless
+from profiler import FrameProfiler
+from autopilot import Autopilot
+
+SWEEPABLE_KINDS = ('int', 'number', 'bool', 'range')
+_worker_images = None # Per-process image dict, loaded by _init_worker
+
+
+def parse_param(text):
+    """ 'name=v1,v2,...' -> (name, [values]) typed by LEVEL_SCHEMA. Raises ArgumentTypeError. """
+    name, sep, values = text.partition('=')
+    spec = LEVEL_SCHEMA.get(name)
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"expected name=value[,value...], got {text!r}")
+    if spec is None or spec['kind'] not in SWEEPABLE_KINDS:
+        sweepable = [n for n, s in LEVEL_SCHEMA.items() if s['kind'] in SWEEPABLE_KINDS]
+        raise argparse.ArgumentTypeError(f"can't sweep {name!r}; choose from {sweepable}")
+    parsed = []
+    for value in values.split(','):
+        try:
+            if spec['kind'] == 'range':
+                low, high = value.split(':')
+                parsed.append([int(low), int(high)])
+            elif spec['kind'] == 'bool':
+                parsed.append({'true': True, 'false': False}[value.lower()])
+            elif spec['kind'] == 'int':
+                parsed.append(int(value))
+            else:
+                parsed.append(float(value) if '.' in value else int(value))
+        except (ValueError, KeyError):
+            raise argparse.ArgumentTypeError(f"bad value {value!r} for {spec['kind']} field {name!r}")
+    return name, parsed
+
+def build_grid(raw_level, params, filename):
+    """ Compiled level config for every combination of params. Raises LevelError on the first invalid one. """
+    names = [name for name, _ in params]
+    grid = []
+    for values in itertools.product(*(values for _, values in params)):
+        overrides = dict(zip(names, values))
+        grid.append((overrides, compile_level(dict(raw_level, **overrides), filename)))
+    return grid
+
+def format_value(value):
+    return f"{value[0]}:{value[1]}" if isinstance(value, list) else value
+
+
+# --- Worker side ---
+
+def _init_worker():
+    global _worker_images
+    _worker_images = load_images(open_asset_pack() if USE_ASSET_PACK else None)
+
+def simulate_point(point, level_data, seed, max_frames, pilot='scripted'):
+    """ One run of one grid point in a worker. Returns a flat result dict. """
+    peaks = {'enemies': 0, 'player_bullets': 0, 'boss_bullets': 0}
+    def track(state):
+        peaks['enemies'] = max(peaks['enemies'], len(state.enemies))
+        peaks['player_bullets'] = max(peaks['player_bullets'], len(state.bullets))
+        peaks['boss_bullets'] = max(peaks['boss_bullets'], len(state.enemy_bullets))
+
+    profiler = FrameProfiler(capacity=max_frames)
+    with contextlib.redirect_stdout(io.StringIO()): # Boss / bomb progress prints from every run
+        state, wall = run_level_headless(level_data, _worker_images, max_frames, seed=seed,
+                                         profiler=profiler, on_step=track,
+                                         pilot=Autopilot() if pilot == 'bot' else None)
+    frame_ms = profiler.durations_ms().sum(axis=1)
+    return {
+        'point': point, 'seed': seed, 'result': state.result or 'TIMEOUT',
+        'survival_s': state.now / 1000, 'score': state.player.score, 'frames': state.frame,
+        'peak_enemies': peaks['enemies'], 'peak_player_bullets': peaks['player_bullets'],
+        'peak_boss_bullets': peaks['boss_bullets'],
+        'frame_ms_mean': float(frame_ms.mean()) if len(frame_ms) else 0.0,
+        'frame_ms_p95': float(np.percentile(frame_ms, 95)) if len(frame_ms) else 0.0,
+        'wall_s': wall,
+    }
+
+
+# --- Aggregation and report ---
+
+def aggregate(overrides, runs):
+    """ Summary row for one grid point from its runs. """
+    results = [run['result'] for run in runs]
+    survival = [run['survival_s'] for run in runs]
+    scores = [run['score'] for run in runs]
+    row = {name: format_value(value) for name, value in overrides.items()}
+    row.update({
+        'runs': len(runs),
+        'pass_rate': results.count('PASSED') / len(runs),
+        'fail_rate': results.count('FAILED') / len(runs),
+        'survival_mean_s': round(float(np.mean(survival)), 2),
+        'survival_min_s': round(min(survival), 2),
+        'score_mean': round(float(np.mean(scores)), 1),
+        'score_max': max(scores),
+        'peak_enemies': max(run['peak_enemies'] for run in runs),
+        'peak_player_bullets': max(run['peak_player_bullets'] for run in runs),
+        'peak_boss_bullets': max(run['peak_boss_bullets'] for run in runs),
+        'frame_ms_mean': round(float(np.mean([run['frame_ms_mean'] for run in runs])), 4),
+        'frame_ms_p95': round(max(run['frame_ms_p95'] for run in runs), 4),
+    })
+    return row
+
+def write_report(out, level_file, rows, runs):
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out + ".csv", 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(out + ".json", 'w', encoding='utf-8') as f:
+        json.dump({'level_file': level_file, 'points': rows, 'runs': runs}, f, indent=2)
+    return out + ".csv", out + ".json"
+
+def print_table(rows, param_names):
+    columns = param_names + ['pass_rate', 'survival_mean_s', 'score_mean', 'peak_enemies', 'frame_ms_mean']
+    widths = [max(len(col), *(len(str(row[col])) for row in rows)) for col in columns]
+    print("  ".join(col.rjust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[col]).rjust(w) for col, w in zip(columns, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep level parameters over simulated runs on all cores.")
+    parser.add_argument('level_file', help="Level JSON to start from (e.g. levels/level_1.json)")
+    parser.add_argument('--param', type=parse_param, action='append', required=True, metavar='NAME=V1,V2',
+                        help="Field and values to sweep (repeatable; ranges as min:max)")
+    parser.add_argument('--runs', type=int, default=SWEEP_RUNS_PER_POINT, help="Seeds per grid point")
+    parser.add_argument('--seconds', type=float, default=SWEEP_MAX_SECONDS, help="Simulated time limit per run")
+    parser.add_argument('--pilot', choices=('scripted', 'bot'), default='scripted', help="Who flies the ship")
+    parser.add_argument('--seed', type=int, default=0, help="First seed (runs use seed, seed + 1, ...)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (default: one per core)")
+    parser.add_argument('--out', help="Report path without extension (default: build/sweep_<level>_<time>)")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.level_file, 'r', encoding='utf-8') as f:
+            raw_level = json.load(f)
+        grid = build_grid(raw_level, args.param, os.path.basename(args.level_file))
+    except (OSError, ValueError) as e: # Includes level_compiler.LevelError for an invalid combination
+        print(f"Error: {e}")
+        return 2
+
+    max_frames = int(args.seconds * FPS)
+    total = len(grid) * args.runs
+    print(f"Sweeping {len(grid)} grid point(s) x {args.runs} run(s) = {total} runs on {args.workers} worker(s)...")
+    start = time.perf_counter()
+    runs_by_point = [[] for _ in grid]
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(simulate_point, point, level_data, args.seed + i, max_frames, args.pilot)
+                   for point, (_overrides, level_data) in enumerate(grid) for i in range(args.runs)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            run = future.result()
+            runs_by_point[run['point']].append(run)
+            print(f"\r  {done}/{total} runs", end="", flush=True)
+    print(f"\rFinished {total} runs in {time.perf_counter() - start:.1f}s.")
+
+    rows = [aggregate(overrides, runs) for (overrides, _level), runs in zip(grid, runs_by_point)]
+    all_runs = [dict(run, **{name: format_value(v) for name, v in grid[run['point']][0].items()})
+                for runs in runs_by_point for run in sorted(runs, key=lambda r: r['seed'])]
+    print_table(rows, [name for name, _ in args.param])
+    level_name = os.path.splitext(os.path.basename(args.level_file))[0]
+    out = args.out or os.path.join(BUILD_DIR, time.strftime(f"sweep_{level_name}_%Y%m%d_%H%M%S"))
+    csv_path, json_path = write_report(out, args.level_file, rows, all_runs)
+    print(f"Report written: {csv_path}, {json_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
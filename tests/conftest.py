@@ -0,0 +1,34 @@
+# /Users/junluo/Desktop/PlaneWar/tests/conftest.py
+"""
+Shared pytest setup: SDL dummy drivers, the project root on sys.path and the
+sprite images. Run from the project root with `python -m pytest -q`.
+"""
+import os
+import sys
+# Must be set before pygame is imported anywhere
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import pygame
+
+pygame.init()
+
+
+@pytest.fixture(scope='session')
+def images():
+    """ Every sprite image, loaded once (unconverted: there is no display mode). """
+    from assets import load_images
+    return load_images()
+
+
+@pytest.fixture
+def level():
+    """ Returns a compiled level built from a minimal JSON dict plus overrides. """
+    from level_compiler import compile_level
+    def make(**fields):
+        raw = {'level_number': 1, 'enemy_types': ['enemy1']}
+        raw.update(fields)
+        return compile_level(raw)
+    return make
@@ -0,0 +1,62 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_bullet_patterns.py
+import numpy as np
+import pytest
+from settings import *
+from bullet_patterns import PatternBulletPool, PatternRunner
+from level_compiler import compile_level, LevelError, PATTERN_SCHEMA
+
+
+def _pattern(**fields):
+    pattern = {name: spec['default'] for name, spec in PATTERN_SCHEMA.items() if 'default' in spec}
+    pattern.update(fields)
+    return pattern
+
+
+def test_emission_counts():
+    pool = PatternBulletPool(64)
+    runner = PatternRunner([_pattern(type='ring', count=12, every_ms=100),
+                            _pattern(type='fan', count=5, every_ms=1000, burst=3, burst_gap_ms=50)], pool)
+    assert runner.update(0, (240, 100)) == 0 # Not started
+    runner.start(0)
+    fired = sum(runner.update(now, (240, 100)) for now in range(0, 1000, 10)) # 0..990 ms
+    # Ring: every 100 ms -> 10 volleys; fan: one burst of 3 at 0, 50, 100 ms
+    assert fired == runner.volleys == 13
+    assert pool.count == 10 * 12 + 3 * 5
+
+
+def test_start_delay_and_health_gate():
+    pool = PatternBulletPool(64)
+    runner = PatternRunner([_pattern(type='aimed', count=3, every_ms=100, start_s=0.5, health_below=0.5)], pool)
+    runner.start(0)
+    assert sum(runner.update(now, (240, 100), (240, 500), 1.0) for now in range(0, 1000, 10)) == 0
+    assert sum(runner.update(now, (240, 100), (240, 500), 0.4) for now in range(1000, 1200, 10)) == 2
+    # Aimed straight down: the middle bullet has no x velocity
+    assert np.allclose(pool.vx[1], 0) and pool.vy[1] > 0
+
+
+def test_ring_spreads_evenly():
+    pool = PatternBulletPool(16)
+    runner = PatternRunner([_pattern(type='ring', count=4, speed=2, angle=0)], pool)
+    runner.start(0)
+    runner.update(0, (100, 100))
+    assert np.allclose(pool.vx[:4], [2, 0, -2, 0]) and np.allclose(pool.vy[:4], [0, 2, 0, -2])
+
+
+def test_stalled_bullets_are_culled():
+    pool = PatternBulletPool(16)
+    # Decelerates to exactly 0 px/frame in 4 frames, in the middle of the screen
+    pool.spawn_many(np.full(4, 200.0), np.full(4, 200.0), 0.0, 2.0, 8, 8, ax=0.0, ay=-0.5, accel_frames=4)
+    for _ in range(ENEMY_BULLET_MAX_FRAMES - 1):
+        pool.update()
+    assert len(pool) == 4 and np.allclose(pool.vy[:4], 0)
+    pool.update()
+    assert len(pool) == 0
+
+
+def test_motionless_pattern_is_rejected():
+    raw = {'level_number': 1, 'enemy_types': ['enemy1'], 'is_boss_level': True,
+           'boss_patterns': [{'type': 'ring', 'speed': 0}]}
+    with pytest.raises(LevelError, match='speed'):
+        compile_level(raw)
+    raw['boss_patterns'][0]['accel'] = 0.1
+    assert compile_level(raw)['boss_patterns'][0]['speed'] == 0
@@ -0,0 +1,61 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_collision_masks.py
+import random
+import numpy as np
+import pygame
+from settings import *
+from entity_store import EntityStore
+from bullet import get_projectile_surface
+from collision_masks import MaskCache, pair_filter, _summed_area
+
+
+def _reference_table(mask):
+    w, h = mask.get_size()
+    bits = np.array([[mask.get_at((x, y)) for x in range(w)] for y in range(h)], dtype=np.int32).reshape(h, w)
+    table = np.zeros((h + 1, w + 1), dtype=np.int32)
+    table[1:, 1:] = bits.cumsum(axis=0).cumsum(axis=1)
+    return table
+
+
+def _scatter(store, images, count, rng):
+    for _ in range(count):
+        kind = rng.randrange(len(images))
+        w, h = images[kind].get_size()
+        store.spawn(rng.randint(0, 200), rng.randint(0, 200), 0, 0, w, h, kind)
+
+
+def _all_pairs(a, b):
+    rows_a, rows_b = np.meshgrid(np.arange(a.count), np.arange(b.count), indexing='ij')
+    return rows_a.ravel(), rows_b.ravel()
+
+
+def test_summed_area_matches_pixels(images):
+    for key in ('player', 'enemy1', 'enemy2', 'enemy3', 'boss'):
+        mask = pygame.mask.from_surface(images[key], MASK_ALPHA_THRESHOLD)
+        assert np.array_equal(_summed_area(mask), _reference_table(mask))
+    assert _summed_area(pygame.mask.Mask((0, 4))).shape == (5, 1)
+
+
+def test_pair_filter_matches_mask_overlap(images):
+    rng = random.Random(3)
+    cache = MaskCache()
+    enemy_images = [images['enemy1'], images['enemy2'], images['enemy3']]
+    enemy_masks = cache.kinds(enemy_images)
+    bullet_images = [get_projectile_surface('bullet')]
+    bullet_masks = cache.kinds(bullet_images)
+    # Irregular sprites on both sides: the per-pair Mask.overlap path
+    other_images = [images['player'], images['boss']]
+    other_masks = cache.kinds(other_images)
+    assert bullet_masks.all_full and not other_masks.all_full
+
+    enemies, bullets, others = EntityStore(64), EntityStore(64), EntityStore(64)
+    _scatter(enemies, enemy_images, 40, rng)
+    _scatter(bullets, bullet_images, 40, rng)
+    _scatter(others, other_images, 20, rng)
+    for store_b, images_b, masks_b in ((bullets, bullet_images, bullet_masks), (others, other_images, other_masks)):
+        rows_a, rows_b = _all_pairs(enemies, store_b)
+        got = pair_filter(enemies, enemy_masks, store_b, masks_b)(rows_a, rows_b)
+        expected = [enemy_masks[enemies.kind[a]][0].overlap(
+                        masks_b[store_b.kind[b]][0], (int(store_b.x[b] - enemies.x[a]), int(store_b.y[b] - enemies.y[a])))
+                    is not None for a, b in zip(rows_a, rows_b)]
+        assert got.tolist() == expected
+        assert any(expected) and not all(expected)
@@ -0,0 +1,56 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_entity_store.py
+import numpy as np
+from settings import *
+from entity_store import EntityStore, ProjectilePool
+
+
+def test_spawn_grows_and_compact_keeps_order():
+    store = EntityStore(capacity=2)
+    for i in range(5):
+        store.spawn(i * 10, 0, 0, 1, 5, 5, kind=i)
+    store.spawn_many(np.arange(3) * 10.0 + 100, 0, 0, 1, 5, 5, kind=7)
+    assert store.count == 8 and store.capacity >= 8
+    store.kill(np.array([0, 3, 6]))
+    assert len(store) == 5
+    store.compact()
+    assert store.count == 5
+    assert store.kind[:5].tolist() == [1, 2, 4, 7, 7]
+    assert store.serial[:5].tolist() == [1, 2, 4, 5, 7] # Spawn numbers survive compaction, still increasing
+    assert store.x[:5].tolist() == [10, 20, 40, 100, 120]
+
+
+def test_update_moves_and_culls():
+    store = EntityStore(capacity=8)
+    store.spawn(100, 100, 2, 3, 10, 10)                 # On screen
+    store.spawn(100, SCREEN_HEIGHT - 1, 0, 5, 10, 10)   # Falls off the bottom
+    store.spawn(100, -5, 0, -6, 10, 10)                 # Flies off the top
+    store.spawn(-3, 100, -5, 0, 10, 10)                 # Leaves to the left
+    store.spawn(100, -50, 0, 2, 10, 10)                 # Above the screen, coming down: kept
+    store.update()
+    assert store.alive[:5].tolist() == [True, False, False, True, True]
+    assert (store.x[0], store.y[0]) == (102, 103) and (store.prev_x[0], store.prev_y[0]) == (100, 100)
+    store.update()
+    assert store.alive[:5].tolist() == [True, False, False, False, True]
+
+
+def test_bounce_off_side_walls():
+    store = EntityStore(capacity=4, bounce_x=True, cull_margin=10)
+    store.spawn(SCREEN_WIDTH - 12, 0, 5, 1, 10, 10)
+    store.spawn(3, 0, -5, 1, 10, 10)
+    store.update()
+    assert store.x[:2].tolist() == [SCREEN_WIDTH - 10, 0]
+    assert store.vx[:2].tolist() == [-5, 5]
+    store.y[:2] = SCREEN_HEIGHT + 8, SCREEN_HEIGHT + 10
+    store.update()
+    assert store.alive[:2].tolist() == [True, False] # Culled only past the cull margin
+
+
+def test_pool_recycles_rows():
+    pool = ProjectilePool(4)
+    for _ in range(3):
+        pool.spawn_many(np.zeros(4), 0, 0, -5, 2, 2)
+        pool.kill_all()
+        pool.compact()
+    assert pool.stats() == {'capacity': 4, 'live': 0, 'hits': 12, 'misses': 0, 'recycled': 12}
+    pool.spawn_many(np.zeros(6), 0, 0, -5, 2, 2)
+    assert pool.stats()['misses'] == 2 and pool.capacity >= 6
@@ -0,0 +1,23 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_idle.py
+import pygame
+from idle import IdleScheduler
+
+
+def test_wait_events_applies_window_events_once():
+    idle = IdleScheduler()
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(pygame.WINDOWMINIMIZED))
+    events, repaint = idle.wait_events(10)
+    assert [e.type for e in events] == [pygame.WINDOWMINIMIZED]
+    assert not repaint and idle.mode() == 'hidden'
+
+    pygame.event.post(pygame.event.Event(pygame.WINDOWFOCUSLOST))
+    pygame.event.post(pygame.event.Event(pygame.WINDOWRESTORED))
+    events, repaint = idle.wait_events(10)
+    assert repaint and idle.mode() == 'unfocused'
+
+
+def test_wait_events_times_out_empty():
+    idle = IdleScheduler()
+    pygame.event.clear()
+    assert idle.wait_events(1) == ([], False)
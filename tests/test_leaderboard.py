@@ -0,0 +1,54 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_leaderboard.py
+import pytest
+from leaderboard import Leaderboard
+
+
+@pytest.fixture
+def board(tmp_path):
+    board = Leaderboard(str(tmp_path / 'scores.db'), legacy_path=None)
+    yield board
+    board.close()
+
+
+def _play(board, player, level_scores, result):
+    run_id = board.begin_run(player, seed=1)
+    for level_number, score in enumerate(level_scores, start=1):
+        board.record_level(run_id, player, level_number, score, 1000 * level_number, 'PASSED')
+    board.end_run(run_id, level_scores[-1], result, len(level_scores), 5000)
+    return run_id
+
+
+def test_writer_thread_flushes_and_reads_back(board):
+    _play(board, 'alice', [10, 40], 'WIN')
+    _play(board, 'bob', [25], 'LOSE')
+    board.flush() # Everything above was queued for the writer thread
+    assert board.written == 7
+    assert board.best_score() == 40
+    assert [row[:4] for row in board.top_runs()] == [('alice', 40, 'WIN', 2), ('bob', 25, 'LOSE', 1)]
+    assert [row[:2] for row in board.top_levels(1)] == [('bob', 25), ('alice', 10)]
+    assert board.personal_best('alice') == 40 and board.personal_best('alice', 1) == 10
+    assert board.player_levels('alice') == [1, 2] and board.personal_best('carol') == 0
+
+
+def test_close_drains_the_queue(tmp_path):
+    path = str(tmp_path / 'scores.db')
+    board = Leaderboard(path, legacy_path=None)
+    for i in range(200):
+        _play(board, f"p{i % 7}", [i], 'LOSE')
+    board.close()
+    board.close() # Safe twice
+    reopened = Leaderboard(path, legacy_path=None)
+    assert reopened.best_score() == 199 and len(reopened.top_runs(1000)) == 200
+    reopened.close()
+
+
+def test_legacy_high_score_is_imported_once(tmp_path):
+    legacy = tmp_path / 'highscore.txt'
+    legacy.write_text("123\n")
+    path = str(tmp_path / 'scores.db')
+    board = Leaderboard(path, legacy_path=str(legacy))
+    assert board.best_score() == 123 and board.top_runs()[0][2] == 'MIGRATED'
+    board.close()
+    again = Leaderboard(path, legacy_path=str(legacy))
+    assert len(again.top_runs()) == 1
+    again.close()
@@ -0,0 +1,73 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_level_compiler.py
+import json
+import os
+import pytest
+from settings import *
+from level_compiler import compile_level, LevelError, LevelLibrary
+
+
+def _problems(raw):
+    with pytest.raises(LevelError) as error:
+        compile_level(raw, "bad.json")
+    assert str(error.value).startswith("bad.json: ")
+    return error.value.problems
+
+
+def test_defaults_are_filled_in():
+    level = compile_level({'level_number': 3, 'enemy_types': ['enemy2']})
+    assert level['spawn_interval'] == ENEMY_SPAWN_INTERVAL
+    assert level['max_on_screen'] == MAX_ONSCREEN_ENEMIES
+    assert level['enemy_speed_y_range'] == [ENEMY_MIN_SPEED_Y, ENEMY_MAX_SPEED_Y]
+    assert level['waves'] == [] and level['boss_patterns'] == [] and level['is_boss_level'] is False
+
+
+def test_every_problem_is_reported_together():
+    problems = _problems({'level_number': 0, 'spawn_interval': 'fast', 'enemy_speed_x_range': [3, -3],
+                          'is_boss_level': 1, 'enemy_types': ['enemy1', 'dragon']})
+    assert len(problems) == 5
+    text = "; ".join(problems)
+    for fragment in ("'level_number' must be at least 1", "'spawn_interval' must be an integer",
+                     "'enemy_speed_x_range' is inverted", "'is_boss_level' must be true or false",
+                     "unknown types ['dragon']"):
+        assert fragment in text
+
+
+def test_missing_required_fields_and_bad_top_level():
+    assert _problems({}) == ["missing required 'level_number'", "missing required 'enemy_types'"]
+    assert _problems([1, 2]) == ["top level must be a JSON object"]
+
+
+def test_wave_and_pattern_items_are_checked():
+    problems = _problems({'level_number': 1, 'enemy_types': ['enemy1'],
+                          'waves': [{'formation': 'circle'}, {'at': 1, 'repeat': 3}, 'nope'],
+                          'boss_patterns': [{'type': 'spiral'}, {'type': 'laser'}]})
+    assert problems == [
+        "missing required 'waves[0].at'",
+        "'waves[0].formation' must be one of ['line', 'v', 'column', 'diagonal', 'random'], got 'circle'",
+        "'waves[2]' must be an object, got 'nope'",
+        "'boss_patterns[1].type' must be one of ['fan', 'ring', 'spiral', 'aimed'], got 'laser'",
+        "'waves[1].every' must be > 0 when repeat > 1",
+        "'boss_patterns[0].spin' must be non-zero for a spiral",
+    ]
+
+
+def test_wave_enemies_default_to_level_types():
+    level = compile_level({'level_number': 1, 'enemy_types': ['enemy1', 'enemy3'], 'waves': [{'at': 0}]})
+    assert level['waves'][0]['enemies'] == ['enemy1', 'enemy3']
+
+
+def test_library_skips_broken_files_and_reloads_edits(tmp_path):
+    levels_dir = tmp_path / 'levels'
+    levels_dir.mkdir()
+    (levels_dir / 'level_1.json').write_text(json.dumps({'level_number': 1, 'enemy_types': ['enemy1']}))
+    (levels_dir / 'level_2.json').write_text('{"level_number": 2,')
+    library = LevelLibrary(str(levels_dir), str(tmp_path / 'cache.json'))
+    assert [level['level_number'] for level in library.levels] == [1]
+
+    (levels_dir / 'level_2.json').write_text(json.dumps({'level_number': 2, 'enemy_types': ['enemy2']}))
+    os.remove(levels_dir / 'level_1.json')
+    assert library.reload() == {1, 2}
+    assert [level['level_number'] for level in library.levels] == [2]
+
+    cached = LevelLibrary(str(levels_dir), str(tmp_path / 'cache.json'))
+    assert cached.compiled == 0 and cached.levels == library.levels
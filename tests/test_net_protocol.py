@@ -0,0 +1,109 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_net_protocol.py
+import asyncio
+import math
+import numpy as np
+import pytest
+from settings import *
+from simulation import LevelState, FrameInput, step_level
+from net_protocol import (MSG_SNAPSHOT, MSG_INPUT, KEYFRAME, STORES, capture_snapshot, pack_snapshot, unpack_snapshot,
+                          pack_input, unpack_input, read_message)
+
+
+def _body(message):
+    """ (type, body) of one framed message, read the way the client and server read the stream. """
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(message)
+        reader.feed_eof()
+        return await read_message(reader)
+    return asyncio.run(read())
+
+
+def _assert_same(sent, received):
+    assert (received.tick, received.frame, received.level_number, received.result, received.boss) == \
+           (sent.tick, sent.frame, sent.level_number, sent.result, sent.boss)
+    assert np.array_equal(received.players, sent.players)
+    for name, kinds in STORES:
+        a, b = getattr(sent, name), getattr(received, name)
+        for column in ('x', 'y', 'vx', 'vy') + (('kind',) if kinds else ()):
+            assert np.array_equal(getattr(a, column), getattr(b, column)), (name, column)
+
+
+def _inputs(frame):
+    """ Two pilots sweeping the bottom of the screen, always firing. """
+    x = SCREEN_WIDTH // 2 + int(300 * math.sin(frame / 50))
+    return [FrameInput((x, SCREEN_HEIGHT - 80), fire=True), FrameInput((SCREEN_WIDTH - x, SCREEN_HEIGHT - 120), fire=True)]
+
+
+@pytest.fixture
+def busy_state(level, images):
+    """ A two-player boss fight with dense patterns and regular enemies, 5 s in. """
+    data = level(is_boss_level=True, boss_appear_delay_seconds=0, spawn_interval=10, max_on_screen=40,
+                 enemy_types=['enemy1', 'enemy2', 'enemy3'],
+                 boss_patterns=[{'type': 'spiral', 'count': 6, 'speed': 3, 'spin': 9, 'every_ms': 50},
+                                {'type': 'ring', 'count': 30, 'speed': 5, 'accel': -0.08, 'accel_frames': 40,
+                                 'every_ms': 400}])
+    state = LevelState(data, images, seed=5, players=2)
+    for player in state.players: # Shielded for the whole test, so the fight keeps going
+        player.shield_active, player.shield_end_time = True, 10 ** 9
+    for _ in range(300):
+        step_level(state, _inputs(state.frame))
+    return state
+
+
+def test_deltas_decode_to_the_captured_world(busy_state):
+    state = busy_state
+    sent = received = late = None
+    delta_bytes = keyframe_bytes = 0
+    for tick in range(1, 241):
+        step_level(state, _inputs(state.frame))
+        if state.finished:
+            break
+        if tick % 2:
+            continue
+        snap = capture_snapshot(state, [11, 22], tick, sent)
+        message, keyframe = pack_snapshot(snap, sent), pack_snapshot(snap)
+        msg_type, body = _body(message)
+        assert msg_type == MSG_SNAPSHOT
+        base_tick, raw_size, decoded = unpack_snapshot(body, received)
+        assert (base_tick == KEYFRAME) == (sent is None) and raw_size == snap.raw_size()
+        _assert_same(snap, decoded)
+        # A client joining at tick 100 starts from the keyframe, then follows the same deltas
+        if tick == 100:
+            late = unpack_snapshot(_body(keyframe)[1])[2]
+        elif late is not None:
+            late = unpack_snapshot(body, late)[2]
+            _assert_same(snap, late)
+        if sent is not None:
+            delta_bytes += len(message)
+            keyframe_bytes += len(keyframe)
+        sent, received = snap, decoded
+    assert late is not None and len(sent.boss_bullets) > 200
+    assert delta_bytes * 2 < keyframe_bytes # Dead reckoning pays off on a bullet-hell screen
+
+
+def test_snapshot_fields(busy_state):
+    snap = capture_snapshot(busy_state, [11, 22], 7)
+    slot, player = snap.player(22)
+    assert slot == 1 and player['x'] == busy_state.players[1].rect.x
+    assert snap.player(99) == (None, None)
+    assert snap.boss is not None and len(snap.enemies) == len(busy_state.enemies)
+
+
+def test_delta_against_a_missing_base_is_rejected(busy_state):
+    first = capture_snapshot(busy_state, [11, 22], 1)
+    step_level(busy_state, _inputs(busy_state.frame))
+    second = capture_snapshot(busy_state, [11, 22], 2, first)
+    body = _body(pack_snapshot(second, first))[1]
+    with pytest.raises(ValueError):
+        unpack_snapshot(body)
+    with pytest.raises(ValueError):
+        unpack_snapshot(body, second)
+
+
+def test_input_round_trip():
+    msg_type, body = _body(pack_input(2 ** 32 + 5, FrameInput((-20, 650), fire=True, bomb=True)))
+    assert msg_type == MSG_INPUT
+    frame, frame_input = unpack_input(body)
+    assert frame == 5
+    assert (frame_input.mouse_pos, frame_input.fire, frame_input.bomb) == ((-20, 650), True, True)
@@ -0,0 +1,72 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_profiler.py
+import itertools
+import json
+import numpy as np
+import pytest
+import profiler as profiler_module
+from settings import *
+from profiler import FrameProfiler, PHASES, PHASE_INDEX
+from simulation import LevelState, FrameInput, step_level
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ perf_counter_ns that moves 1 ms per call, so every mark charges exactly 1 ms. """
+    ticks = itertools.count(0, 1_000_000)
+    monkeypatch.setattr(profiler_module.time, 'perf_counter_ns', lambda: next(ticks))
+
+
+def test_repeated_marks_add_up(clock):
+    profiler = FrameProfiler(capacity=4)
+    profiler.begin_frame()
+    profiler.mark('tick')
+    profiler.mark('events')
+    for _ in range(3): # A catch-up frame: three simulation steps
+        for phase in ('update', 'spawn', 'collide', 'audio'):
+            profiler.mark(phase)
+    profiler.mark('draw')
+    profiler.end_frame()
+    row = profiler.durations_ms()[0]
+    for phase in ('update', 'spawn', 'collide', 'audio'):
+        assert row[PHASE_INDEX[phase]] == 3.0
+    assert row[PHASE_INDEX['tick']] == row[PHASE_INDEX['draw']] == 1.0
+    assert row[PHASE_INDEX['hud']] == row[PHASE_INDEX['present']] == 0.0
+    assert row.sum() == 15.0
+
+
+def test_catch_up_steps_sum_to_frame_time(images, level):
+    """ Phases over several real steps add up to the wall time between begin_frame and the last mark. """
+    state = LevelState(level(), images, seed=5)
+    profiler = FrameProfiler(capacity=8)
+    for steps in (1, 3, 5):
+        profiler.begin_frame()
+        start = profiler._last
+        profiler.mark('events')
+        for _ in range(steps):
+            step_level(state, FrameInput((SCREEN_WIDTH // 2, SCREEN_HEIGHT - 80), fire=True), profiler)
+        end = profiler._last
+        profiler.end_frame()
+        assert profiler.durations_ms()[-1].sum() == pytest.approx((end - start) / 1e6)
+    summary = profiler.summary()
+    assert summary['frames'] == 3
+    assert summary['phases']['update']['max_ms'] > 0
+
+
+def test_chrome_trace_lays_phases_back_to_back(clock, tmp_path):
+    profiler = FrameProfiler(capacity=2)
+    for _ in range(3): # Wraps the ring buffer
+        profiler.begin_frame()
+        profiler.mark('tick')
+        profiler.mark('update')
+        profiler.mark('update')
+        profiler.mark('present')
+        profiler.end_frame()
+    with open(profiler.export_chrome_trace(tmp_path / 'trace.json'), encoding='utf-8') as f:
+        events = json.load(f)['traceEvents']
+    frames = [e for e in events if e['name'] == 'frame']
+    assert [e['args']['frame'] for e in frames] == [1, 2]
+    assert all(e['dur'] == 4000 for e in frames)
+    update = [e for e in events if e['name'] == 'update']
+    present = [e for e in events if e['name'] == 'present']
+    assert all(e['dur'] == 2000 for e in update)
+    assert [p['ts'] - u['ts'] for u, p in zip(update, present)] == [2000, 2000]
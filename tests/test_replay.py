@@ -0,0 +1,57 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_replay.py
+import argparse
+import math
+import numpy as np
+import pytest
+from settings import *
+from level_compiler import load_level_data
+from simulation import LevelState, step_level
+from replay import InputRecorder, load_recording, level_digest, pack_input_flags, frame_input_from_record, seed_arg
+from headless import run_level_headless
+
+
+def _world(state):
+    """ Everything on screen, for comparing two runs. """
+    stores = (state.enemies, state.bullets, state.enemy_bullets, state.powerups)
+    return ([(store.x[:store.count].copy(), store.y[:store.count].copy(), store.alive[:store.count].copy())
+             for store in stores], state.player.rect.topleft, state.player.score, state.result)
+
+
+def _record(level_data, images, seed, frames):
+    """ Plays a level like main.py --record: each frame's input is recorded, then stepped. """
+    recorder = InputRecorder()
+    state = LevelState(level_data, images, seed=seed)
+    recorder.begin_level(level_data, state.seed)
+    for frame in range(frames):
+        pos = (SCREEN_WIDTH // 2 + int(180 * math.sin(frame / 40)), SCREEN_HEIGHT - 80)
+        buttons, bomb = (frame % 3 != 0, False, False), frame == 900
+        recorder.record(pos, buttons, False, bomb)
+        step_level(state, frame_input_from_record(*pos, pack_input_flags(buttons, False, bomb)))
+        if state.finished:
+            break
+    recorder.end_level(state)
+    return recorder, state
+
+
+@pytest.mark.parametrize('seed', [7, 2 ** 32 + 7])
+def test_record_save_load_replay(tmp_path, images, seed):
+    level_data = load_level_data()[0]
+    recorder, live = _record(level_data, images, seed, 1500)
+    path = recorder.save(str(tmp_path / 'run.pwrec'))
+
+    (segment,) = load_recording(path)
+    assert segment.seed == live.seed == seed & 0xFFFFFFFF
+    assert segment.digest == level_digest(level_data)
+    assert (segment.frame_count, segment.score, segment.result) == (live.frame, live.player.score, live.result)
+    replayed, _wall = run_level_headless(level_data, images, segment.frame_count, segment.input_fn(), seed=segment.seed)
+    live_world, replayed_world = _world(live), _world(replayed)
+    for (lx, ly, la), (rx, ry, ra) in zip(live_world[0], replayed_world[0]):
+        assert np.array_equal(lx, rx) and np.array_equal(ly, ry) and np.array_equal(la, ra)
+    assert live_world[1:] == replayed_world[1:]
+
+
+def test_seed_arg_range():
+    assert seed_arg("0") == 0 and seed_arg(str(2 ** 32 - 1)) == 2 ** 32 - 1
+    for bad in ("-1", str(2 ** 32), "seven"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            seed_arg(bad)
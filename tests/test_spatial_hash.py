@@ -0,0 +1,70 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_spatial_hash.py
+import random
+import numpy as np
+import pygame
+import pytest
+from settings import *
+from entity_store import EntityStore
+from spatial_hash import SpatialHash
+
+
+def _layout(rng, count, max_size):
+    """ Random integer boxes, some partly or fully off screen. """
+    boxes = []
+    for _ in range(count):
+        w, h = rng.randint(1, max_size), rng.randint(1, max_size)
+        boxes.append((rng.randint(-60, SCREEN_WIDTH + 20), rng.randint(-60, SCREEN_HEIGHT + 20), w, h))
+    return boxes
+
+
+def _store(boxes, dead=()):
+    store = EntityStore(len(boxes))
+    for x, y, w, h in boxes:
+        store.spawn(x, y, 0, 0, w, h)
+    store.kill(np.array(sorted(dead), dtype=np.intp))
+    return store
+
+
+def _group(boxes, dead=()):
+    sprites = []
+    group = pygame.sprite.Group()
+    for i, box in enumerate(boxes):
+        sprite = pygame.sprite.Sprite()
+        sprite.rect = pygame.Rect(box)
+        sprite.row = i
+        sprites.append(sprite)
+        if i not in dead: group.add(sprite) # Added in spawn order, like the stores' rows
+    return group
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_collide_matches_groupcollide(seed):
+    rng = random.Random(seed)
+    enemies = _layout(rng, rng.randint(0, 120), 70)
+    bullets = _layout(rng, rng.randint(0, 400), 20)
+    dead_enemies = set(rng.sample(range(len(enemies)), len(enemies) // 10))
+    dead_bullets = set(rng.sample(range(len(bullets)), len(bullets) // 10))
+
+    grid = SpatialHash().build(_store(enemies, dead_enemies))
+    enemy_hit, bullet_hit = grid.collide(_store(bullets, dead_bullets))
+
+    hits = pygame.sprite.groupcollide(_group(enemies, dead_enemies), _group(bullets, dead_bullets), True, True)
+    assert enemy_hit.tolist() == sorted(sprite.row for sprite in hits)
+    assert bullet_hit.tolist() == sorted(bullet.row for consumed in hits.values() for bullet in consumed)
+
+
+def test_consume_credits_the_first_hashed_row():
+    # Two overlapping enemies; each bullet goes to the lower (earlier spawned) row it touches
+    grid = SpatialHash().build(_store([(100, 100, 50, 50), (120, 100, 50, 50)]))
+    bullet_hit, consumer = grid.consume(_store([(125, 110, 5, 5), (160, 110, 5, 5), (400, 400, 5, 5)]))
+    assert bullet_hit.tolist() == [0, 1] and consumer.tolist() == [0, 1]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_query_rect_matches_colliderect(seed):
+    rng = random.Random(100 + seed)
+    boxes = _layout(rng, 300, 60)
+    grid = SpatialHash().build(_store(boxes))
+    for rect in map(pygame.Rect, _layout(rng, 50, 150)):
+        expected = [i for i, box in enumerate(boxes) if rect.colliderect(box)]
+        assert grid.query_rect(rect).tolist() == expected
@@ -0,0 +1,91 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_spawn_timeline.py
+from spawn_timeline import SpawnTimeline, frame_at_ms, FRAME_MS
+from simulation import LevelState, step_level
+
+
+def _frames(timeline, kind, until):
+    return [event[0] for event in timeline.pop_due(until) if event[3] == kind]
+
+
+def test_frame_at_ms_is_first_frame_at_or_after():
+    for ms in (0, 1, 16, 17, 1000, 30000):
+        frame = frame_at_ms(ms)
+        assert int(frame * FRAME_MS) >= ms
+        assert frame == 0 or int((frame - 1) * FRAME_MS) < ms
+
+
+def test_boss_and_wave_frames(level):
+    data = level(is_boss_level=True, boss_appear_delay_seconds=30,
+                 waves=[{'at': 2, 'count': 3, 'delay_ms': 100, 'repeat': 2, 'every': 1}])
+    timeline = SpawnTimeline(data)
+    events = timeline.pop_due(frame_at_ms(30000))
+    assert [e[0] for e in events if e[3] == 'boss'] == [frame_at_ms(30000)]
+    waves = [e[0] for e in events if e[3] == 'wave']
+    assert waves == [frame_at_ms(ms) for ms in (2000, 2100, 2200, 3000, 3100, 3200)]
+
+
+def test_zero_delay_events_happen_on_the_first_frame(level):
+    data = level(is_boss_level=True, boss_appear_delay_seconds=0,
+                 waves=[{'at': 0, 'count': 3, 'delay_ms': 100}])
+    timeline = SpawnTimeline(data)
+    first = timeline.pop_due(1)
+    assert [e[3] for e in first] == ['boss', 'wave']
+    assert _frames(timeline, 'wave', frame_at_ms(200)) == [frame_at_ms(100), frame_at_ms(200)]
+
+
+def test_zero_delay_boss_spawns(level, images):
+    data = level(is_boss_level=True, boss_appear_delay_seconds=0, waves=[{'at': 0, 'count': 3}])
+    state = LevelState(data, images, seed=1)
+    step_level(state, None)
+    assert state.boss_spawned
+    assert len(state.enemies) == 3
+
+
+def test_enemy_ticks_and_end(level):
+    data = level(spawn_interval=50, duration_seconds=5)
+    timeline = SpawnTimeline(data)
+    events = timeline.pop_due(10 * 60)
+    assert [e[0] for e in events if e[3] == 'enemy'] == list(range(50, timeline.end_frame + 1, 50))
+    assert [e[0] for e in events if e[3] == 'end'] == [frame_at_ms(5000)]
+
+
+def test_start_frame_skips_past_events(level):
+    data = level(waves=[{'at': 1, 'count': 1}, {'at': 10, 'count': 1}])
+    timeline = SpawnTimeline(data, start_frame=frame_at_ms(5000))
+    assert _frames(timeline, 'wave', frame_at_ms(20000)) == [frame_at_ms(10000)]
+
+
+def test_reload_schedules_an_overdue_boss(level, images):
+    state = LevelState(level(is_boss_level=True, boss_appear_delay_seconds=30), images, seed=1)
+    for _ in range(120):
+        step_level(state, None)
+    state.configure(level(is_boss_level=True, boss_appear_delay_seconds=1)) # Hot reload: delay already past
+    step_level(state, None)
+    assert state.boss_spawned
+    state.configure(level(is_boss_level=True, boss_appear_delay_seconds=1))
+    assert all(event[3] != 'boss' for event in state.timeline.events)
+
+
+def test_delayed_enemy_spawn_restarts_the_cadence(level):
+    """ Same spawn frames as the old per-frame timer, which reset whenever an enemy spawned. """
+    interval = 40
+    has_room = lambda frame: frame % 300 < 150 # Screen full for half of every 5 s
+
+    timer, old_spawns = 0, []
+    for frame in range(1, 3000):
+        timer += 1
+        if timer >= interval and has_room(frame):
+            timer = 0
+            old_spawns.append(frame)
+
+    timeline = SpawnTimeline(level(spawn_interval=interval))
+    pending, spawns = False, []
+    for frame in range(1, 3000): # step_level's spawn logic
+        tick = any(event[3] == 'enemy' for event in timeline.pop_due(frame))
+        pending = pending or tick
+        if pending and has_room(frame):
+            pending = False
+            if not tick:
+                timeline.restart_enemy_ticks(frame)
+            spawns.append(frame)
+    assert spawns == old_spawns
@@ -0,0 +1,21 @@
+# /Users/junluo/Desktop/PlaneWar/tests/test_sprite_atlas.py
+from settings import *
+from simulation import LevelState
+from sprite_atlas import sprite_atlas, pack_level
+from collision_masks import mask_cache, store_masks
+
+
+def test_retries_reuse_fallback_powerup_surfaces(images, level):
+    """ Missing power-up images must not take a new atlas slot and mask on every level or retry. """
+    images = {**images, 'powerups': {}}
+    first = LevelState(level(), images, seed=1)
+    pack_level(first)
+    store_masks(first.powerup_kind_images)
+    atlas_images, masks = sprite_atlas.stats()['images'], len(mask_cache._masks)
+    for seed in range(2, 6):
+        state = LevelState(level(), images, seed=seed)
+        assert all(a is b for a, b in zip(state.powerup_kind_images, first.powerup_kind_images))
+        pack_level(state)
+        store_masks(state.powerup_kind_images)
+    assert sprite_atlas.stats()['images'] == atlas_images
+    assert len(mask_cache._masks) == masks
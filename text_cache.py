@@ -0,0 +1,54 @@
+# /Users/junluo/Desktop/PlaneWar/text_cache.py
+"""
+Cache for rendered text surfaces.
+
+Font.render rasterizes glyphs on every call, yet the HUD and menu strings only
+change when a score/bomb/level value changes. render_text() keeps the result
+keyed by (font, text, color, antialias) in a size-capped LRU, so a steady HUD
+costs a dict lookup per string instead of a rasterization.
+"""
+from collections import OrderedDict
+from settings import *
+
+
+class TextCache:
+    """ LRU of rendered text surfaces with hit/miss counters. """
+    def __init__(self, max_entries=TEXT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, antialias, color):
+        """ Same arguments as Font.render; returns a shared surface, so don't draw on it. """
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return {'entries': len(self._surfaces), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': round(hit_rate, 3)}
+
+
+# Shared cache used by the HUD and the menu screens
+text_cache = TextCache()
+
+def render_text(font, text, antialias, color):
+    """ Cached drop-in for font.render(text, antialias, color). """
+    return text_cache.render(font, text, antialias, color)